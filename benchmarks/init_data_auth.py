@@ -0,0 +1,69 @@
+"""Per-request cost of verifying Telegram WebApp initData.
+
+Compares a full HMAC check (first request of a WebApp launch), a cached
+session (every following request) and a forged payload::
+
+    python -m benchmarks.init_data_auth --users 10000 --repeat 5
+"""
+
+import argparse
+import json
+import time
+
+from bot.auth import InitDataVerifier, sign_init_data
+
+BOT_TOKEN = "123456:benchmark-token"
+
+
+def build_init_data(users: int) -> list[str]:
+    auth_date = str(int(time.time()))
+    return [
+        sign_init_data(
+            BOT_TOKEN,
+            {
+                "query_id": f"AAH{user_id}",
+                "user": json.dumps(
+                    {"id": user_id, "first_name": "Player", "username": f"p{user_id}"},
+                    separators=(",", ":"),
+                ),
+                "auth_date": auth_date,
+            },
+        )
+        for user_id in range(1, users + 1)
+    ]
+
+
+def per_call_us(verifier: InitDataVerifier, payloads: list[str]) -> float:
+    started = time.perf_counter()
+    for init_data in payloads:
+        verifier.verify(init_data)
+    return (time.perf_counter() - started) / len(payloads) * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payloads = build_init_data(args.users)
+    forged = [payload.replace("p1", "p2", 1) for payload in payloads]
+
+    verifier = InitDataVerifier(BOT_TOKEN)
+    cold = per_call_us(verifier, payloads)
+    cached = min(per_call_us(verifier, payloads) for _ in range(args.repeat))
+    rejected = per_call_us(InitDataVerifier(BOT_TOKEN), forged)
+    uncached = min(
+        per_call_us(InitDataVerifier(BOT_TOKEN, session_ttl=0), payloads)
+        for _ in range(args.repeat)
+    )
+
+    print(f"full check (first request): {cold:6.2f} us")
+    print(f"without session cache:      {uncached:6.2f} us")
+    print(f"cached session:             {cached:6.2f} us")
+    print(f"forged payload:             {rejected:6.2f} us")
+    print(verifier.stats())
+
+
+if __name__ == "__main__":
+    main()
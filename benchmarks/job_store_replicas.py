@@ -0,0 +1,119 @@
+"""Check that schedulers sharing a SQLite job store run every due job once.
+
+Two schedulers in one event loop, each with the same named jobs, serve
+against one temporary SQLite file through ``SQLJobStore``. Every run is
+recorded; two runs of a job closer than half its interval mean both
+schedulers took the same due run. Both are then stopped for a few intervals
+and replaced by a fresh pair, which has to catch the missed runs up exactly
+once. Exits with status 1 on any double or missing run::
+
+    python -m benchmarks.job_store_replicas --seconds 6
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from bot.db import models  # noqa: F401
+from bot.db.base import PROFILES, create_engines, init_db
+from bot.jobs import SQLJobStore
+from bot.scheduler import Scheduler
+
+# Named jobs and their intervals in seconds.
+JOBS = {"every_second": 1, "every_two_seconds": 2}
+
+
+def build_scheduler(store: SQLJobStore, runs: dict[str, list]) -> Scheduler:
+    scheduler = Scheduler(store=store)
+
+    async def record(name: str) -> None:
+        runs[name].append((time.monotonic(), scheduler.owner))
+
+    for name, interval in JOBS.items():
+        scheduler.every(interval).seconds.named(name).catch_up("once").do(
+            record, name
+        )
+    return scheduler
+
+
+async def serve(schedulers: list[Scheduler], seconds: float) -> None:
+    tasks = [asyncio.create_task(scheduler.serve()) for scheduler in schedulers]
+    await asyncio.sleep(seconds)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    # Let runs that were just claimed finish and release their lease.
+    await asyncio.sleep(0.5)
+
+
+def double_runs(runs: dict[str, list]) -> list[str]:
+    problems = []
+    for name, interval in JOBS.items():
+        times = sorted(started for started, _ in runs[name])
+        for previous, current in zip(times, times[1:]):
+            if current - previous < interval / 2:
+                problems.append(
+                    f"{name}: two runs {(current - previous) * 1000:.0f} ms apart"
+                )
+    return problems
+
+
+async def run(seconds: float, downtime: float) -> int:
+    with tempfile.TemporaryDirectory() as directory:
+        writer, reader = create_engines(
+            str(Path(directory) / "jobs.db"), PROFILES["production"]
+        )
+        await init_db(writer)
+        store = SQLJobStore(async_sessionmaker(writer, expire_on_commit=False))
+
+        runs: dict[str, list] = defaultdict(list)
+        await serve([build_scheduler(store, runs) for _ in range(2)], seconds)
+        problems = double_runs(runs)
+        for name, interval in JOBS.items():
+            owners = {owner for _, owner in runs[name]}
+            print(
+                f"{name:>18}: {len(runs[name])} runs in {seconds:.0f}s "
+                f"by {len(owners)} scheduler(s)"
+            )
+            # The first run is due one interval after registration.
+            expected = seconds / interval - 1
+            if not expected - 1 <= len(runs[name]) <= expected + 1:
+                problems.append(
+                    f"{name}: {len(runs[name])} runs, expected about {expected:.0f}"
+                )
+
+        await asyncio.sleep(downtime)
+        caught_up: dict[str, list] = defaultdict(list)
+        await serve([build_scheduler(store, caught_up) for _ in range(2)], 0.5)
+        for name in JOBS:
+            print(f"{name:>18}: {len(caught_up[name])} catch-up run(s) after restart")
+            if len(caught_up[name]) != 1:
+                problems.append(
+                    f"{name}: {len(caught_up[name])} catch-up runs, expected 1"
+                )
+
+        await writer.dispose()
+        if reader is not writer:
+            await reader.dispose()
+
+    for problem in problems:
+        print(problem)
+    return 1 if problems else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=6)
+    parser.add_argument("--downtime", type=float, default=4.5)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.seconds, args.downtime)))
+
+
+if __name__ == "__main__":
+    main()
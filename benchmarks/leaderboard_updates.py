@@ -0,0 +1,72 @@
+"""Cost of moving players in the in-memory leaderboard as it grows.
+
+Every save that changes a score moves its player in ``bot.leaderboard``.
+With one sorted list that is a delete and an insert that shift up to every
+other player; the buckets keep the shift inside one bucket. Both layouts
+(``--bucket-size`` and a single bucket holding everyone) are timed for
+updates, ranks and the top slice::
+
+    python -m benchmarks.leaderboard_updates --players 10000 100000 1000000
+"""
+
+import argparse
+import random
+import time
+
+from bot.leaderboard import Leaderboard
+
+
+def measure(players: int, bucket_size: int, operations: int) -> dict[str, float]:
+    rng = random.Random(1)
+    leaderboard = Leaderboard(bucket_size=bucket_size)
+    leaderboard.load(
+        {"user_id": user_id, "username": None, "score": score, "level": 0}
+        for user_id, score in enumerate(
+            (rng.randrange(10**6) for _ in range(players)), start=1
+        )
+    )
+    user_ids = [rng.randrange(1, players + 1) for _ in range(operations)]
+
+    started = time.perf_counter()
+    for user_id in user_ids:
+        leaderboard.update(user_id, score=rng.randrange(10**6))
+    update_us = (time.perf_counter() - started) / operations * 1e6
+
+    started = time.perf_counter()
+    for user_id in user_ids:
+        leaderboard.rank(user_id)
+    rank_us = (time.perf_counter() - started) / operations * 1e6
+
+    started = time.perf_counter()
+    for _ in range(operations):
+        leaderboard.top(50)
+    top_us = (time.perf_counter() - started) / operations * 1e6
+    return {"update_us": update_us, "rank_us": rank_us, "top_us": top_us}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--players", nargs="+", type=int, default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--bucket-size", type=int, default=1000)
+    parser.add_argument("--operations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(
+        f"{'players':>9} {'layout':>10} {'update us':>10} {'rank us':>8} {'top us':>7}"
+    )
+    for players in args.players:
+        for layout, bucket_size in (
+            ("buckets", args.bucket_size),
+            ("one list", players),
+        ):
+            result = measure(players, bucket_size, args.operations)
+            print(
+                f"{players:>9} {layout:>10} {result['update_us']:>10.2f} "
+                f"{result['rank_us']:>8.2f} {result['top_us']:>7.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,544 @@
+"""In-process load test of the FastAPI app with simulated players.
+
+Every player replays the client sequence against a temporary SQLite file:
+it loads its progress, saves every ``--think`` seconds and polls the
+leaderboard and its rank every ``--leaderboard-every`` saves. The ``bootstrap``
+flow is what static/js does today (GET /api/bootstrap, PATCH deltas); the
+``shopping`` flow is the same client buying an upgrade and a skin with every
+save; the ``legacy`` flow is the older client (GET /api/database, GET
+/api/clicker, POST full progress). Requests go straight to the ASGI app, so
+the numbers leave out the network and uvicorn::
+
+    python -m benchmarks.load_test --players 100 --saves 20 --output run.json
+
+The JSON written by ``--output`` has sorted keys and rounded numbers, so two
+runs can be compared with a plain diff. The run exits with status 1 when a
+request ran more SQL statements than ``STATEMENT_BUDGETS`` allows for its
+endpoint, or when the write-behind flushes ran more than
+``write_statements`` derives from the shape of the accepted saves, so a
+change that adds queries to a hot path has to update them.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import importlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from urllib.parse import urlencode
+
+BOT_TOKEN = "123456:benchmark-token"
+SCHEMA_VERSION = 1
+UPGRADES = (
+    "quantum_loop",
+    "stellar_magnet",
+    "dividend_protocol",
+    "drone_fleet",
+    "crown_of_combos",
+    "entropy_shield",
+    "galactic_exchange",
+)
+SKINS = ("nebula_flare", "aurora_blade", "void_crown")
+PROGRESS_KEYS = ("score", "level", "currency", "active_skin")
+# Most SQL statements a single request of an endpoint may run. A first load
+# looks the user up, creates it and reads it back; a delta save only reads
+# the stored seq when the progress is not cached; the rest is served from
+# memory or written behind.
+STATEMENT_BUDGETS = {
+    "GET /api/bootstrap": 3,
+    "GET /api/clicker": 3,
+    "GET /api/database": 0,
+    "GET /api/leaderboard": 0,
+    "GET /api/leaderboard/rank": 0,
+    "PATCH /api/clicker": 1,
+    "POST /api/clicker": 0,
+}
+
+
+def write_statements(save: dict) -> int:
+    """Most statements the write-behind flush runs for one accepted save.
+
+    Follows the shape of the payload: the seq guard of a delta, the UPDATE
+    of the user row, one upsert of upgrades and one insert of new skins.
+    Each flushed batch adds one SELECT of its users per shard.
+    """
+    return (
+        ("seq" in save)
+        + any(key in save for key in (*PROGRESS_KEYS, "open_free_chest"))
+        + bool(save.get("upgrades"))
+        + bool(save.get("owned_skins"))
+    )
+
+
+# Statement counter of the request being served; ``None`` outside requests,
+# e.g. in the write-behind flush task.
+_statements: contextvars.ContextVar[list[int] | None] = contextvars.ContextVar(
+    "statements", default=None
+)
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def file_size(path: Path) -> int:
+    return path.stat().st_size if path.exists() else 0
+
+
+def database_size(path: Path) -> dict[str, int]:
+    """Sizes summed over the shards of ``DB_SHARDS``."""
+    from bot.db.base import DB_SHARDS
+    from bot.db.shards import shard_paths
+
+    files = [Path(name) for name in shard_paths(str(path), DB_SHARDS)]
+    wal = sum(file_size(file.with_name(file.name + "-wal")) for file in files)
+    main = sum(file_size(file) for file in files)
+    return {"main_bytes": main, "wal_bytes": wal, "total_bytes": main + wal}
+
+
+class Recorder:
+    """Latency, status codes and SQL statements per endpoint."""
+
+    def __init__(self) -> None:
+        self.timings: dict[str, list[float]] = defaultdict(list)
+        self.statements: dict[str, list[int]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+        self.background_statements = 0
+        # Sum of write_statements() over the saves the app accepted.
+        self.queued_statements = 0
+
+    def count_statement(self, *args) -> None:
+        counter = _statements.get()
+        if counter is None:
+            self.background_statements += 1
+        else:
+            counter[0] += 1
+
+    def record(self, label: str, status: int, ms: float, statements: int) -> None:
+        self.timings[label].append(ms)
+        self.statements[label].append(statements)
+        self.statuses[label][status] += 1
+
+    def summary(self) -> dict[str, dict]:
+        result = {}
+        for label, timings in self.timings.items():
+            statements = self.statements[label]
+            result[label] = {
+                "requests": len(timings),
+                "statuses": {
+                    str(status): count
+                    for status, count in sorted(self.statuses[label].items())
+                },
+                "p50_ms": round(percentile(timings, 0.50), 3),
+                "p95_ms": round(percentile(timings, 0.95), 3),
+                "p99_ms": round(percentile(timings, 0.99), 3),
+                "max_ms": round(max(timings), 3),
+                "statements_per_request": round(sum(statements) / len(statements), 3),
+                "statements_max": max(statements),
+            }
+        return result
+
+
+class AsgiClient:
+    """Calls an ASGI app directly, one complete request at a time."""
+
+    def __init__(self, app, recorder: Recorder) -> None:
+        self.app = app
+        self.recorder = recorder
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        label: str,
+        params: dict | None = None,
+        body: dict | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> tuple[int, dict[str, str], bytes]:
+        payload = b"" if body is None else json.dumps(body).encode()
+        raw_headers = [(b"host", b"bench")]
+        if body is not None:
+            raw_headers.append((b"content-type", b"application/json"))
+            raw_headers.append((b"content-length", str(len(payload)).encode()))
+        for name, value in (headers or {}).items():
+            raw_headers.append((name.lower().encode(), value.encode()))
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": urlencode(params or {}).encode(),
+            "root_path": "",
+            "headers": raw_headers,
+            "client": ("127.0.0.1", 0),
+            "server": ("bench", 80),
+        }
+        received = False
+
+        async def receive() -> dict:
+            nonlocal received
+            if received:
+                return {"type": "http.disconnect"}
+            received = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+
+        response: dict = {"status": 0, "headers": {}, "body": b""}
+
+        async def send(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = {
+                    name.decode(): value.decode()
+                    for name, value in message.get("headers", [])
+                }
+            elif message["type"] == "http.response.body":
+                response["body"] += message.get("body", b"")
+
+        counter = [0]
+        token = _statements.set(counter)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _statements.reset(token)
+        elapsed = (time.perf_counter() - started) * 1000
+        self.recorder.record(label, response["status"], elapsed, counter[0])
+        return response["status"], response["headers"], response["body"]
+
+
+class Player:
+    """One simulated client with its own progress and random stream."""
+
+    def __init__(self, user_id: int, client: AsgiClient, args, init_data: str | None):
+        self.user_id = user_id
+        self.username = f"player{user_id}"
+        self.client = client
+        self.args = args
+        self.rng = random.Random(args.seed * 1_000_003 + user_id)
+        self.headers = {"x-telegram-init-data": init_data} if init_data else {}
+        self.progress = {
+            "score": 0,
+            "level": 0,
+            "currency": 0,
+            "upgrades": [],
+            "active_skin": "stardust_emblem",
+            "owned_skins": ["stardust_emblem"],
+            "has_free_chest": True,
+            "chest_ready_at": None,
+        }
+        # Opened the free chest since the last accepted save.
+        self.opened_chest = False
+        self.last_sent: dict | None = None
+        self.seq = 0
+        self.leaderboard_etag: str | None = None
+
+    async def run(self) -> None:
+        await self.load()
+        for save in range(1, self.args.saves + 1):
+            await asyncio.sleep(self.args.think * self.rng.uniform(0.5, 1.5))
+            self.play()
+            await self.save()
+            if save % self.args.leaderboard_every == 0:
+                await self.poll_leaderboard()
+
+    async def load(self) -> None:
+        params = {"user_id": self.user_id, "username": self.username}
+        if self.args.flow != "legacy":
+            params["limit"] = 20
+            status, _, body = await self.client.request(
+                "GET", "/api/bootstrap", "GET /api/bootstrap", params, headers=self.headers
+            )
+            loaded = json.loads(body)["progress"] if status == 200 else None
+        else:
+            await self.client.request(
+                "GET",
+                "/api/database",
+                "GET /api/database",
+                {"db_version": 1},
+                headers=self.headers,
+            )
+            status, _, body = await self.client.request(
+                "GET", "/api/clicker", "GET /api/clicker", params, headers=self.headers
+            )
+            loaded = json.loads(body) if status == 200 else None
+        if loaded:
+            for key in self.progress:
+                self.progress[key] = loaded.get(key, self.progress[key])
+            self.seq = loaded.get("save_seq") or 0
+            self.last_sent = json.loads(json.dumps(self.progress))
+
+    def play(self) -> None:
+        """A few seconds of clicking, now and then an upgrade, skin or chest."""
+        progress = self.progress
+        clicks = self.rng.randint(1, 12)
+        progress["score"] += clicks * self.rng.randint(1, 8)
+        progress["currency"] += clicks * self.rng.randint(1, 4)
+        progress["level"] = progress["score"] // 500
+        if self.args.flow == "shopping":
+            self.buy_upgrade()
+            progress["owned_skins"] = [
+                *progress["owned_skins"],
+                f"skin_{len(progress['owned_skins'])}",
+            ]
+            return
+        roll = self.rng.random()
+        if roll < 0.1 and progress["currency"] >= 50:
+            self.buy_upgrade()
+        elif roll < 0.12:
+            skin = self.rng.choice(SKINS)
+            if skin not in progress["owned_skins"]:
+                progress["owned_skins"] = sorted([*progress["owned_skins"], skin])
+            progress["active_skin"] = skin
+        elif roll < 0.13 and progress["has_free_chest"]:
+            progress["has_free_chest"] = False
+            self.opened_chest = True
+
+    def buy_upgrade(self) -> None:
+        progress = self.progress
+        levels = {upgrade["name"]: upgrade["level"] for upgrade in progress["upgrades"]}
+        name = self.rng.choice(UPGRADES)
+        levels[name] = levels.get(name, 0) + 1
+        progress["upgrades"] = [
+            {"name": name, "level": level} for name, level in levels.items()
+        ]
+        progress["currency"] = max(0, progress["currency"] - 50)
+
+    def delta(self) -> dict:
+        """Only the changed fields, like ``diffProgress`` in static/js/save.js."""
+        previous, current = self.last_sent, self.progress
+        opened = {"open_free_chest": True} if self.opened_chest else {}
+        if previous is None:
+            # The chest state is derived on the server and never resent.
+            resend = {key: value for key, value in current.items() if "chest" not in key}
+            return {**resend, **opened}
+        delta = {key: current[key] for key in PROGRESS_KEYS if previous[key] != current[key]}
+        delta.update(opened)
+        levels = {upgrade["name"]: upgrade["level"] for upgrade in previous["upgrades"]}
+        upgrades = [
+            upgrade
+            for upgrade in current["upgrades"]
+            if levels.get(upgrade["name"]) != upgrade["level"]
+        ]
+        if upgrades:
+            delta["upgrades"] = upgrades
+        skins = [skin for skin in current["owned_skins"] if skin not in previous["owned_skins"]]
+        if skins:
+            delta["owned_skins"] = skins
+        return delta
+
+    async def save(self) -> None:
+        if self.args.flow == "legacy":
+            payload = {**self.progress, "user_id": self.user_id}
+            status, _, _ = await self.client.request(
+                "POST", "/api/clicker", "POST /api/clicker", body=payload, headers=self.headers
+            )
+            if status == 204:
+                self.client.recorder.queued_statements += write_statements(payload)
+            return
+        delta = self.delta()
+        if not delta:
+            return
+        self.seq += 1
+        payload = {**delta, "user_id": self.user_id, "seq": self.seq}
+        status, _, body = await self.client.request(
+            "PATCH", "/api/clicker", "PATCH /api/clicker", body=payload, headers=self.headers
+        )
+        if status == 204:
+            self.client.recorder.queued_statements += write_statements(payload)
+            self.opened_chest = False
+        if status == 409:
+            self.seq = json.loads(body).get("save_seq") or self.seq
+            self.last_sent = None
+        elif status in (429, 422):
+            self.last_sent = None
+        else:
+            self.last_sent = json.loads(json.dumps(self.progress))
+
+    async def poll_leaderboard(self) -> None:
+        headers = dict(self.headers)
+        if self.leaderboard_etag:
+            headers["if-none-match"] = self.leaderboard_etag
+        status, response_headers, _ = await self.client.request(
+            "GET", "/api/leaderboard", "GET /api/leaderboard", {"limit": 20}, headers=headers
+        )
+        if status == 200:
+            self.leaderboard_etag = response_headers.get("etag")
+        await self.client.request(
+            "GET",
+            "/api/leaderboard/rank",
+            "GET /api/leaderboard/rank",
+            {"user_id": self.user_id},
+            headers=self.headers,
+        )
+
+
+def signed_init_data(user_id: int) -> str:
+    from bot.auth import sign_init_data
+
+    return sign_init_data(
+        BOT_TOKEN,
+        {
+            "query_id": f"AAH{user_id}",
+            "user": json.dumps({"id": user_id, "username": f"player{user_id}"}),
+            "auth_date": str(int(time.time())),
+        },
+    )
+
+
+async def run(args, directory: Path) -> dict:
+    db_path = directory / "bench.db"
+    # bot.db.base creates its engines from the environment on import.
+    os.environ["DB_PATH"] = str(db_path)
+    os.environ["DB_PROFILE"] = args.profile
+    os.environ["BOT_TOKEN"] = BOT_TOKEN
+    os.environ["WEBAPP_AUTH"] = "1" if args.auth else "0"
+    # A single in-process worker has no other workers to hear from.
+    os.environ["CACHE_SYNC_INTERVAL"] = "0"
+    server = importlib.import_module("server")
+    from sqlalchemy import event
+
+    recorder = Recorder()
+    engines = {engine for pair in server.db_engines for engine in pair}
+    for engine in engines:
+        event.listen(engine.sync_engine, "before_cursor_execute", recorder.count_statement)
+
+    await server.on_startup()
+    # Only what the load causes counts, not creating the schema.
+    recorder.background_statements = 0
+    size_before = database_size(db_path)
+    client = AsgiClient(server.app, recorder)
+    players = [
+        Player(
+            user_id,
+            client,
+            args,
+            signed_init_data(user_id) if args.auth else None,
+        )
+        for user_id in range(1, args.players + 1)
+    ]
+    started = time.perf_counter()
+    await asyncio.gather(*(player.run() for player in players))
+    elapsed = time.perf_counter() - started
+    size_loaded = database_size(db_path)
+    await server.on_shutdown()
+    size_closed = database_size(db_path)
+
+    from bot.db.base import DB_SHARDS
+
+    flushes = server.progress_buffer.stats()["flushes"]
+    endpoints = recorder.summary()
+    requests = sum(endpoint["requests"] for endpoint in endpoints.values())
+    return {
+        "schema": SCHEMA_VERSION,
+        "config": {
+            "flow": args.flow,
+            "players": args.players,
+            "saves": args.saves,
+            "think": args.think,
+            "leaderboard_every": args.leaderboard_every,
+            "profile": args.profile,
+            "auth": args.auth,
+            "seed": args.seed,
+        },
+        "totals": {
+            "requests": requests,
+            "seconds": round(elapsed, 3),
+            "requests_per_second": round(requests / elapsed, 1),
+            "background_statements": recorder.background_statements,
+            "background_budget": recorder.queued_statements + flushes * DB_SHARDS,
+        },
+        "endpoints": endpoints,
+        "database": {
+            "before": size_before,
+            "after_load": size_loaded,
+            "after_close": size_closed,
+            "growth_bytes": size_closed["total_bytes"] - size_before["total_bytes"],
+        },
+    }
+
+
+def print_report(result: dict) -> None:
+    totals = result["totals"]
+    print(
+        f"{totals['requests']} requests in {totals['seconds']:.2f}s "
+        f"({totals['requests_per_second']:.0f} req/s), "
+        f"{totals['background_statements']} background statements "
+        f"(budget {totals['background_budget']})"
+    )
+    print(
+        f"{'endpoint':>26} {'count':>7} {'p50':>8} {'p95':>8} {'p99':>8} "
+        f"{'sql/req':>8}  statuses"
+    )
+    for label, endpoint in sorted(result["endpoints"].items()):
+        print(
+            f"{label:>26} {endpoint['requests']:>7} {endpoint['p50_ms']:>8.2f} "
+            f"{endpoint['p95_ms']:>8.2f} {endpoint['p99_ms']:>8.2f} "
+            f"{endpoint['statements_per_request']:>8.2f}  {endpoint['statuses']}"
+        )
+    database = result["database"]
+    print(
+        f"database: {database['before']['total_bytes']} -> "
+        f"{database['after_load']['total_bytes']} bytes under load "
+        f"(wal {database['after_load']['wal_bytes']}), "
+        f"{database['after_close']['total_bytes']} after close"
+    )
+
+
+def budget_violations(result: dict) -> list[str]:
+    violations = []
+    for label, endpoint in sorted(result["endpoints"].items()):
+        budget = STATEMENT_BUDGETS.get(label)
+        if budget is None:
+            violations.append(f"{label}: no statement budget")
+        elif endpoint["statements_max"] > budget:
+            violations.append(
+                f"{label}: {endpoint['statements_max']} statements in one request, "
+                f"budget {budget}"
+            )
+    totals = result["totals"]
+    if totals["background_statements"] > totals["background_budget"]:
+        violations.append(
+            f"write-behind: {totals['background_statements']} statements, "
+            f"budget {totals['background_budget']}"
+        )
+    return violations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--flow", choices=("bootstrap", "shopping", "legacy"), default="bootstrap"
+    )
+    parser.add_argument("--players", type=int, default=100)
+    parser.add_argument("--saves", type=int, default=20)
+    parser.add_argument("--think", type=float, default=0.25)
+    parser.add_argument("--leaderboard-every", type=int, default=5)
+    parser.add_argument("--profile", default="production")
+    parser.add_argument("--no-auth", dest="auth", action="store_false")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        result = asyncio.run(run(args, Path(directory)))
+    print_report(result)
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2, sort_keys=True) + "\n")
+    violations = budget_violations(result)
+    for violation in violations:
+        print(f"over budget: {violation}")
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Load latency of a player's progress as the number of saves grows.
+
+Every save sends the full, sorted list of owned skins. With set semantics the
+``owned_skins`` table stays at one row per skin, so loading the progress must
+cost the same after 10 saves as after 5000::
+
+    python -m benchmarks.owned_skins_load
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from bot.db.base import init_db
+from bot.db.func import load_progress, save_progress_many
+from bot.db.models import OwnedSkin
+
+USER_ID = 1
+SKINS = [f"skin_{index:02d}" for index in range(20)]
+UPGRADES = [{"name": f"upgrade_{index}", "level": 3} for index in range(8)]
+
+
+async def measure_loads(sessionmaker, loads: int) -> list[float]:
+    timings = []
+    for _ in range(loads):
+        started = time.perf_counter()
+        await load_progress(sessionmaker, USER_ID)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+async def run(checkpoints: list[int], loads: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{Path(directory) / 'bench.db'}")
+        sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+        await init_db(engine)
+        await load_progress(sessionmaker, USER_ID, "bench")
+
+        print(f"{'saves':>8} {'skin rows':>10} {'p50 ms':>8} {'p95 ms':>8}")
+        saves = 0
+        for checkpoint in checkpoints:
+            while saves < checkpoint:
+                await save_progress_many(
+                    sessionmaker,
+                    {
+                        USER_ID: {
+                            "score": saves,
+                            "upgrades": UPGRADES,
+                            "owned_skins": SKINS,
+                        }
+                    },
+                )
+                saves += 1
+            async with sessionmaker() as session:
+                rows = await session.scalar(select(func.count(OwnedSkin.id)))
+            timings = sorted(await measure_loads(sessionmaker, loads))
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(
+                f"{saves:>8} {rows:>10} {statistics.median(timings):>8.2f} {p95:>8.2f}"
+            )
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--checkpoints", type=int, nargs="+", default=[1, 100, 1000, 5000]
+    )
+    parser.add_argument("--loads", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.checkpoints, args.loads))
+
+
+if __name__ == "__main__":
+    main()
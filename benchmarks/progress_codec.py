@@ -0,0 +1,99 @@
+"""Per-request cost of decoding, validating and encoding progress payloads.
+
+Compares the previous path (``json.loads`` of the body, an ``isinstance``
+check and ``JSONResponse`` rendering with the json module) against the
+compiled schemas of ``bot.schemas`` (one-pass ``validate_json`` that also
+rejects unknown keys, and ``dump_json``)::
+
+    python -m benchmarks.progress_codec --number 20000
+"""
+
+import argparse
+import json
+import time
+
+from fastapi.responses import JSONResponse
+
+from bot.schemas import parse_progress, progress_response
+
+UPGRADES = (
+    "quantum_loop",
+    "stellar_magnet",
+    "dividend_protocol",
+    "drone_fleet",
+    "crown_of_combos",
+    "entropy_shield",
+    "galactic_exchange",
+)
+
+FULL_SAVE = json.dumps(
+    {
+        "user_id": "123456789",
+        "score": 987654,
+        "level": 12,
+        "currency": 45678,
+        "upgrades": [{"name": name, "level": 7} for name in UPGRADES],
+        "active_skin": "aurora_blade",
+        "owned_skins": ["aurora_blade", "nebula_flare", "stardust_emblem"],
+        "has_free_chest": False,
+        "chest_ready_at": 1760000000000,
+    }
+).encode()
+DELTA_SAVE = json.dumps(
+    {"user_id": 123456789, "seq": 42, "score": 987700, "currency": 45690}
+).encode()
+LOADED = {
+    "score": 987654,
+    "level": 12,
+    "currency": 45678,
+    "upgrades": [{name: 7} for name in UPGRADES],
+    "owned_skins": ["aurora_blade", "nebula_flare", "stardust_emblem"],
+    "active_skin": "aurora_blade",
+    "has_free_chest": False,
+    "chest_ready_at": 1760000000000,
+    "chest_cooldown_ms": 86400000,
+    "save_seq": 42,
+    "db_version": 1,
+}
+
+
+def json_module_decode(body: bytes) -> dict:
+    payload = json.loads(body)
+    if not isinstance(payload, dict):
+        raise ValueError("Payload must be a JSON object")
+    return payload
+
+
+def per_call_us(function, argument, number: int) -> float:
+    started = time.perf_counter()
+    for _ in range(number):
+        function(argument)
+    return (time.perf_counter() - started) / number * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cases = [
+        ("decode full save", json_module_decode, parse_progress, FULL_SAVE),
+        ("decode delta save", json_module_decode, parse_progress, DELTA_SAVE),
+        (
+            "encode progress",
+            lambda progress: JSONResponse(progress).body,
+            progress_response.dump_json,
+            LOADED,
+        ),
+    ]
+    assert json.loads(progress_response.dump_json(LOADED)) == LOADED
+    print(f"{'case':>18} {'json module':>12} {'schema':>9} {'speedup':>8}")
+    for name, current, compiled, argument in cases:
+        before = min(per_call_us(current, argument, args.number) for _ in range(args.repeat))
+        after = min(per_call_us(compiled, argument, args.number) for _ in range(args.repeat))
+        print(f"{name:>18} {before:>9.2f} us {after:>6.2f} us {before / after:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Cost of computing next runs for many per-user schedules across DST changes.
+
+Every schedule is stepped through its next runs starting a few days before
+the spring and autumn DST changes of its timezone::
+
+    python -m benchmarks.scheduler_next_run --jobs 5000 --steps 20
+"""
+
+import argparse
+import datetime
+import itertools
+import time
+
+from bot.scheduler import Scheduler
+
+ZONES = ("Europe/Berlin", "America/New_York", "Europe/Moscow", "Australia/Sydney")
+EXPRESSIONS = ("30 2 * * *", "*/15 * * * *", "0 8 * * mon-fri", "0 9 1,15 * *")
+# A few days before the 2026 DST changes in the zones above.
+STARTS = (
+    datetime.datetime(2026, 3, 6, 12),
+    datetime.datetime(2026, 3, 27, 12),
+    datetime.datetime(2026, 4, 3, 12),
+    datetime.datetime(2026, 10, 2, 12),
+    datetime.datetime(2026, 10, 23, 12),
+    datetime.datetime(2026, 10, 30, 12),
+)
+
+
+async def noop() -> None:
+    pass
+
+
+def build_jobs(scheduler: Scheduler, count: int) -> dict[str, list]:
+    kinds = {"cron": [], "daily_at": [], "interval": []}
+    combinations = itertools.cycle(itertools.product(ZONES, EXPRESSIONS))
+    for _ in range(count):
+        zone, expression = next(combinations)
+        kinds["cron"].append(scheduler.cron(expression, tz=zone).do(noop))
+        kinds["daily_at"].append(scheduler.every().day.at("02:30", zone).do(noop))
+        kinds["interval"].append(scheduler.every(15).minutes.do(noop))
+    return kinds
+
+
+def measure(jobs: list, steps: int) -> float:
+    """Microseconds per next-run computation."""
+    computed = 0
+    started = time.perf_counter()
+    for job, start in zip(jobs, itertools.cycle(STARTS)):
+        moment = start
+        for _ in range(steps):
+            moment = job._next_run_after(moment)
+        computed += steps
+    return (time.perf_counter() - started) / computed * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=5000)
+    parser.add_argument("--steps", type=int, default=20)
+    args = parser.parse_args()
+
+    scheduler = Scheduler()
+    started = time.perf_counter()
+    kinds = build_jobs(scheduler, args.jobs)
+    print(
+        f"built {len(scheduler.jobs)} jobs in "
+        f"{(time.perf_counter() - started) * 1000:.0f} ms"
+    )
+    for kind, jobs in kinds.items():
+        print(f"{kind:>9}: {measure(jobs, args.steps):6.2f} us per next run")
+
+
+if __name__ == "__main__":
+    main()
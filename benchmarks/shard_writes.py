@@ -0,0 +1,120 @@
+"""Write throughput and latency of the database split into shards.
+
+Every shard is its own SQLite file with its own single writer, so saves of
+users on different shards no longer queue behind each other. Simulated
+players save deltas concurrently, once per shard count::
+
+    python -m benchmarks.shard_writes --shards 1 2 4 8 --players 400 --saves 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy.exc import OperationalError
+
+from bot.db import models  # noqa: F401
+from bot.db.base import PROFILES, create_engines, init_db
+from bot.db.func import fetch_leaderboard, load_progress, save_progress_delta
+from bot.db.shards import make_sessionmaker, shard_paths
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run_shards(
+    count: int, profile: str, players: int, saves: int
+) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as directory:
+        engines = [
+            create_engines(path, PROFILES[profile])
+            for path in shard_paths(str(Path(directory) / "bench.db"), count)
+        ]
+        sessionmaker = make_sessionmaker([writer for writer, _ in engines])
+        read_sessionmaker = make_sessionmaker([reader for _, reader in engines])
+        for writer, _ in engines:
+            await init_db(writer)
+        for user_id in range(1, players + 1):
+            await load_progress(sessionmaker, user_id)
+
+        write_timings: list[float] = []
+        errors = 0
+
+        async def player(user_id: int) -> None:
+            nonlocal errors
+            for seq in range(1, saves + 1):
+                started = time.perf_counter()
+                try:
+                    await save_progress_delta(
+                        sessionmaker,
+                        user_id,
+                        seq,
+                        {
+                            "score": seq * 40 + user_id,
+                            "currency": seq,
+                            "upgrades": [{"name": "auto_clicker", "level": seq}],
+                        },
+                    )
+                except OperationalError:
+                    # "database is locked" once busy_timeout runs out
+                    errors += 1
+                    continue
+                write_timings.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(player(user_id) for user_id in range(1, players + 1)))
+        elapsed = time.perf_counter() - started
+
+        # The fan-out read that every shard count has to answer.
+        leaderboard_timings = []
+        for _ in range(20):
+            leaderboard_started = time.perf_counter()
+            top = await fetch_leaderboard(read_sessionmaker, limit=100)
+            leaderboard_timings.append((time.perf_counter() - leaderboard_started) * 1000)
+        assert top[0]["user_id"] == players, top[0]
+
+        for writer, reader in engines:
+            await writer.dispose()
+            if reader is not writer:
+                await reader.dispose()
+
+    return {
+        "writes_per_second": len(write_timings) / elapsed,
+        "write_p50_ms": statistics.median(write_timings),
+        "write_p99_ms": percentile(write_timings, 0.99),
+        "leaderboard_p50_ms": statistics.median(leaderboard_timings),
+        "errors": errors,
+    }
+
+
+async def run(shard_counts: list[int], profile: str, players: int, saves: int) -> None:
+    print(
+        f"{'shards':>7} {'writes/s':>10} {'w p50':>8} {'w p99':>8} "
+        f"{'top p50':>8} {'errors':>7}"
+    )
+    for count in shard_counts:
+        result = await run_shards(count, profile, players, saves)
+        print(
+            f"{count:>7} {result['writes_per_second']:>10.0f} "
+            f"{result['write_p50_ms']:>8.2f} {result['write_p99_ms']:>8.2f} "
+            f"{result['leaderboard_p50_ms']:>8.2f} {result['errors']:>7}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shards", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--profile", choices=list(PROFILES), default="production")
+    parser.add_argument("--players", type=int, default=400)
+    parser.add_argument("--saves", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.shards, args.profile, args.players, args.saves))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Write throughput and latency of the SQLite engine profiles under load.
+
+Simulated players save deltas concurrently while others load their progress,
+once per profile in ``bot.db.base.PROFILES``::
+
+    python -m benchmarks.sqlite_profiles --players 200 --saves 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from bot.db import models  # noqa: F401
+from bot.db.base import PROFILES, create_engines, init_db
+from bot.db.func import load_progress, save_progress_delta
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run_profile(name: str, players: int, saves: int) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as directory:
+        writer, reader = create_engines(str(Path(directory) / "bench.db"), PROFILES[name])
+        sessionmaker = async_sessionmaker(writer, expire_on_commit=False)
+        read_sessionmaker = async_sessionmaker(reader, expire_on_commit=False)
+        await init_db(writer)
+        for user_id in range(1, players + 1):
+            await load_progress(sessionmaker, user_id)
+
+        write_timings: list[float] = []
+        read_timings: list[float] = []
+        errors = 0
+
+        async def player(user_id: int) -> None:
+            nonlocal errors
+            for seq in range(1, saves + 1):
+                started = time.perf_counter()
+                try:
+                    await save_progress_delta(
+                        sessionmaker,
+                        user_id,
+                        seq,
+                        {
+                            "score": seq * 40,
+                            "currency": seq,
+                            "upgrades": [{"name": "auto_clicker", "level": seq}],
+                        },
+                    )
+                except OperationalError:
+                    # "database is locked" once busy_timeout runs out
+                    errors += 1
+                    continue
+                write_timings.append((time.perf_counter() - started) * 1000)
+                started = time.perf_counter()
+                await load_progress(
+                    sessionmaker, user_id, read_sessionmaker=read_sessionmaker
+                )
+                read_timings.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(player(user_id) for user_id in range(1, players + 1)))
+        elapsed = time.perf_counter() - started
+
+        await writer.dispose()
+        if reader is not writer:
+            await reader.dispose()
+
+    return {
+        "writes_per_second": len(write_timings) / elapsed,
+        "write_p50_ms": statistics.median(write_timings),
+        "write_p99_ms": percentile(write_timings, 0.99),
+        "read_p50_ms": statistics.median(read_timings),
+        "read_p99_ms": percentile(read_timings, 0.99),
+        "errors": errors,
+    }
+
+
+async def run(profiles: list[str], players: int, saves: int) -> None:
+    print(
+        f"{'profile':>12} {'writes/s':>10} {'w p50':>8} {'w p99':>8} "
+        f"{'r p50':>8} {'r p99':>8} {'errors':>7}"
+    )
+    for name in profiles:
+        result = await run_profile(name, players, saves)
+        print(
+            f"{name:>12} {result['writes_per_second']:>10.0f} "
+            f"{result['write_p50_ms']:>8.2f} {result['write_p99_ms']:>8.2f} "
+            f"{result['read_p50_ms']:>8.2f} {result['read_p99_ms']:>8.2f} "
+            f"{result['errors']:>7}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES))
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--saves", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.profiles, args.players, args.saves))
+
+
+if __name__ == "__main__":
+    main()
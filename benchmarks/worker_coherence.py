@@ -0,0 +1,156 @@
+"""Multi-process check that worker caches converge after saves elsewhere.
+
+Starts ``--workers`` uvicorn processes of ``server:app`` on one SQLite file,
+warms the progress cache of every worker, then saves through one worker and
+polls the others until their progress and leaderboard reflect the save.
+PATCH and POST saves both go through the write-behind buffer first, so
+the bound includes SAVE_FLUSH_INTERVAL. Exits with status 1 when any read
+stays stale past its bound::
+
+    python -m benchmarks.worker_coherence --workers 3 --rounds 30
+"""
+
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def request(port: int, method: str, path: str, body: dict | None = None):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        connection.request(
+            method, path, json.dumps(body) if body is not None else None, headers
+        )
+        response = connection.getresponse()
+        data = response.read()
+        return response.status, json.loads(data) if data else None
+    finally:
+        connection.close()
+
+
+def start_worker(port: int, env: dict) -> subprocess.Popen:
+    worker = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "server:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            request(port, "GET", "/api/database?db_version=1")
+            return worker
+        except OSError:
+            if worker.poll() is not None or time.monotonic() > deadline:
+                worker.kill()
+                raise RuntimeError(f"Worker on port {port} did not start")
+            time.sleep(0.1)
+
+
+def wait_for_score(port: int, user_id: int, score: int, timeout: float) -> float | None:
+    """Seconds until the worker serves ``score``, or ``None`` after ``timeout``."""
+    started = time.monotonic()
+    while True:
+        _, progress = request(port, "GET", f"/api/clicker?user_id={user_id}")
+        _, entry = request(port, "GET", f"/api/leaderboard/rank?user_id={user_id}")
+        if progress["score"] == score and entry["score"] == score:
+            return time.monotonic() - started
+        if progress["score"] > score:
+            raise AssertionError(f"Worker on {port} served a future score")
+        if time.monotonic() - started > timeout:
+            return None
+        time.sleep(0.01)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--interval", type=float, default=0.5)
+    parser.add_argument("--flush-interval", type=float, default=0.5)
+    parser.add_argument("--port", type=int, default=18500)
+    args = parser.parse_args()
+
+    directory = tempfile.TemporaryDirectory()
+    env = dict(
+        os.environ,
+        DB_PATH=str(Path(directory.name) / "coherence.db"),
+        WEBAPP_AUTH="0",
+        SAVE_RATE="1000",
+        SAVE_BURST="1000",
+        CACHE_SYNC_INTERVAL=str(args.interval),
+        SAVE_FLUSH_INTERVAL=str(args.flush_interval),
+    )
+    ports = [args.port + index for index in range(args.workers)]
+    # One flush and one poll interval, plus the poll itself and scheduling slack.
+    bound = args.interval + args.flush_interval + 0.5
+    workers = []
+    try:
+        # One at a time: creating the schema is not safe to race.
+        for port in ports:
+            workers.append(start_worker(port, env))
+        users = list(range(1, args.users + 1))
+        for port in ports:
+            for user_id in users:
+                request(port, "GET", f"/api/clicker?user_id={user_id}")
+
+        staleness: dict[str, list[float]] = {"PATCH": [], "POST": []}
+        violations = 0
+        seqs = dict.fromkeys(users, 0)
+        for round_number in range(1, args.rounds + 1):
+            user_id = users[round_number % len(users)]
+            writer = ports[round_number % len(ports)]
+            method = "PATCH" if round_number % 2 else "POST"
+            score = round_number * 10
+            body = {"user_id": user_id, "score": score}
+            if method == "PATCH":
+                seqs[user_id] += 1
+                body["seq"] = seqs[user_id]
+            status, _ = request(writer, method, "/api/clicker", body)
+            assert status == 204, status
+            for port in ports:
+                waited = wait_for_score(port, user_id, score, bound * 4)
+                if waited is None or waited > bound:
+                    violations += 1
+                    print(f"{method} via {writer}: {port} stale for {waited} s")
+                if waited is not None:
+                    staleness[method].append(waited)
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+        directory.cleanup()
+
+    for method, values in staleness.items():
+        if values:
+            print(
+                f"{method:>5}: {len(values)} reads, staleness median "
+                f"{statistics.median(values) * 1000:.0f} ms, max "
+                f"{max(values) * 1000:.0f} ms, bound {bound * 1000:.0f} ms"
+            )
+    print(f"violations: {violations}")
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
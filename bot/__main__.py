@@ -1,5 +1,6 @@
 import asyncio
 import os
+from functools import partial
 from typing import Final
 
 from aiogram import Bot, Dispatcher, F, Router
@@ -10,10 +11,10 @@ from aiogram.types import (
     WebAppInfo,
 )
 from dotenv import load_dotenv
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from bot.db.base import sessionmaker
-from bot.jobs import update_bonus_chest
+from bot.db.shards import SessionFactory, global_sessionmaker
+from bot.jobs import ChestNotifier, SQLJobStore
 
 from .scheduler import default_scheduler as scheduler
 
@@ -21,20 +22,36 @@ load_dotenv()
 
 TOKEN: Final[str] = os.getenv("BOT_TOKEN", "")
 WEBAPP_URL: Final[str] = os.getenv("WEBAPP_URL", "")
+CHEST_NOTIFICATIONS: Final[bool] = os.getenv("CHEST_NOTIFICATIONS", "") == "1"
+JOB_TIMEOUT: Final[float] = float(os.getenv("JOB_TIMEOUT", "600"))
+JOB_JITTER: Final[float] = float(os.getenv("JOB_JITTER", "30"))
 
 
-async def startup(sessionmaker: async_sessionmaker[AsyncSession]) -> None:
+async def startup(bot: Bot, sessionmaker: SessionFactory) -> None:
     print("Startup")
-    asyncio.create_task(start_scheduler(sessionmaker=sessionmaker))
+    asyncio.create_task(start_scheduler(bot=bot, sessionmaker=sessionmaker))
 
 
-async def start_scheduler(sessionmaker: async_sessionmaker[AsyncSession]) -> None:
-    scheduler.every().day.at("08:00:00").do(
-        update_bonus_chest, sessionmaker=sessionmaker
-    )
-    while True:
-        await scheduler.run_pending()
-        await asyncio.sleep(1)
+async def start_scheduler(bot: Bot, sessionmaker: SessionFactory) -> None:
+    scheduler.store = SQLJobStore(global_sessionmaker(sessionmaker))
+    if CHEST_NOTIFICATIONS:
+        notifier = ChestNotifier(
+            sessionmaker, scheduler, notify=partial(notify_chest_ready, bot)
+        )
+        # Claimed through the store like any named job, so only one replica
+        # holds the timers of each hour.
+        (
+            scheduler.every()
+            .hour.named("schedule_chest_notifications")
+            .catch_up("once")
+            .timeout(JOB_TIMEOUT)
+            .do(notifier.schedule_upcoming)
+        )
+    await scheduler.serve()
+
+
+async def notify_chest_ready(bot: Bot, user_id: int) -> None:
+    await bot.send_message(chat_id=user_id, text="Бесплатный сундук снова доступен!")
 
 
 async def handle_start(message: Message) -> None:
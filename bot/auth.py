@@ -0,0 +1,121 @@
+import hashlib
+import hmac
+import json
+import time
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, urlencode
+
+
+@dataclass(frozen=True, slots=True)
+class WebAppSession:
+    user_id: int
+    username: str | None
+    auth_date: int
+
+
+def webapp_secret_key(bot_token: str) -> bytes:
+    """HMAC key for WebApp data, as defined by the Telegram Bot API."""
+    return hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+
+
+class InitDataVerifier:
+    """Verifies Telegram WebApp ``initData`` and caches the verified sessions.
+
+    The secret key is derived from the bot token once. Verified sessions are
+    kept by their hash for ``session_ttl`` seconds, so repeated requests of
+    one WebApp launch cost a dict lookup and a string comparison instead of
+    parsing and an HMAC. At most ``max_sessions`` are kept; the oldest go
+    first.
+    """
+
+    def __init__(
+        self,
+        bot_token: str,
+        max_age: float = 86400,
+        session_ttl: float = 300,
+        max_sessions: int = 100_000,
+    ) -> None:
+        self._secret_key = webapp_secret_key(bot_token) if bot_token else None
+        self.max_age = max_age
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        # hash -> (raw init data, session, expires_at)
+        self._sessions: dict[str, tuple[str, WebAppSession, float]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    def verify(self, init_data: str | None) -> WebAppSession | None:
+        if not init_data or self._secret_key is None:
+            self.rejected += 1
+            return None
+        now = time.monotonic()
+        received_hash = _hash_of(init_data)
+        cached = self._sessions.get(received_hash)
+        if cached is not None and cached[0] == init_data:
+            _, session, expires_at = cached
+            if expires_at > now:
+                self.hits += 1
+                return session
+            del self._sessions[received_hash]
+
+        self.misses += 1
+        session = self._check(init_data)
+        if session is None:
+            self.rejected += 1
+            return None
+        if len(self._sessions) >= self.max_sessions:
+            del self._sessions[next(iter(self._sessions))]
+        self._sessions[received_hash] = (init_data, session, now + self.session_ttl)
+        return session
+
+    def _check(self, init_data: str) -> WebAppSession | None:
+        fields = dict(parse_qsl(init_data, keep_blank_values=True))
+        received_hash = fields.pop("hash", "")
+        data_check_string = "\n".join(
+            f"{key}={value}" for key, value in sorted(fields.items())
+        )
+        expected = hmac.new(
+            self._secret_key, data_check_string.encode(), hashlib.sha256
+        ).hexdigest()
+        if not hmac.compare_digest(expected, received_hash):
+            return None
+        try:
+            auth_date = int(fields["auth_date"])
+            user = json.loads(fields["user"])
+            user_id = int(user["id"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if time.time() - auth_date > self.max_age:
+            return None
+        return WebAppSession(user_id, user.get("username"), auth_date)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejected": self.rejected,
+            "sessions": len(self._sessions),
+        }
+
+
+def _hash_of(init_data: str) -> str:
+    """The ``hash`` field, found without parsing the whole query string."""
+    start = init_data.find("hash=")
+    while start > 0 and init_data[start - 1] != "&":
+        start = init_data.find("hash=", start + 1)
+    if start < 0:
+        return ""
+    end = init_data.find("&", start)
+    return init_data[start + 5 : end if end >= 0 else None]
+
+
+def sign_init_data(bot_token: str, fields: dict[str, str]) -> str:
+    """Build signed ``initData`` the way Telegram does, for tools and benchmarks."""
+    data_check_string = "\n".join(
+        f"{key}={value}" for key, value in sorted(fields.items())
+    )
+    signature = hmac.new(
+        webapp_secret_key(bot_token), data_check_string.encode(), hashlib.sha256
+    ).hexdigest()
+    return urlencode({**fields, "hash": signature})
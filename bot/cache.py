@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic_core import from_json, to_json
+
+
+def encode_json(payload: Any) -> bytes:
+    """Compact UTF-8 JSON, encoded by pydantic-core instead of the json module."""
+    return to_json(payload)
+
+
+def make_etag(body: bytes) -> str:
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+@dataclass(slots=True, frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    expires_at: float
+
+
+class ResponseCache:
+    """TTL cache of serialized JSON responses with single-flight loading.
+
+    Concurrent misses for the same key share one call of the loader, so a
+    cold or expired entry under load costs exactly one query.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._entries: dict[Hashable, CachedResponse] = {}
+        self._inflight: dict[Hashable, asyncio.Future[CachedResponse]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> CachedResponse:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > time.monotonic():
+            self.hits += 1
+            return entry
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            body = encode_json(await loader())
+            entry = CachedResponse(
+                body=body,
+                etag=make_etag(body),
+                expires_at=time.monotonic() + self.ttl,
+            )
+            self._entries[key] = entry
+            future.set_result(entry)
+            return entry
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark the exception as retrieved when nobody else was waiting.
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+class ProgressCache:
+    """LRU cache of serialized progress per user, bounded by count and bytes.
+
+    Entries are JSON bytes, so their size is known exactly and a cached
+    progress cannot be mutated by the caller that read it. Entries older than
+    ``ttl`` seconds count as misses; the least recently used entries go first
+    when either ``max_entries`` or ``max_bytes`` is exceeded.
+
+    A load that raced with a write of the same key must not store what it
+    read before the write, so writes made while loads are in flight are
+    remembered until the last of those loads finishes.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> (body, expires_at)
+        self._entries: OrderedDict[Hashable, tuple[bytes, float]] = OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+        self._cleared_at = 0
+        self._loads = 0
+        self._written: dict[Hashable, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        body, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return from_json(body)
+
+    async def get_or_load(
+        self, key: Hashable, loader: Callable[[], Awaitable[dict | None]]
+    ) -> dict | None:
+        value = self.get(key)
+        if value is not None:
+            return value
+        started = self._generation
+        self._loads += 1
+        try:
+            value = await loader()
+        finally:
+            self._loads -= 1
+        if (
+            value is not None
+            and self._cleared_at <= started
+            and self._written.get(key, started) <= started
+        ):
+            self.put(key, value)
+        if not self._loads:
+            self._written.clear()
+        return value
+
+    def put(self, key: Hashable, value: dict) -> None:
+        body = to_json(value)
+        if len(body) > self.max_bytes:
+            self.invalidate(key)
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (body, time.monotonic() + self.ttl)
+        self._bytes += len(body)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def update(self, key: Hashable, change: Callable[[dict], None]) -> None:
+        """Apply a committed write to the cached value, if there is one."""
+        self._note_write(key)
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        value = from_json(entry[0])
+        change(value)
+        # Keep the original expiry: a write does not prove the rest is fresh.
+        expires_at = entry[1]
+        self.put(key, value)
+        if key in self._entries:
+            self._entries[key] = (self._entries[key][0], expires_at)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._note_write(key)
+        if key in self._entries:
+            self._remove(key)
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        # Loads in flight must not store what they read before the clear.
+        self._generation += 1
+        self._cleared_at = self._generation
+        self._entries.clear()
+        self._bytes = 0
+
+    def _note_write(self, key: Hashable) -> None:
+        self._generation += 1
+        if self._loads:
+            self._written[key] = self._generation
+
+    def _remove(self, key: Hashable) -> None:
+        body, _ = self._entries.pop(key)
+        self._bytes -= len(body)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
@@ -0,0 +1,152 @@
+import datetime
+import functools
+from dataclasses import dataclass
+
+MONTH_NAMES = {
+    name: number
+    for number, name in enumerate(
+        "jan feb mar apr may jun jul aug sep oct nov dec".split(), start=1
+    )
+}
+WEEKDAY_NAMES = {
+    name: number
+    for number, name in enumerate("sun mon tue wed thu fri sat".split())
+}
+ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+}
+# Long enough for any expression that matches at all, e.g. "0 0 29 2 1".
+MAX_SEARCH_YEARS = 28
+
+
+def _next_bit(mask: int, value: int) -> int | None:
+    """Smallest set bit of ``mask`` at or above ``value``."""
+    rest = mask >> value
+    if not rest:
+        return None
+    return value + (rest & -rest).bit_length() - 1
+
+
+def _parse_value(text: str, names: dict[str, int]) -> int:
+    value = names.get(text.lower())
+    if value is not None:
+        return value
+    if not text.isdigit():
+        raise ValueError(f"Invalid cron value {text!r}")
+    return int(text)
+
+
+def _parse_field(text: str, first: int, last: int, names: dict[str, int]) -> int:
+    mask = 0
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise ValueError(f"Invalid cron step {step_text!r}")
+            step = int(step_text)
+        if part == "*":
+            start, stop = first, last
+        elif "-" in part:
+            start_text, stop_text = part.split("-", 1)
+            start = _parse_value(start_text, names)
+            stop = _parse_value(stop_text, names)
+        else:
+            start = stop = _parse_value(part, names)
+            if step != 1:
+                stop = last
+        if not first <= start <= stop <= last:
+            raise ValueError(f"Cron range {part!r} is outside {first}-{last}")
+        for value in range(start, stop + 1, step):
+            mask |= 1 << value
+    return mask
+
+
+@dataclass(frozen=True, slots=True)
+class CronSpec:
+    """A cron expression as one bitmask per field.
+
+    Bit ``n`` of a mask is set when value ``n`` matches, so checking a field
+    is a shift and jumping to the next matching value is a bit trick instead
+    of a loop over every minute.
+    """
+
+    expression: str
+    minutes: int
+    hours: int
+    days: int
+    months: int
+    weekdays: int
+    # Day of month and day of week are ORed when both are restricted. Like
+    # Vixie cron, a field starting with "*" (also "*/2") counts as unrestricted.
+    any_day: bool
+    any_weekday: bool
+
+    def _day_matches(self, moment: datetime.datetime) -> bool:
+        day = (self.days >> moment.day) & 1
+        # Python counts weekdays from Monday, cron from Sunday.
+        weekday = (self.weekdays >> ((moment.weekday() + 1) % 7)) & 1
+        if self.any_day or self.any_weekday:
+            return bool(day and weekday)
+        return bool(day or weekday)
+
+    def next_after(self, moment: datetime.datetime) -> datetime.datetime:
+        """The first matching minute strictly after ``moment`` (wall time)."""
+        candidate = moment.replace(second=0, microsecond=0) + datetime.timedelta(
+            minutes=1
+        )
+        limit = candidate.year + MAX_SEARCH_YEARS
+        while candidate.year <= limit:
+            month = _next_bit(self.months, candidate.month)
+            if month is None:
+                candidate = datetime.datetime(candidate.year + 1, 1, 1)
+                continue
+            if month != candidate.month:
+                candidate = datetime.datetime(candidate.year, month, 1)
+            if not self._day_matches(candidate):
+                candidate = datetime.datetime.combine(
+                    candidate.date() + datetime.timedelta(days=1), datetime.time()
+                )
+                continue
+            hour = _next_bit(self.hours, candidate.hour)
+            if hour is None:
+                candidate = datetime.datetime.combine(
+                    candidate.date() + datetime.timedelta(days=1), datetime.time()
+                )
+                continue
+            if hour != candidate.hour:
+                candidate = candidate.replace(hour=hour, minute=0)
+            minute = _next_bit(self.minutes, candidate.minute)
+            if minute is None:
+                candidate = candidate.replace(minute=0) + datetime.timedelta(hours=1)
+                continue
+            return candidate.replace(minute=minute)
+        raise ValueError(f"Cron expression {self.expression!r} never matches")
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_cron(expression: str) -> CronSpec:
+    """Parse a five-field cron expression; identical expressions share a spec."""
+    fields = ALIASES.get(expression.strip().lower(), expression).split()
+    if len(fields) != 5:
+        raise ValueError(f"Cron expression {expression!r} should have 5 fields")
+    weekday_mask = _parse_field(fields[4], 0, 7, WEEKDAY_NAMES)
+    # 7 is Sunday as well.
+    if weekday_mask >> 7:
+        weekday_mask = (weekday_mask | 1) & 0x7F
+    return CronSpec(
+        expression=expression,
+        minutes=_parse_field(fields[0], 0, 59, {}),
+        hours=_parse_field(fields[1], 0, 23, {}),
+        days=_parse_field(fields[2], 1, 31, {}),
+        months=_parse_field(fields[3], 1, 12, MONTH_NAMES),
+        weekdays=weekday_mask,
+        any_day=fields[2].startswith("*"),
+        any_weekday=fields[4].startswith("*"),
+    )
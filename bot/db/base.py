@@ -1,14 +1,20 @@
+import os
+from dataclasses import dataclass
 from typing import Any
 
+from sqlalchemy import event
 from sqlalchemy.dialects.sqlite import INTEGER
 from sqlalchemy.ext.asyncio import (
     AsyncAttrs,
     AsyncEngine,
-    async_sessionmaker,
     create_async_engine,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
+from ..tracing import TracedQueuePool
+from .migrations import migrate
+from .shards import make_sessionmaker, shard_paths
+
 
 class Base(DeclarativeBase, AsyncAttrs):
     id: Mapped[int] = mapped_column(INTEGER, primary_key=True, autoincrement=True)
@@ -30,21 +36,108 @@ class Base(DeclarativeBase, AsyncAttrs):
         return f"<{self.__class__.__name__} {', '.join(cols)}>"
 
 
-engine: AsyncEngine = create_async_engine(
-    url="sqlite+aiosqlite:///clicker.db",
-    max_overflow=10,
-    pool_size=100,
-    pool_pre_ping=True,
-    pool_recycle=900,
-)
+@dataclass(frozen=True, slots=True)
+class SQLiteProfile:
+    """Connection PRAGMAs and pool layout of the SQLite engines.
+
+    ``None`` leaves a PRAGMA at the SQLite default. With ``readers`` set, reads
+    go through their own pool of read-only connections while every write is
+    serialized through ``writer_pool_size`` connections, which for SQLite's
+    single writer should stay 1.
+    """
+
+    journal_mode: str | None = "wal"
+    synchronous: str | None = "normal"
+    busy_timeout: int = 5000
+    mmap_size: int | None = 256 * 1024 * 1024
+    cache_size: int | None = -64 * 1024
+    temp_store: str | None = "memory"
+    writer_pool_size: int = 1
+    writer_max_overflow: int = 0
+    readers: int = 4
+
+    def pragmas(self, read_only: bool = False) -> list[str]:
+        pragmas = [f"PRAGMA busy_timeout = {self.busy_timeout}"]
+        # The journal mode is persistent and can only be changed by a writer.
+        if self.journal_mode is not None and not read_only:
+            pragmas.append(f"PRAGMA journal_mode = {self.journal_mode}")
+        for name in ("synchronous", "mmap_size", "cache_size", "temp_store"):
+            value = getattr(self, name)
+            if value is not None:
+                pragmas.append(f"PRAGMA {name} = {value}")
+        return pragmas
+
+
+PROFILES: dict[str, SQLiteProfile] = {
+    "production": SQLiteProfile(),
+    # The previous setup: rollback journal and a large pool shared by reads
+    # and writes. Kept for comparison in benchmarks.
+    "legacy": SQLiteProfile(
+        journal_mode=None,
+        synchronous=None,
+        mmap_size=None,
+        cache_size=None,
+        temp_store=None,
+        writer_pool_size=100,
+        writer_max_overflow=10,
+        readers=0,
+    ),
+}
+
+DB_PATH = os.getenv("DB_PATH", "clicker.db")
+DB_PROFILE = PROFILES[os.getenv("DB_PROFILE", "production")]
+# Users are spread over this many files by a hash of their id, each with its
+# own writer; resharding an existing database is `python -m bot.db.reshard`.
+DB_SHARDS = int(os.getenv("DB_SHARDS", "1"))
+
+
+def _apply_pragmas(engine: AsyncEngine, pragmas: list[str]) -> None:
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def create_engines(path: str, profile: SQLiteProfile) -> tuple[AsyncEngine, AsyncEngine]:
+    """Create the writer and reader engines of a database file.
+
+    Without dedicated readers both names point at the writer engine. The
+    pools record how long requests wait for a connection.
+    """
+    writer = create_async_engine(
+        url=f"sqlite+aiosqlite:///{path}",
+        poolclass=TracedQueuePool,
+        pool_size=profile.writer_pool_size,
+        max_overflow=profile.writer_max_overflow,
+    )
+    _apply_pragmas(writer, profile.pragmas())
+    if not profile.readers:
+        return writer, writer
+    reader = create_async_engine(
+        url=f"sqlite+aiosqlite:///file:{path}?mode=ro&uri=true",
+        poolclass=TracedQueuePool,
+        pool_size=profile.readers,
+        max_overflow=0,
+    )
+    _apply_pragmas(reader, profile.pragmas(read_only=True))
+    return writer, reader
+
+
+# (writer, reader) per shard; the first shard also keeps the global tables.
+db_engines = [create_engines(path, DB_PROFILE) for path in shard_paths(DB_PATH, DB_SHARDS)]
+engine, read_engine = db_engines[0]
 
-sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+sessionmaker = make_sessionmaker([writer for writer, _ in db_engines])
+read_sessionmaker = make_sessionmaker([reader for _, reader in db_engines])
 
 
 async def init_db(engine: AsyncEngine) -> None:
     async with engine.begin() as conn:
         # await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(migrate)
 
 
 async def close_db(engine: AsyncEngine) -> None:
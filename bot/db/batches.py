@@ -0,0 +1,94 @@
+"""Table-wide maintenance statements run one primary-key range at a time."""
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import ColumnElement, Executable, delete, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .models import JobCheckpoint
+
+logger = logging.getLogger("fastapi")
+
+
+@dataclass(slots=True)
+class BatchStats:
+    rows: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    resumed_from: int = 0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+async def run_in_batches(
+    sessionmaker: async_sessionmaker[AsyncSession],
+    name: str,
+    primary_key: ColumnElement[int],
+    make_statement: Callable[[int, int], Executable],
+    chunk_size: int = 1000,
+    pause: float = 0.05,
+) -> BatchStats:
+    """Run a table-wide maintenance statement one primary-key range at a time.
+
+    ``make_statement(start, stop)`` must only touch rows with
+    ``start < pk <= stop``. Every chunk commits together with a checkpoint
+    row in ``job_checkpoints``, so the write lock is held for one chunk only
+    and an interrupted run resumes after the last committed chunk. Between
+    chunks the loop sleeps ``pause`` seconds to let other writers in.
+    """
+    async with sessionmaker() as session:
+        start = (
+            await session.scalar(
+                select(JobCheckpoint.last_id).where(JobCheckpoint.name == name)
+            )
+            or 0
+        )
+        last_id = await session.scalar(select(func.max(primary_key))) or 0
+
+    stats = BatchStats(resumed_from=start)
+    started = time.perf_counter()
+    while start < last_id:
+        stop = start + chunk_size
+        async with sessionmaker() as session:
+            result = await session.execute(
+                make_statement(start, stop).execution_options(
+                    synchronize_session=False
+                )
+            )
+            checkpoint = insert(JobCheckpoint).values(name=name, last_id=stop)
+            await session.execute(
+                checkpoint.on_conflict_do_update(
+                    index_elements=[JobCheckpoint.name],
+                    set_={
+                        "last_id": checkpoint.excluded.last_id,
+                        "updated_at": datetime.utcnow(),
+                    },
+                )
+            )
+            await session.commit()
+        stats.rows += max(result.rowcount, 0)
+        stats.chunks += 1
+        start = stop
+        await asyncio.sleep(pause)
+
+    async with sessionmaker() as session:
+        await session.execute(delete(JobCheckpoint).where(JobCheckpoint.name == name))
+        await session.commit()
+    stats.seconds = time.perf_counter() - started
+    logger.info(
+        "Batch job %s: %d rows in %d chunks, %.1fs (%.0f rows/s)",
+        name,
+        stats.rows,
+        stats.chunks,
+        stats.seconds,
+        stats.rows_per_second,
+    )
+    return stats
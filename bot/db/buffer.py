@@ -0,0 +1,216 @@
+import asyncio
+import logging
+
+from ..cache import ProgressCache
+from ..leaderboard import Leaderboard
+from .changes import ChangeFeed
+from .func import save_progress_many
+from .shards import SessionFactory
+
+logger = logging.getLogger("fastapi")
+
+
+def merge_progress(current: dict, incoming: dict) -> dict:
+    """Fold a newer progress payload into an older one.
+
+    Scalars are overwritten, upgrades are merged by name (newest level wins)
+    and owned skins are unioned, so the result is equivalent to applying both
+    payloads one after another.
+    """
+    for key, value in incoming.items():
+        if key == "seq":
+            current[key] = max(current.get(key, 0), value)
+        elif key == "upgrades":
+            levels = {upgrade["name"]: upgrade for upgrade in current.get(key, [])}
+            levels.update((upgrade["name"], upgrade) for upgrade in value)
+            current[key] = list(levels.values())
+        elif key == "owned_skins":
+            skins = dict.fromkeys(current.get(key, []))
+            skins.update(dict.fromkeys(value))
+            current[key] = list(skins)
+        else:
+            current[key] = value
+    return current
+
+
+class ProgressBuffer:
+    """Write-behind buffer that coalesces progress saves per user.
+
+    Incoming payloads are merged into the latest pending progress of the user
+    and dirty users are written in batched transactions, either every
+    ``flush_interval`` seconds or as soon as ``max_pending`` users are dirty.
+    Deltas carry the ``seq`` of their save; the highest one of a user is kept
+    and checked against the stored one when the user is written, and
+    ``pending_seq`` lets callers refuse stale deltas before they are queued.
+    When a batch fails its users are retried one by one, so a bad payload
+    only holds back its own user, and is dropped after ``max_attempts``.
+    Written progress is folded into ``cache``, ranked in ``leaderboard`` and
+    announced to the other workers through ``changes`` when those are given,
+    so none of them ever shows a save that was dropped.
+    """
+
+    def __init__(
+        self,
+        sessionmaker: SessionFactory,
+        flush_interval: float = 1.0,
+        max_pending: int = 500,
+        batch_size: int = 200,
+        max_attempts: int = 3,
+        cache: ProgressCache | None = None,
+        changes: ChangeFeed | None = None,
+        leaderboard: Leaderboard | None = None,
+    ) -> None:
+        self.sessionmaker = sessionmaker
+        self.cache = cache
+        self.leaderboard = leaderboard
+        self.changes = changes
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._pending: dict[int, dict] = {}
+        # Highest seq queued per user, kept until the save is written or dropped.
+        self._seqs: dict[int, int] = {}
+        # Failed writes per user, reset once the user is written.
+        self._attempts: dict[int, int] = {}
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self.received = 0
+        self.coalesced = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def put(self, progress: dict) -> None:
+        user_id = progress.pop("user_id")
+        self.received += 1
+        if "seq" in progress:
+            self._seqs[user_id] = max(self._seqs.get(user_id, 0), progress["seq"])
+        pending = self._pending.get(user_id)
+        if pending is None:
+            self._pending[user_id] = progress
+        else:
+            merge_progress(pending, progress)
+            self.coalesced += 1
+        if len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+
+    def pending_seq(self, user_id: int) -> int:
+        """The highest seq of a user that is queued or being written, else 0."""
+        return self._seqs.get(user_id, 0)
+
+    async def flush_user(self, user_id: int) -> None:
+        if user_id not in self._pending and not self._lock.locked():
+            return
+        # Taking the lock also waits for a batch that may hold this user.
+        async with self._lock:
+            progress = self._pending.pop(user_id, None)
+            if progress is not None:
+                await self._write({user_id: progress})
+
+    async def flush(self) -> int:
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            user_ids = list(pending)
+            written = 0
+            for start in range(0, len(user_ids), self.batch_size):
+                batch = {
+                    user_id: pending[user_id]
+                    for user_id in user_ids[start : start + self.batch_size]
+                }
+                written += await self._write(batch)
+            return written
+
+    async def _write(self, batch: dict[int, dict]) -> int:
+        try:
+            saved = await save_progress_many(
+                self.sessionmaker, batch, cache=self.cache, changes=self.changes
+            )
+        except Exception:
+            self.failures += 1
+            if len(batch) == 1:
+                self._retry_later(batch)
+                return 0
+            logger.exception(
+                "Failed to flush progress of %d users, retrying one by one",
+                len(batch),
+            )
+            written = 0
+            for user_id, progress in batch.items():
+                written += await self._write({user_id: progress})
+            return written
+        self.flushes += 1
+        self.flushed += len(batch)
+        for user_id, progress in batch.items():
+            self._attempts.pop(user_id, None)
+            self._forget_seq(user_id, progress)
+        if self.leaderboard is not None:
+            for user_id in saved:
+                progress = batch[user_id]
+                self.leaderboard.update(
+                    user_id, score=progress.get("score"), level=progress.get("level")
+                )
+        return len(saved)
+
+    def _retry_later(self, batch: dict[int, dict]) -> None:
+        [(user_id, progress)] = batch.items()
+        attempts = self._attempts.get(user_id, 0) + 1
+        if attempts >= self.max_attempts:
+            self._attempts.pop(user_id, None)
+            self._forget_seq(user_id, progress)
+            self.dropped += 1
+            logger.exception(
+                "Dropping progress of user %d after %d failed writes: %r",
+                user_id,
+                attempts,
+                progress,
+            )
+            return
+        self._attempts[user_id] = attempts
+        logger.exception("Failed to flush progress of user %d", user_id)
+        newer = self._pending.get(user_id)
+        if newer is not None:
+            merge_progress(progress, newer)
+        self._pending[user_id] = progress
+
+    def _forget_seq(self, user_id: int, progress: dict) -> None:
+        # A newer delta queued during the write keeps its own seq.
+        if "seq" in progress and self._seqs.get(user_id) == progress["seq"]:
+            del self._seqs[user_id]
+
+    async def _serve(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            # Shielded so that stop() never drops a batch that is half written.
+            await asyncio.shield(self.flush())
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._serve())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "pending": len(self._pending),
+        }
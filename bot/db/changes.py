@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import secrets
+import time
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import ProgressChange
+from .shards import SessionFactory, each_shard, fan_out
+
+logger = logging.getLogger("fastapi")
+
+
+class ChangeFeed:
+    """Tells the workers sharing a database which users the others changed.
+
+    Every save appends the user to ``progress_changes`` in the transaction of
+    the save, tagged with the origin of this worker. ``poll`` reads the rows
+    added since the last poll, at most once per ``interval`` seconds, so a
+    worker that polls before serving from its caches serves data at most
+    ``interval`` seconds (plus one poll) behind the database. Rows older than
+    ``retention`` seconds are pruned; a worker that has not polled for that
+    long cannot know what it missed and has to drop its caches. With shards,
+    changes are recorded in the shard of the user and every shard is polled.
+    """
+
+    def __init__(
+        self,
+        sessionmaker: SessionFactory,
+        read_sessionmaker: SessionFactory,
+        interval: float = 1.0,
+        retention: float = 600.0,
+    ) -> None:
+        self.sessionmaker = sessionmaker
+        self.read_sessionmaker = read_sessionmaker
+        self.interval = interval
+        self.retention = retention
+        self.origin = secrets.token_hex(8)
+        # Last seen change id per shard.
+        self._last_ids: list[int] | None = None
+        self._polled_at = 0.0
+        self._pruned_at = 0.0
+        self._lock = asyncio.Lock()
+        self.polls = 0
+        self.changes = 0
+        self.resets = 0
+
+    async def record(self, session: AsyncSession, user_ids: Iterable[int]) -> None:
+        """Add the changed users to the transaction of a save."""
+        rows = [{"user_id": user_id, "origin": self.origin} for user_id in user_ids]
+        if rows:
+            await session.execute(insert(ProgressChange).values(rows))
+
+    async def start(self) -> None:
+        """Skip the history; the caches of this worker are still empty."""
+
+        async def last_id(shard) -> int:
+            async with shard() as session:
+                return await session.scalar(select(func.max(ProgressChange.id))) or 0
+
+        self._last_ids = await fan_out(self.read_sessionmaker, last_id)
+        self._polled_at = time.monotonic()
+
+    async def poll(self) -> list[int] | None:
+        """Users changed by other workers since the last poll.
+
+        Returns an empty list while the last poll is recent enough and
+        ``None`` when changes may have been pruned before this worker saw
+        them.
+        """
+        if time.monotonic() - self._polled_at < self.interval:
+            return []
+        async with self._lock:
+            started = time.monotonic()
+            if started - self._polled_at < self.interval:
+                return []
+            if self._last_ids is None or started - self._polled_at >= self.retention:
+                await self.start()
+                self.resets += 1
+                return None
+            shards = each_shard(self.read_sessionmaker)
+
+            async def changes(index: int):
+                async with shards[index]() as session:
+                    return (
+                        await session.execute(
+                            select(
+                                ProgressChange.id,
+                                ProgressChange.user_id,
+                                ProgressChange.origin,
+                            )
+                            .where(ProgressChange.id > self._last_ids[index])
+                            .order_by(ProgressChange.id)
+                        )
+                    ).all()
+
+            results = await asyncio.gather(*(changes(index) for index in range(len(shards))))
+            self._polled_at = started
+            self.polls += 1
+            for index, rows in enumerate(results):
+                if rows:
+                    self._last_ids[index] = rows[-1].id
+            user_ids = list(
+                dict.fromkeys(
+                    row.user_id
+                    for rows in results
+                    for row in rows
+                    if row.origin != self.origin
+                )
+            )
+            self.changes += len(user_ids)
+            if started - self._pruned_at >= self.retention / 10:
+                self._pruned_at = started
+                try:
+                    await self.prune()
+                except Exception:
+                    # Pruning is housekeeping; the next worker to poll retries.
+                    logger.exception("Failed to prune progress changes")
+            return user_ids
+
+    async def prune(self) -> int:
+        expired_before = datetime.utcnow() - timedelta(seconds=self.retention)
+
+        async def prune_shard(shard) -> int:
+            async with shard() as session:
+                result = await session.execute(
+                    delete(ProgressChange).where(
+                        ProgressChange.changed_at < expired_before
+                    )
+                )
+                await session.commit()
+            return result.rowcount
+
+        return sum(await fan_out(self.sessionmaker, prune_shard))
+
+    def stats(self) -> dict[str, int]:
+        return {"polls": self.polls, "changes": self.changes, "resets": self.resets}
@@ -0,0 +1,119 @@
+"""Remove duplicated owned skins in small batches.
+
+Older versions appended the full skin list on every save, so ``owned_skins``
+holds many copies of each ``(user_id, name)`` pair. The schema migration
+compacts the table before building the unique index, but on a large live
+database that is one long write transaction. Running this tool first::
+
+    python -m bot.db.compact_skins
+
+deletes the duplicates in short id-range transactions with a pause between
+them, so concurrent saves keep going and the migration has nothing left to do.
+Every batch commits with a checkpoint (``bot.db.batches``), so an interrupted
+run picks up after the last committed batch.
+"""
+
+import asyncio
+import logging
+
+from sqlalchemy import Connection, Delete, column, delete, exists, select, table
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger("fastapi")
+
+HELPER_INDEX = "ix_owned_skins_compact"
+# The migrations use this module before the models are imported.
+owned_skins = table("owned_skins", column("id"), column("user_id"), column("name"))
+
+
+def has_duplicates(conn: Connection) -> bool:
+    return (
+        conn.exec_driver_sql(
+            "SELECT 1 FROM owned_skins GROUP BY user_id, name HAVING COUNT(*) > 1 LIMIT 1"
+        ).first()
+        is not None
+    )
+
+
+def create_helper_index(conn: Connection) -> None:
+    conn.exec_driver_sql(
+        f"CREATE INDEX IF NOT EXISTS {HELPER_INDEX} ON owned_skins (user_id, name, id)"
+    )
+
+
+def drop_helper_index(conn: Connection) -> None:
+    conn.exec_driver_sql(f"DROP INDEX IF EXISTS {HELPER_INDEX}")
+
+
+def id_bounds(conn: Connection) -> tuple[int, int]:
+    low, high = conn.exec_driver_sql("SELECT MIN(id), MAX(id) FROM owned_skins").one()
+    return low or 0, high or 0
+
+
+def compact_statement(start: int, stop: int) -> Delete:
+    """Delete every row with ``start < id <= stop`` that has an older duplicate."""
+    older = owned_skins.alias("older")
+    return delete(owned_skins).where(
+        owned_skins.c.id > start,
+        owned_skins.c.id <= stop,
+        exists(
+            select(older.c.id).where(
+                older.c.user_id == owned_skins.c.user_id,
+                older.c.name == owned_skins.c.name,
+                older.c.id < owned_skins.c.id,
+            )
+        ),
+    )
+
+
+def compact_all(conn: Connection, batch_size: int = 5000) -> int:
+    """Compact the whole table on one connection, used by the migration."""
+    create_helper_index(conn)
+    low, high = id_bounds(conn)
+    deleted = 0
+    for start in range(low - 1, high, batch_size):
+        deleted += conn.execute(compact_statement(start, start + batch_size)).rowcount
+    drop_helper_index(conn)
+    return deleted
+
+
+async def compact_owned_skins(
+    sessionmaker: async_sessionmaker[AsyncSession],
+    batch_size: int = 5000,
+    pause: float = 0.05,
+) -> int:
+    """Compact the table committing every batch, so no write lock is held long."""
+    from .batches import run_in_batches
+
+    async with sessionmaker() as session:
+        await (await session.connection()).run_sync(create_helper_index)
+        await session.commit()
+
+    stats = await run_in_batches(
+        sessionmaker,
+        "compact_owned_skins",
+        owned_skins.c.id,
+        compact_statement,
+        chunk_size=batch_size,
+        pause=pause,
+    )
+
+    async with sessionmaker() as session:
+        await (await session.connection()).run_sync(drop_helper_index)
+        await session.commit()
+    return stats.rows
+
+
+async def main() -> None:
+    from .base import close_db, db_engines
+
+    logging.basicConfig(level=logging.INFO)
+    for engine, _ in db_engines:
+        sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+        deleted = await compact_owned_skins(sessionmaker)
+        logger.info("Removed %d duplicated owned skins from %s", deleted, engine.url)
+        await close_db(engine)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,60 +1,400 @@
+import asyncio
 import logging
+import os
+from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import case, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
+from ..cache import ProgressCache
+from .changes import ChangeFeed
 from .models import OwnedSkin, Upgrade, User
+from .shards import SessionFactory, fan_out, for_user, group_by_shard
 
 logger = logging.getLogger("fastapi")
 
+PROGRESS_COLUMNS = ("score", "level", "currency", "active_skin")
+CHEST_COOLDOWN = timedelta(hours=float(os.getenv("CHEST_COOLDOWN_HOURS", "24")))
+CHEST_COOLDOWN_MS = int(CHEST_COOLDOWN.total_seconds() * 1000)
+PROGRESS_CACHE_ENTRIES = int(os.getenv("PROGRESS_CACHE_ENTRIES", "50000"))
+PROGRESS_CACHE_BYTES = int(os.getenv("PROGRESS_CACHE_MB", "32")) * 1024 * 1024
+PROGRESS_CACHE_TTL = float(os.getenv("PROGRESS_CACHE_TTL", "600"))
+
+progress_cache = ProgressCache(
+    max_entries=PROGRESS_CACHE_ENTRIES,
+    max_bytes=PROGRESS_CACHE_BYTES,
+    ttl=PROGRESS_CACHE_TTL,
+)
+
+
+def open_chest_values() -> dict:
+    """Column values that record opening the free chest.
+
+    The cooldown only restarts when the chest was actually available, so a
+    retried ``open_free_chest`` cannot extend it.
+    """
+    now = datetime.utcnow()
+    return {
+        "chest_opened_at": case(
+            (
+                User.chest_opened_at.is_(None)
+                | (User.chest_opened_at <= now - CHEST_COOLDOWN),
+                now,
+            ),
+            else_=User.chest_opened_at,
+        ),
+    }
+
+
+def epoch_ms(moment: datetime | None) -> int | None:
+    if moment is None:
+        return None
+    return int(moment.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
 
 def upgrades_to_dict(upgrades: list[Upgrade]):
     return [upgrade.to_dict() for upgrade in upgrades]
 
 
-async def save_upgrades(upgrades_loaded: list, upgrades_db: list[Upgrade]):
-    for upgrade in upgrades_loaded:
-        name, level = upgrade.values()
-        upgrade_exist = [upgrade for upgrade in upgrades_db if upgrade.name == name]
-        if upgrade_exist:
-            upgrade_exist[0].level = level
-        else:
-            upgrades_db.append(Upgrade(name=name, level=level))
-
-
-async def save_progress(sessionmaker: async_sessionmaker[AsyncSession], progress: dict):
-    user_id = progress.pop("user_id")
-    async with sessionmaker() as session:
-        user = await session.scalar(select(User).where(User.user_id == user_id))
-        if not user:
-            return
-        for key, value in progress.items():
-            if key == "upgrades":
-                upgrades: list[Upgrade] = await user.awaitable_attrs.upgrades
-                await save_upgrades(value, upgrades)
-                continue
-            elif key == "owned_skins":
-                skins: list[OwnedSkin] = await user.awaitable_attrs.owned_skins
-                skins.extend([OwnedSkin(name=name) for name in value])
-                continue
-            try:
-                setattr(user, key, value)
-            except Exception:
-                pass
+async def upsert_upgrades(
+    session: AsyncSession, user_pk: int, upgrades_loaded: list
+) -> None:
+    """Write the levels of the given upgrades with a single statement."""
+    levels = {upgrade["name"]: upgrade["level"] for upgrade in upgrades_loaded}
+    if not levels:
+        return
+    stmt = insert(Upgrade).values(
+        [
+            {"user_id": user_pk, "name": name, "level": level}
+            for name, level in levels.items()
+        ]
+    )
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[Upgrade.user_id, Upgrade.name],
+            set_={"level": stmt.excluded.level},
+        )
+    )
+
+
+async def apply_progress(session: AsyncSession, user: User, progress: dict):
+    for key, value in progress.items():
+        if key == "upgrades":
+            await upsert_upgrades(session, user.id, value)
+            continue
+        elif key == "owned_skins":
+            await add_owned_skins(session, user.id, value)
+            continue
+        elif key == "open_free_chest":
+            if value is True:
+                for column, expression in open_chest_values().items():
+                    setattr(user, column, expression)
+            continue
+        # Payloads are validated by bot.schemas; other keys (user_id, seq,
+        # has_free_chest, chest_ready_at) are not columns.
+        if key in PROGRESS_COLUMNS:
+            setattr(user, key, value)
+
+
+def apply_to_cached(stored: dict, progress: dict, seq: int | None = None) -> None:
+    """Fold a committed save into a cached progress, like the database did."""
+    for key in PROGRESS_COLUMNS:
+        if key in progress:
+            stored[key] = progress[key]
+    if progress.get("upgrades"):
+        levels = {
+            name: level for upgrade in stored["upgrades"] for name, level in upgrade.items()
+        }
+        levels.update((upgrade["name"], upgrade["level"]) for upgrade in progress["upgrades"])
+        stored["upgrades"] = [{name: level} for name, level in levels.items()]
+    if progress.get("owned_skins"):
+        skins = dict.fromkeys(stored["owned_skins"])
+        skins.update(dict.fromkeys(progress["owned_skins"]))
+        stored["owned_skins"] = list(skins)
+    if seq is not None:
+        stored["save_seq"] = seq
+
+
+def remember_save(
+    cache: ProgressCache | None, user_id: int, progress: dict, seq: int | None = None
+) -> None:
+    if cache is None:
+        return
+    if progress.get("open_free_chest") is True:
+        # When the chest was opened is decided in SQL; read it again next time.
+        cache.invalidate(user_id)
+        return
+    cache.update(user_id, lambda stored: apply_to_cached(stored, progress, seq))
+
+
+async def claim_seq(session: AsyncSession, user_pk: int, seq: int) -> bool:
+    """Store ``seq`` as the latest save of a user unless a newer one is stored."""
+    claimed = await session.scalar(
+        update(User)
+        .where(User.id == user_pk, User.save_seq < seq)
+        .values(save_seq=seq)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    return claimed is not None
+
+
+async def fetch_save_seq(
+    sessionmaker: SessionFactory, user_id: int, cache: ProgressCache | None = None
+) -> int | None:
+    """The sequence number of the last stored save; ``None`` for unknown users."""
+    stored = cache.get(user_id) if cache is not None else None
+    if stored is not None:
+        return stored["save_seq"]
+    async with for_user(sessionmaker, user_id)() as session:
+        return await session.scalar(select(User.save_seq).where(User.user_id == user_id))
+
+
+async def save_progress_many(
+    sessionmaker: SessionFactory,
+    progresses: dict[int, dict],
+    cache: ProgressCache | None = None,
+    changes: ChangeFeed | None = None,
+) -> list[int]:
+    """Apply progress for several users keyed by user_id.
+
+    The users of one shard are saved in one transaction; shards are written
+    concurrently. A progress with a ``seq`` is only applied when it is newer
+    than the stored one. Returns the user ids that were saved; unknown users
+    and stale progress are skipped.
+    """
+
+    async def save_shard(shard, user_ids: list[int]) -> list[int]:
+        async with shard() as session:
+            users = await session.scalars(select(User).where(User.user_id.in_(user_ids)))
+            saved = []
+            for user in users:
+                progress = progresses[user.user_id]
+                if "seq" in progress and not await claim_seq(
+                    session, user.id, progress["seq"]
+                ):
+                    continue
+                await apply_progress(session, user, progress)
+                saved.append(user.user_id)
+            if changes is not None:
+                await changes.record(session, saved)
+            await session.commit()
+        return saved
+
+    groups = group_by_shard(sessionmaker, progresses)
+    if len(groups) == 1:
+        results = [await save_shard(*groups[0])]
+    else:
+        results = await asyncio.gather(*(save_shard(*group) for group in groups))
+    saved = [user_id for user_ids in results for user_id in user_ids]
+    for user_id in saved:
+        remember_save(
+            cache, user_id, progresses[user_id], progresses[user_id].get("seq")
+        )
+    return saved
+
+
+async def add_owned_skins(session: AsyncSession, user_pk: int, names: list) -> None:
+    """Insert the skins the user does not own yet; owned skins are a set."""
+    if not names:
+        return
+    await session.execute(
+        insert(OwnedSkin)
+        .values([{"user_id": user_pk, "name": name} for name in dict.fromkeys(names)])
+        .on_conflict_do_nothing(index_elements=[OwnedSkin.user_id, OwnedSkin.name])
+    )
+
+
+async def save_progress_delta(
+    sessionmaker: SessionFactory,
+    user_id: int,
+    seq: int,
+    delta: dict,
+    cache: ProgressCache | None = None,
+    changes: ChangeFeed | None = None,
+) -> tuple[bool, int | None]:
+    """Apply only the changed fields of a progress, guarded by a sequence number.
+
+    Returns whether the delta was applied together with the sequence number
+    stored for the user, which is ``None`` for an unknown user.
+    """
+    values = {key: delta[key] for key in PROGRESS_COLUMNS if key in delta}
+    if delta.get("open_free_chest") is True:
+        values.update(open_chest_values())
+    async with for_user(sessionmaker, user_id)() as session:
+        user_pk = await session.scalar(
+            update(User)
+            .where(User.user_id == user_id, User.save_seq < seq)
+            .values(save_seq=seq, **values)
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        )
+        if user_pk is None:
+            stored_seq = await session.scalar(
+                select(User.save_seq).where(User.user_id == user_id)
+            )
+            return False, stored_seq
+        if delta.get("upgrades"):
+            await upsert_upgrades(session, user_pk, delta["upgrades"])
+        if delta.get("owned_skins"):
+            await add_owned_skins(session, user_pk, delta["owned_skins"])
+        if changes is not None:
+            await changes.record(session, [user_id])
         await session.commit()
+    remember_save(cache, user_id, delta, seq)
+    return True, seq
+
+
+async def select_full_user(session: AsyncSession, user_id: int) -> User | None:
+    # Relationships are lazy="raise"; the full progress comes from one joined
+    # query instead of a query per relationship.
+    result = await session.scalars(
+        select(User)
+        .options(joinedload(User.upgrades), joinedload(User.owned_skins))
+        .where(User.user_id == user_id)
+    )
+    return result.unique().one_or_none()
+
+
+def with_chest_state(stored: dict, now: datetime | None = None) -> dict:
+    """Add the chest fields that depend on the current time to a progress.
+
+    The free chest is derived from when it was last opened, not stored.
+    """
+    opened_at = stored.pop("chest_opened_at")
+    ready_at = None if opened_at is None else opened_at + CHEST_COOLDOWN_MS
+    stored["has_free_chest"] = ready_at is None or ready_at <= epoch_ms(
+        now or datetime.utcnow()
+    )
+    stored["chest_ready_at"] = ready_at
+    # The client counts the cooldown down itself after opening the chest.
+    stored["chest_cooldown_ms"] = CHEST_COOLDOWN_MS
+    return stored
+
 
+async def load_progress(
+    sessionmaker: SessionFactory,
+    user_id: int,
+    username: str | None = None,
+    read_sessionmaker: SessionFactory | None = None,
+    cache: ProgressCache | None = None,
+    changes: ChangeFeed | None = None,
+) -> tuple[dict, bool]:
+    """Load the progress of a user, creating the user on first sight.
 
-async def fetch_leaderboard(sessionmaker: async_sessionmaker[AsyncSession], limit: int):
-    async with sessionmaker() as session:
-        users = await session.scalars(
-            select(User).order_by(User.score.desc()).limit(limit)
+    Existing users are read through ``read_sessionmaker`` when given; only a
+    missing user costs a write. With a ``cache``, a user whose progress is
+    cached costs no query at all. Returns the progress together with whether
+    the user was just created.
+    """
+    created_pk = None
+    sessionmaker = for_user(sessionmaker, user_id)
+    if read_sessionmaker is not None:
+        read_sessionmaker = for_user(read_sessionmaker, user_id)
+
+    async def load() -> dict:
+        nonlocal created_pk
+        async with (read_sessionmaker or sessionmaker)() as session:
+            user = await select_full_user(session, user_id)
+
+        if user is None:
+            async with sessionmaker() as session:
+                created_pk = await session.scalar(
+                    insert(User)
+                    .values(user_id=user_id, username=username)
+                    .on_conflict_do_nothing(index_elements=[User.user_id])
+                    .returning(User.id)
+                )
+                if created_pk is not None and changes is not None:
+                    await changes.record(session, [user_id])
+                await session.commit()
+                user = await select_full_user(session, user_id)
+
+        return {
+            "score": user.score,
+            "level": user.level,
+            "currency": user.currency,
+            "upgrades": upgrades_to_dict(user.upgrades),
+            "owned_skins": [skin.name for skin in user.owned_skins],
+            "active_skin": user.active_skin,
+            "chest_opened_at": epoch_ms(user.chest_opened_at),
+            "save_seq": user.save_seq,
+        }
+
+    if cache is None:
+        stored = await load()
+    else:
+        stored = await cache.get_or_load(user_id, load)
+    return with_chest_state(stored), created_pk is not None
+
+
+async def fetch_growth_baseline(
+    sessionmaker: SessionFactory, user_id: int
+) -> dict | None:
+    """Score, currency, level and upgrade levels of a user, without skins."""
+    async with for_user(sessionmaker, user_id)() as session:
+        user = (
+            await session.execute(
+                select(User.id, User.score, User.currency, User.level).where(
+                    User.user_id == user_id
+                )
+            )
+        ).one_or_none()
+        if user is None:
+            return None
+        upgrades = await session.execute(
+            select(Upgrade.name, Upgrade.level).where(Upgrade.user_id == user.id)
         )
-        return [
-            {
-                "user_id": user.user_id,
-                "username": user.username,
-                "score": user.score,
-                "level": user.level,
-            }
-            for user in users
-        ]
+        return {
+            "score": user.score,
+            "currency": user.currency,
+            "level": user.level,
+            "upgrades": [{"name": name, "level": level} for name, level in upgrades],
+        }
+
+
+LEADERBOARD_COLUMNS = (User.user_id, User.username, User.score, User.level)
+
+
+async def fetch_leaderboard(sessionmaker: SessionFactory, limit: int):
+    """The best ``limit`` players; with shards, the merged top of every shard."""
+
+    async def top(shard) -> list[dict]:
+        async with shard() as session:
+            rows = await session.execute(
+                select(*LEADERBOARD_COLUMNS).order_by(User.score.desc()).limit(limit)
+            )
+            return [row._asdict() for row in rows]
+
+    entries = [entry for rows in await fan_out(sessionmaker, top) for entry in rows]
+    entries.sort(key=lambda entry: entry["score"], reverse=True)
+    return entries[:limit]
+
+
+async def fetch_scores_of(sessionmaker: SessionFactory, user_ids: list[int]):
+    """Leaderboard columns of the given users."""
+
+    async def scores(shard, ids: list[int]) -> list[dict]:
+        async with shard() as session:
+            rows = await session.execute(
+                select(*LEADERBOARD_COLUMNS).where(User.user_id.in_(ids))
+            )
+            return [row._asdict() for row in rows]
+
+    results = await asyncio.gather(
+        *(scores(shard, ids) for shard, ids in group_by_shard(sessionmaker, user_ids))
+    )
+    return [entry for rows in results for entry in rows]
+
+
+async def fetch_scores(sessionmaker: SessionFactory):
+    """Leaderboard columns of every user, used to rebuild the in-memory ranking."""
+
+    async def scores(shard) -> list[dict]:
+        async with shard() as session:
+            rows = await session.execute(select(*LEADERBOARD_COLUMNS))
+            return [row._asdict() for row in rows]
+
+    return [entry for rows in await fan_out(sessionmaker, scores) for entry in rows]
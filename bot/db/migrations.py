@@ -0,0 +1,107 @@
+from collections.abc import Callable
+
+from sqlalchemy import Connection
+
+from .compact_skins import compact_all, has_duplicates
+
+
+def _column_names(conn: Connection, table: str) -> set[str]:
+    return {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+def add_save_seq(conn: Connection) -> None:
+    if "save_seq" not in _column_names(conn, "users"):
+        conn.exec_driver_sql(
+            "ALTER TABLE users ADD COLUMN save_seq BIGINT NOT NULL DEFAULT 0"
+        )
+
+
+def add_score_index(conn: Connection) -> None:
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_users_score ON users (score)")
+
+
+def add_upgrades_unique_index(conn: Connection) -> None:
+    # Keep the highest level of every (user_id, name) pair before the unique
+    # index can be built.
+    conn.exec_driver_sql(
+        """
+        DELETE FROM upgrades WHERE id NOT IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY user_id, name ORDER BY level DESC, id DESC
+                ) AS position
+                FROM upgrades
+            ) WHERE position = 1
+        )
+        """
+    )
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_upgrades_user_id_name "
+        "ON upgrades (user_id, name)"
+    )
+
+
+def add_owned_skins_unique_index(conn: Connection) -> None:
+    # Run `python -m bot.db.compact_skins` beforehand on large databases to
+    # keep this step short.
+    if has_duplicates(conn):
+        compact_all(conn)
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_owned_skins_user_id_name "
+        "ON owned_skins (user_id, name)"
+    )
+
+
+def add_chest_opened_at(conn: Connection) -> None:
+    if "chest_opened_at" in _column_names(conn, "users"):
+        return
+    conn.exec_driver_sql("ALTER TABLE users ADD COLUMN chest_opened_at DATETIME")
+    # Players who already opened today's chest start their cooldown now.
+    conn.exec_driver_sql(
+        "UPDATE users SET chest_opened_at = datetime('now') WHERE has_free_chest = 0"
+    )
+
+
+def add_scheduled_job_lease(conn: Connection) -> None:
+    columns = _column_names(conn, "scheduled_jobs")
+    for name, ddl in (
+        ("next_run", "DATETIME"),
+        ("lease_owner", "VARCHAR(64)"),
+        ("lease_until", "DATETIME"),
+    ):
+        if name not in columns:
+            conn.exec_driver_sql(f"ALTER TABLE scheduled_jobs ADD COLUMN {name} {ddl}")
+
+
+def drop_has_free_chest(conn: Connection) -> None:
+    # Chest availability is derived from chest_opened_at when progress is read.
+    if "has_free_chest" in _column_names(conn, "users"):
+        conn.exec_driver_sql("ALTER TABLE users DROP COLUMN has_free_chest")
+
+
+def add_chest_opened_at_index(conn: Connection) -> None:
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_users_chest_opened_at ON users (chest_opened_at)"
+    )
+
+
+# Applied in order; the index of the last applied migration + 1 is stored in
+# ``PRAGMA user_version``. Every migration must be a no-op on a schema that
+# ``create_all`` has just created.
+MIGRATIONS: list[Callable[[Connection], None]] = [
+    add_save_seq,
+    add_score_index,
+    add_upgrades_unique_index,
+    add_owned_skins_unique_index,
+    add_chest_opened_at,
+    add_scheduled_job_lease,
+    drop_has_free_chest,
+    add_chest_opened_at_index,
+]
+
+
+def migrate(conn: Connection) -> None:
+    version = conn.exec_driver_sql("PRAGMA user_version").scalar() or 0
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        migration(conn)
+        conn.exec_driver_sql(f"PRAGMA user_version = {number}")
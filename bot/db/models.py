@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import BigInteger, DateTime, ForeignKey, String
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -11,21 +11,25 @@ class User(Base):
 
     user_id: Mapped[int] = mapped_column(BigInteger, unique=True)
     username: Mapped[str] = mapped_column(String(100), nullable=True)
-    score: Mapped[int] = mapped_column(BigInteger, default=0)
+    score: Mapped[int] = mapped_column(BigInteger, default=0, index=True)
     level: Mapped[int] = mapped_column(default=0)
     currency: Mapped[int] = mapped_column(BigInteger, default=0)
     upgrades: Mapped[list["Upgrade"]] = relationship(
         back_populates="user",
-        lazy="selectin",
+        lazy="raise",
         cascade="all, delete-orphan",
     )
     owned_skins: Mapped[list["OwnedSkin"]] = relationship(
         back_populates="user",
-        lazy="selectin",
+        lazy="raise",
         cascade="all, delete-orphan",
     )
     active_skin: Mapped[str] = mapped_column(String(100), nullable=True)
-    has_free_chest: Mapped[bool] = mapped_column(default=True)
+    # The free chest is available again CHEST_COOLDOWN after this moment.
+    chest_opened_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=True, index=True
+    )
+    save_seq: Mapped[int] = mapped_column(BigInteger, default=0)
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
@@ -43,11 +47,14 @@ class User(Base):
 
 class Upgrade(Base):
     __tablename__ = "upgrades"
+    __table_args__ = (
+        Index("ix_upgrades_user_id_name", "user_id", "name", unique=True),
+    )
 
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     user: Mapped["User"] = relationship(
         back_populates="upgrades",
-        lazy="selectin",
+        lazy="raise",
     )
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     level: Mapped[int] = mapped_column(default=0)
@@ -58,10 +65,72 @@ class Upgrade(Base):
 
 class OwnedSkin(Base):
     __tablename__ = "owned_skins"
+    __table_args__ = (
+        Index("ix_owned_skins_user_id_name", "user_id", "name", unique=True),
+    )
 
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     user: Mapped["User"] = relationship(
         back_populates="owned_skins",
-        lazy="selectin",
+        lazy="raise",
     )
     name: Mapped[str] = mapped_column(String(100), nullable=False)
+
+
+class JobCheckpoint(Base):
+    __tablename__ = "job_checkpoints"
+
+    name: Mapped[str] = mapped_column(String(100), unique=True)
+    last_id: Mapped[int] = mapped_column(BigInteger, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        nullable=False,
+    )
+
+
+class ScheduledJob(Base):
+    __tablename__ = "scheduled_jobs"
+
+    name: Mapped[str] = mapped_column(String(100), unique=True)
+    last_run: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    next_run: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    lease_owner: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    lease_until: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
+class ScheduledJobMetrics(Base):
+    """Run totals of a named job, summed over every scheduler that ran it."""
+
+    __tablename__ = "scheduled_job_metrics"
+
+    name: Mapped[str] = mapped_column(String(100), unique=True)
+    successes: Mapped[int] = mapped_column(default=0)
+    failures: Mapped[int] = mapped_column(default=0)
+    timeouts: Mapped[int] = mapped_column(default=0)
+    skipped: Mapped[int] = mapped_column(default=0)
+    last_outcome: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    last_lag: Mapped[float | None] = mapped_column(nullable=True)
+    max_lag: Mapped[float] = mapped_column(default=0.0)
+    last_duration: Mapped[float | None] = mapped_column(nullable=True)
+    max_duration: Mapped[float] = mapped_column(default=0.0)
+    total_duration: Mapped[float] = mapped_column(default=0.0)
+    last_started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    last_success_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    last_failure_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    last_exception: Mapped[str | None] = mapped_column(String(500), nullable=True)
+
+
+class ProgressChange(Base):
+    """A user whose progress one worker changed, for the other workers to see."""
+
+    __tablename__ = "progress_changes"
+    # Ids must never be reused after pruning; workers read them in order.
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    user_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    origin: Mapped[str] = mapped_column(String(32), nullable=False)
+    changed_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, nullable=False, index=True
+    )
@@ -0,0 +1,186 @@
+"""Copy a database into a different number of shards.
+
+Users are routed to shards by a hash of their Telegram id (see
+``bot.db.shards``), so changing ``DB_SHARDS`` needs the rows moved first.
+With the bot stopped::
+
+    python -m bot.db.reshard --db clicker.db --from 1 --to 4
+
+writes ``clicker.0-of-4.db`` ... ``clicker.3-of-4.db`` next to the source
+files, which are only read. Then start the bot with ``DB_SHARDS=4``. Row ids
+are reassigned per target shard. Scheduled jobs and their run metrics are
+copied to the first shard; the change feed and job checkpoints are not
+copied, both start over on the new files. Upgrades and skins whose user no
+longer exists are skipped and counted in the log.
+"""
+
+import argparse
+import logging
+from collections.abc import Iterator
+from pathlib import Path
+
+from sqlalchemy import Connection, Table, create_engine, func, select
+
+from .base import Base
+from .migrations import migrate
+from .models import OwnedSkin, ScheduledJob, ScheduledJobMetrics, Upgrade, User
+from .shards import shard_index, shard_paths
+
+logger = logging.getLogger("fastapi")
+
+
+def chunks(conn: Connection, table: Table, chunk_size: int) -> Iterator[list[dict]]:
+    """Rows of ``table`` in id order, ``chunk_size`` at a time."""
+    last_id = 0
+    while True:
+        rows = (
+            conn.execute(
+                select(table)
+                .where(table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(chunk_size)
+            )
+            .mappings()
+            .all()
+        )
+        if not rows:
+            return
+        yield [dict(row) for row in rows]
+        last_id = rows[-1]["id"]
+
+
+def copy_users(
+    source: Connection,
+    targets: list[Connection],
+    next_ids: list[int],
+    chunk_size: int,
+) -> dict[int, tuple[int, int]]:
+    """Copy the users of one source; returns old id -> (target, new id)."""
+    moved: dict[int, tuple[int, int]] = {}
+    for rows in chunks(source, User.__table__, chunk_size):
+        batches: list[list[dict]] = [[] for _ in targets]
+        for row in rows:
+            index = shard_index(row["user_id"], len(targets))
+            next_ids[index] += 1
+            moved[row["id"]] = index, next_ids[index]
+            batches[index].append({**row, "id": next_ids[index]})
+        for target, batch in zip(targets, batches):
+            if batch:
+                target.execute(User.__table__.insert(), batch)
+    return moved
+
+
+def copy_children(
+    source: Connection,
+    targets: list[Connection],
+    table: Table,
+    moved: dict[int, tuple[int, int]],
+    chunk_size: int,
+) -> int:
+    """Copy rows that belong to a user next to their user, with fresh ids.
+
+    Returns how many rows were skipped because their user does not exist.
+    """
+    orphans = 0
+    for rows in chunks(source, table, chunk_size):
+        batches: list[list[dict]] = [[] for _ in targets]
+        for row in rows:
+            if row["user_id"] not in moved:
+                orphans += 1
+                continue
+            index, user_pk = moved[row["user_id"]]
+            row.pop("id")
+            batches[index].append({**row, "user_id": user_pk})
+        for target, batch in zip(targets, batches):
+            if batch:
+                target.execute(table.insert(), batch)
+    if orphans:
+        logger.warning("Skipped %d %s rows without a user", orphans, table.name)
+    return orphans
+
+
+def count(conn: Connection, table: Table) -> int:
+    return conn.scalar(select(func.count()).select_from(table))
+
+
+def reshard(path: str, old: int, new: int, chunk_size: int = 5000) -> list[str]:
+    """Copy the shards of ``path`` into ``new`` shards; returns the new files."""
+    source_paths = shard_paths(path, old)
+    target_paths = shard_paths(path, new)
+    missing = [name for name in source_paths if not Path(name).exists()]
+    if missing:
+        raise SystemExit(f"Missing source shards: {', '.join(missing)}")
+    existing = [name for name in target_paths if Path(name).exists()]
+    if existing:
+        raise SystemExit(f"Refusing to overwrite {', '.join(existing)}")
+
+    sources = [create_engine(f"sqlite:///{name}") for name in source_paths]
+    targets = [create_engine(f"sqlite:///{name}") for name in target_paths]
+    per_user = [User.__table__, Upgrade.__table__, OwnedSkin.__table__]
+    global_tables = [ScheduledJob.__table__, ScheduledJobMetrics.__table__]
+    try:
+        target_conns = [target.connect() for target in targets]
+        for conn in target_conns:
+            conn.exec_driver_sql("PRAGMA journal_mode = wal")
+            Base.metadata.create_all(conn)
+            migrate(conn)
+            conn.commit()
+
+        expected = dict.fromkeys(per_user, 0)
+        next_ids = [0] * new
+        for number, source in enumerate(sources):
+            with source.connect() as conn:
+                moved = copy_users(conn, target_conns, next_ids, chunk_size)
+                for table in per_user:
+                    expected[table] += count(conn, table)
+                for table in per_user[1:]:
+                    expected[table] -= copy_children(
+                        conn, target_conns, table, moved, chunk_size
+                    )
+                # Global tables live on the first shard.
+                if number == 0:
+                    for table in global_tables:
+                        rows = conn.execute(select(table)).mappings().all()
+                        if rows:
+                            target_conns[0].execute(
+                                table.insert(), [dict(row) for row in rows]
+                            )
+                        expected[table] = len(rows)
+            logger.info("Copied %s (%d users)", source_paths[number], len(moved))
+
+        for table, total in expected.items():
+            copied = sum(count(conn, table) for conn in target_conns)
+            if copied != total:
+                raise SystemExit(f"{table.name}: copied {copied} of {total} rows")
+        for conn in target_conns:
+            conn.commit()
+            conn.close()
+    except BaseException:
+        for target in targets:
+            target.dispose()
+        for name in target_paths:
+            for suffix in ("", "-wal", "-shm"):
+                Path(name + suffix).unlink(missing_ok=True)
+        raise
+    finally:
+        for engine in (*sources, *targets):
+            engine.dispose()
+    return target_paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="clicker.db", help="DB_PATH of the bot")
+    parser.add_argument("--from", dest="old", type=int, default=1)
+    parser.add_argument("--to", dest="new", type=int, required=True)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    for name in reshard(args.db, args.old, args.new, args.chunk_size):
+        logger.info("Wrote %s", name)
+    logger.info("Start the bot with DB_SHARDS=%d", args.new)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+from collections.abc import Awaitable, Callable, Iterable
+from pathlib import Path
+from typing import TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+T = TypeVar("T")
+
+
+def shard_index(user_id: int, count: int) -> int:
+    """The shard of a user; stable across processes and Python versions."""
+    if count == 1:
+        return 0
+    digest = hashlib.blake2b(
+        user_id.to_bytes(8, "little", signed=True), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, "little") % count
+
+
+def shard_paths(path: str, count: int) -> list[str]:
+    """Database files of a layout; a single shard is the file itself.
+
+    The shard count is part of every name, so a resharded copy never
+    overwrites the files it was made from.
+    """
+    if count == 1:
+        return [path]
+    base = Path(path)
+    return [
+        str(base.with_name(f"{base.stem}.{index}-of-{count}{base.suffix}"))
+        for index in range(count)
+    ]
+
+
+class ShardedSessionmaker:
+    """The sessionmakers of every shard, usable in place of one sessionmaker.
+
+    ``bot.db.func`` resolves the shard of a user per call with ``for_user``
+    and fans out over ``shards`` for queries that span all users. The tables
+    that are not per user (``scheduled_jobs``) live on the first shard and
+    are reached through ``global_sessionmaker``. There is no single session
+    for all shards, so calling it directly raises.
+    """
+
+    def __init__(self, shards: list[async_sessionmaker[AsyncSession]]) -> None:
+        self.shards = shards
+
+    def __call__(self, **kwargs) -> AsyncSession:
+        raise TypeError(
+            "A sharded database has no single session; "
+            "use for_user(), each_shard() or global_sessionmaker()"
+        )
+
+    def __len__(self) -> int:
+        return len(self.shards)
+
+    def for_user(self, user_id: int) -> async_sessionmaker[AsyncSession]:
+        return self.shards[shard_index(user_id, len(self.shards))]
+
+    def group(self, user_ids: Iterable[int]) -> dict[int, list[int]]:
+        """User ids by the index of their shard."""
+        groups: dict[int, list[int]] = {}
+        for user_id in user_ids:
+            groups.setdefault(shard_index(user_id, len(self.shards)), []).append(
+                user_id
+            )
+        return groups
+
+
+# What the functions of ``bot.db`` accept: one database or its shards.
+SessionFactory = async_sessionmaker[AsyncSession] | ShardedSessionmaker
+
+
+def make_sessionmaker(engines: list) -> SessionFactory:
+    """A plain sessionmaker for one engine, a sharded one for several."""
+    sessionmakers = [
+        async_sessionmaker(engine, expire_on_commit=False) for engine in engines
+    ]
+    if len(sessionmakers) == 1:
+        return sessionmakers[0]
+    return ShardedSessionmaker(sessionmakers)
+
+
+def global_sessionmaker(
+    sessionmaker: SessionFactory,
+) -> async_sessionmaker[AsyncSession]:
+    """The sessionmaker of the tables that are not per user (the first shard)."""
+    if isinstance(sessionmaker, ShardedSessionmaker):
+        return sessionmaker.shards[0]
+    return sessionmaker
+
+
+def for_user(
+    sessionmaker: SessionFactory, user_id: int
+) -> async_sessionmaker[AsyncSession]:
+    """The sessionmaker of the shard holding a user."""
+    if isinstance(sessionmaker, ShardedSessionmaker):
+        return sessionmaker.for_user(user_id)
+    return sessionmaker
+
+
+def each_shard(sessionmaker: SessionFactory) -> list[async_sessionmaker[AsyncSession]]:
+    if isinstance(sessionmaker, ShardedSessionmaker):
+        return sessionmaker.shards
+    return [sessionmaker]
+
+
+def group_by_shard(sessionmaker: SessionFactory, user_ids: Iterable[int]):
+    """``(sessionmaker, user_ids)`` pairs, one per shard holding any of them."""
+    if isinstance(sessionmaker, ShardedSessionmaker):
+        return [
+            (sessionmaker.shards[index], ids)
+            for index, ids in sessionmaker.group(user_ids).items()
+        ]
+    return [(sessionmaker, list(user_ids))]
+
+
+async def fan_out(
+    sessionmaker: SessionFactory,
+    query: Callable[[async_sessionmaker[AsyncSession]], Awaitable[T]],
+) -> list[T]:
+    """Run ``query`` on every shard concurrently; results in shard order."""
+    shards = each_shard(sessionmaker)
+    if len(shards) == 1:
+        return [await query(shards[0])]
+    return list(await asyncio.gather(*(query(shard) for shard in shards)))
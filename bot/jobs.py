@@ -1,14 +1,248 @@
-from sqlalchemy import update
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import fields
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from bot.db.models import User
+from bot.db.func import CHEST_COOLDOWN
+from bot.db.models import ScheduledJob, ScheduledJobMetrics, User
+from bot.db.shards import SessionFactory, fan_out
+from bot.scheduler import OUTCOMES, Job, JobMetrics, JobStore, Scheduler
+
+logger = logging.getLogger("schedule")
+
+
+def _to_utc(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _from_utc(moment: datetime | None) -> datetime | None:
+    if moment is None:
+        return None
+    return moment.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+
+
+class SQLJobStore(JobStore):
+    """Shares the schedule of named jobs through the ``scheduled_jobs`` table.
+
+    The scheduler works in naive local time while the table keeps naive UTC
+    like the rest of the database; claims are a single conditional UPDATE, so
+    replicas on the same database file never take the same run twice.
+    """
+
+    def __init__(self, sessionmaker: async_sessionmaker[AsyncSession]) -> None:
+        self.sessionmaker = sessionmaker
+
+    async def register(
+        self, job_id: str, next_run: datetime
+    ) -> tuple[datetime | None, datetime]:
+        async with self.sessionmaker() as session:
+            await session.execute(
+                insert(ScheduledJob)
+                .values(name=job_id, next_run=_to_utc(next_run))
+                .on_conflict_do_nothing(index_elements=[ScheduledJob.name])
+            )
+            await session.commit()
+            row = (
+                await session.execute(
+                    select(ScheduledJob.last_run, ScheduledJob.next_run).where(
+                        ScheduledJob.name == job_id
+                    )
+                )
+            ).one()
+        return _from_utc(row.last_run), _from_utc(row.next_run) or next_run
+
+    async def claim(
+        self,
+        job_id: str,
+        owner: str,
+        now: datetime,
+        next_run: datetime,
+        lease_until: datetime,
+    ) -> tuple[bool, datetime | None]:
+        now = _to_utc(now)
+        async with self.sessionmaker() as session:
+            claimed = await session.scalar(
+                update(ScheduledJob)
+                .where(
+                    ScheduledJob.name == job_id,
+                    or_(ScheduledJob.next_run.is_(None), ScheduledJob.next_run <= now),
+                    or_(
+                        ScheduledJob.lease_until.is_(None),
+                        ScheduledJob.lease_until <= now,
+                    ),
+                )
+                .values(
+                    next_run=_to_utc(next_run),
+                    lease_owner=owner,
+                    lease_until=_to_utc(lease_until),
+                )
+                .returning(ScheduledJob.id)
+                .execution_options(synchronize_session=False)
+            )
+            if claimed is None:
+                stored = await session.scalar(
+                    select(ScheduledJob.next_run).where(ScheduledJob.name == job_id)
+                )
+                return False, _from_utc(stored)
+            await session.commit()
+        return True, next_run
+
+    async def release(
+        self, job_id: str, owner: str, last_run: datetime | None
+    ) -> None:
+        values = {"lease_owner": None, "lease_until": None}
+        if last_run is not None:
+            values["last_run"] = _to_utc(last_run)
+        async with self.sessionmaker() as session:
+            await session.execute(
+                update(ScheduledJob)
+                .where(ScheduledJob.name == job_id, ScheduledJob.lease_owner == owner)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+    async def record_run(
+        self, job_id: str, outcome: str, metrics: JobMetrics
+    ) -> None:
+        # One upsert that adds the run to the totals, so schedulers on other
+        # replicas can record runs of the same job concurrently.
+        counter = OUTCOMES[outcome]
+        values = {"name": job_id, counter: 1}
+        if outcome != "skipped":
+            values.update(
+                last_outcome=outcome,
+                last_lag=metrics.last_lag,
+                max_lag=metrics.last_lag or 0.0,
+                last_duration=metrics.last_duration,
+                max_duration=metrics.last_duration or 0.0,
+                total_duration=metrics.last_duration or 0.0,
+                last_started_at=_to_utc(metrics.last_started_at),
+            )
+            if outcome == "success":
+                values["last_success_at"] = _to_utc(metrics.last_success_at)
+            else:
+                values["last_failure_at"] = _to_utc(metrics.last_failure_at)
+                values["last_exception"] = (metrics.last_exception or "")[:500]
+        stmt = insert(ScheduledJobMetrics).values(**values)
+        excluded = stmt.excluded
+        table = ScheduledJobMetrics
+        updates = {counter: getattr(table, counter) + 1}
+        if outcome != "skipped":
+            updates.update(
+                last_outcome=excluded.last_outcome,
+                last_lag=excluded.last_lag,
+                max_lag=func.max(table.max_lag, excluded.max_lag),
+                last_duration=excluded.last_duration,
+                max_duration=func.max(table.max_duration, excluded.max_duration),
+                total_duration=table.total_duration + excluded.total_duration,
+                last_started_at=excluded.last_started_at,
+            )
+            updates.update(
+                (column, getattr(excluded, column))
+                for column in values
+                if column in ("last_success_at", "last_failure_at", "last_exception")
+            )
+        async with self.sessionmaker() as session:
+            await session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[ScheduledJobMetrics.name], set_=updates
+                )
+            )
+            await session.commit()
+
+    async def metrics(self) -> list[dict]:
+        now = datetime.utcnow()
+        async with self.sessionmaker() as session:
+            rows = await session.execute(
+                select(
+                    ScheduledJobMetrics,
+                    ScheduledJob.next_run,
+                    ScheduledJob.lease_until,
+                )
+                .outerjoin(ScheduledJob, ScheduledJob.name == ScheduledJobMetrics.name)
+                .order_by(ScheduledJobMetrics.name)
+            )
+            rows = rows.all()
+        result = []
+        for stored, next_run, lease_until in rows:
+            totals = {
+                field.name: getattr(stored, field.name) for field in fields(JobMetrics)
+            }
+            for field in ("last_started_at", "last_success_at", "last_failure_at"):
+                totals[field] = _from_utc(totals[field])
+            result.append(
+                {
+                    "job": stored.name,
+                    "next_run": _from_utc(next_run),
+                    "running": int(lease_until is not None and lease_until > now),
+                    "runs": stored.successes + stored.failures + stored.timeouts,
+                    **totals,
+                }
+            )
+        return result
+
+
+class ChestNotifier:
+    """Schedules a one-off timer per user for the moment their chest is ready.
+
+    ``schedule_upcoming`` is meant to run as a named job every ``horizon``;
+    each run picks up the cooldowns expiring within ``horizon`` so the
+    scheduler only ever holds the timers of the near future. With a shared
+    job store only the replica that claimed the run holds the timers, so
+    every user is notified once.
+    """
+
+    def __init__(
+        self,
+        sessionmaker: SessionFactory,
+        scheduler: Scheduler,
+        notify: Callable[[int], Awaitable[None]],
+        horizon: timedelta = timedelta(hours=1),
+    ) -> None:
+        self.sessionmaker = sessionmaker
+        self.scheduler = scheduler
+        self.notify = notify
+        self.horizon = horizon
+        self._timers: dict[int, Job] = {}
+
+    async def schedule_upcoming(self) -> None:
+        now = datetime.utcnow()
+
+        async def upcoming(shard) -> list:
+            async with shard() as session:
+                rows = await session.execute(
+                    select(User.user_id, User.chest_opened_at).where(
+                        User.chest_opened_at > now - CHEST_COOLDOWN,
+                        User.chest_opened_at <= now - CHEST_COOLDOWN + self.horizon,
+                    )
+                )
+                return rows.all()
 
+        rows = [
+            row
+            for shard_rows in await fan_out(self.sessionmaker, upcoming)
+            for row in shard_rows
+        ]
+        for user_id, opened_at in rows:
+            if user_id in self._timers:
+                continue
+            # Chest timestamps are naive UTC, the scheduler runs on local time.
+            ready_at = (
+                (opened_at + CHEST_COOLDOWN)
+                .replace(tzinfo=timezone.utc)
+                .astimezone()
+                .replace(tzinfo=None)
+            )
+            self._timers[user_id] = self.scheduler.once(ready_at, self._fire, user_id)
 
-async def update_bonus_chest(sessionmaker: async_sessionmaker[AsyncSession]) -> None:
-    async with sessionmaker() as session:
-        await session.execute(
-            update(User)
-            .where(User.has_free_chest.is_(False))
-            .values(has_free_chest=True)
-        )
-        await session.commit()
+    async def _fire(self, user_id: int) -> None:
+        self._timers.pop(user_id, None)
+        try:
+            await self.notify(user_id)
+        except Exception:
+            logger.exception("Failed to notify user %s about their chest", user_id)
@@ -0,0 +1,123 @@
+from bisect import bisect_left, insort
+from collections.abc import Iterable
+from itertools import chain, islice
+from typing import Any
+
+
+class Leaderboard:
+    """In-memory score ranking of every player.
+
+    Players are sorted by ``(-score, user_id)`` in buckets of ``bucket_size``
+    to ``2 * bucket_size`` keys, next to a dict of their entries. Moving a
+    player on a save is a binary search over the bucket maxima plus a delete
+    and an insert inside one bucket, O(log n + bucket_size), instead of
+    shifting a list of every player. The top slice reads the first buckets; a
+    rank adds up the sizes of the buckets before the player's,
+    O(n / bucket_size). Any player can ask for their rank, so every player is
+    loaded from the database on startup and then kept up to date as saves
+    are written.
+    """
+
+    def __init__(self, bucket_size: int = 1000) -> None:
+        self.bucket_size = bucket_size
+        self._buckets: list[list[tuple[int, int]]] = []
+        # Last key of every bucket.
+        self._maxes: list[tuple[int, int]] = []
+        self._entries: dict[int, dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._entries
+
+    def load(self, entries: Iterable[dict[str, Any]]) -> None:
+        self._entries = {entry["user_id"]: dict(entry) for entry in entries}
+        keys = sorted(
+            (-entry["score"], user_id) for user_id, entry in self._entries.items()
+        )
+        size = self.bucket_size
+        self._buckets = [
+            keys[start : start + size] for start in range(0, len(keys), size)
+        ]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+
+    def add(
+        self, user_id: int, username: str | None, score: int = 0, level: int = 0
+    ) -> None:
+        if user_id in self._entries:
+            self.update(user_id, score=score, level=level, username=username)
+            return
+        self._entries[user_id] = {
+            "user_id": user_id,
+            "username": username,
+            "score": score,
+            "level": level,
+        }
+        self._insert((-score, user_id))
+
+    def update(
+        self,
+        user_id: int,
+        score: Any = None,
+        level: Any = None,
+        username: str | None = None,
+    ) -> None:
+        """Apply a save to a known player; unknown players are ignored."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return
+        if username is not None:
+            entry["username"] = username
+        if isinstance(level, int):
+            entry["level"] = level
+        if not isinstance(score, int) or score == entry["score"]:
+            return
+        self._remove((-entry["score"], user_id))
+        entry["score"] = score
+        self._insert((-score, user_id))
+
+    def top(self, limit: int) -> list[dict[str, Any]]:
+        keys = islice(chain.from_iterable(self._buckets), limit)
+        return [dict(self._entries[user_id]) for _, user_id in keys]
+
+    def rank(self, user_id: int) -> int | None:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        key = (-entry["score"], user_id)
+        index = bisect_left(self._maxes, key)
+        before = sum(len(bucket) for bucket in self._buckets[:index])
+        return before + bisect_left(self._buckets[index], key) + 1
+
+    def entry(self, user_id: int) -> dict[str, Any] | None:
+        entry = self._entries.get(user_id)
+        return dict(entry) if entry is not None else None
+
+    def _insert(self, key: tuple[int, int]) -> None:
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            return
+        index = bisect_left(self._maxes, key)
+        if index == len(self._buckets):
+            index -= 1
+            self._buckets[index].append(key)
+            self._maxes[index] = key
+        else:
+            insort(self._buckets[index], key)
+        bucket = self._buckets[index]
+        size = self.bucket_size
+        if len(bucket) > 2 * size:
+            self._buckets[index : index + 1] = [bucket[:size], bucket[size:]]
+            self._maxes[index : index + 1] = [bucket[size - 1], bucket[-1]]
+
+    def _remove(self, key: tuple[int, int]) -> None:
+        index = bisect_left(self._maxes, key)
+        bucket = self._buckets[index]
+        del bucket[bisect_left(bucket, key)]
+        if bucket:
+            self._maxes[index] = bucket[-1]
+        else:
+            del self._buckets[index]
+            del self._maxes[index]
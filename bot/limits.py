@@ -0,0 +1,272 @@
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+# Mirrors the level goals and upgrade costs in static/js/base.js and the
+# upgrade effects in static/js/upgrades.js; keep them in sync.
+BASE_MAX_COMBO = 8
+BASE_LEVEL_REWARD = 50
+BASE_LEVEL_GOAL = 120
+LEVEL_GROWTH_FACTOR = 1.65
+PASSIVE_PER_DRONE = 4
+GROWTH_UPGRADES = (
+    "quantum_loop",
+    "stellar_magnet",
+    "dividend_protocol",
+    "drone_fleet",
+    "crown_of_combos",
+    "galactic_exchange",
+)
+# (base cost, cost growth per level) of GROWTH_UPGRADES, in the same order.
+UPGRADE_COSTS = ((260, 1.2), (100, 1.75), (340, 1.1), (500, 1.6), (150, 1.8), (400, 1.85))
+
+
+class RateLimiter:
+    """Token bucket per key, refilled at ``rate`` tokens per second up to ``burst``.
+
+    A bucket is a ``(tokens, updated_at)`` tuple. A bucket that has refilled
+    completely behaves exactly like a missing one, so the periodic sweep
+    drops those and only recently active keys take memory.
+    """
+
+    def __init__(self, rate: float, burst: float, sweep_interval: float = 60.0) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.sweep_interval = sweep_interval
+        self._buckets: dict[int, tuple[float, float]] = {}
+        self._swept_at = time.monotonic()
+        self.allowed = 0
+        self.limited = 0
+
+    def take(self, key: int, now: float | None = None) -> float:
+        """Take a token; returns 0 when allowed, else the seconds until one is."""
+        if now is None:
+            now = time.monotonic()
+        if now - self._swept_at >= self.sweep_interval:
+            self._sweep(now)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = self.burst
+        else:
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            self.limited += 1
+            return (1 - tokens) / self.rate
+        self._buckets[key] = (tokens - 1, now)
+        self.allowed += 1
+        return 0.0
+
+    def _sweep(self, now: float) -> None:
+        self._swept_at = now
+        refill_time = self.burst / self.rate
+        self._buckets = {
+            key: bucket
+            for key, bucket in self._buckets.items()
+            if now - bucket[1] < refill_time
+        }
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "buckets": len(self._buckets),
+        }
+
+
+def upgrade_levels(upgrades: list | None) -> dict[str, int]:
+    """Levels from saves (``{"name", "level"}``) or loads (``{name: level}``)."""
+    levels: dict[str, int] = {}
+    for upgrade in upgrades or ():
+        if not isinstance(upgrade, dict):
+            continue
+        if "name" in upgrade:
+            pairs = [(upgrade["name"], upgrade.get("level"))]
+        else:
+            pairs = upgrade.items()
+        for name, level in pairs:
+            if isinstance(level, int):
+                levels[name] = level
+    return levels
+
+
+@dataclass(frozen=True, slots=True)
+class GrowthLimits:
+    score_per_second: float
+    currency_per_second: float
+    level_reward: int
+
+
+def growth_limits(levels: tuple[int, ...], clicks_per_second: float) -> GrowthLimits:
+    """Fastest score and currency growth the upgrades allow at a click rate."""
+    quantum, magnet, dividend, drones, crown, exchange = levels
+    max_combo = BASE_MAX_COMBO + crown
+    score_per_click = max(1, round(max_combo * (1 + 0.15 * quantum)))
+    currency_per_click = max_combo * (1 + magnet)
+    level_reward = round(
+        (BASE_LEVEL_REWARD + 75 * dividend) * (1 + 0.1 * exchange) + 15 * exchange
+    )
+    return GrowthLimits(
+        score_per_second=clicks_per_second * score_per_click,
+        currency_per_second=clicks_per_second * currency_per_click
+        + drones * PASSIVE_PER_DRONE,
+        level_reward=level_reward,
+    )
+
+
+def level_goal(level: int) -> int:
+    return max(BASE_LEVEL_GOAL, round(BASE_LEVEL_GOAL * LEVEL_GROWTH_FACTOR**level))
+
+
+def levels_reached(score: int) -> int:
+    """The highest level a score can have earned; a level up needs more than
+    the goal of the current level."""
+    level = 0
+    while score > level_goal(level):
+        level += 1
+    return level
+
+
+def affordable_levels(
+    known: tuple[int, ...], incoming: tuple[int, ...], budget: float
+) -> tuple[int, ...]:
+    """Raise ``known`` towards ``incoming`` as far as ``budget`` pays for.
+
+    Level steps are bought cheapest first; every step of an upgrade costs more
+    than the one before, so each upgrade is raised in order.
+    """
+    steps = sorted(
+        (round(base * growth**level), index)
+        for index, ((base, growth), start, target) in enumerate(
+            zip(UPGRADE_COSTS, known, incoming)
+        )
+        for level in range(start, target)
+    )
+    levels = list(known)
+    for cost, index in steps:
+        if cost > budget:
+            break
+        budget -= cost
+        levels[index] += 1
+    return tuple(levels)
+
+
+class GrowthGuard:
+    """Rejects saves whose score or currency grew faster than the game allows.
+
+    The last accepted ``(score, currency, level, at, upgrade levels)`` of each
+    player is kept in memory and seeded from ``load_baseline`` when missing;
+    entries idle for ``ttl`` seconds are dropped. Growth since the last
+    accepted save may not exceed what ``clicks_per_second`` clicks with the
+    player's upgrades produce over the elapsed time plus ``slack_seconds``.
+    Currency additionally allows the level-up rewards of the save and
+    ``currency_slack`` for chest rewards. Decreases are always fine.
+
+    Nothing the client claims raises the limits on its own: levels may not
+    run ahead of the level goals the new score has passed, and higher upgrade
+    levels only count as far as the currency that can have been spent since
+    the last accepted save pays for them.
+    """
+
+    def __init__(
+        self,
+        load_baseline: Callable[[int], Awaitable[dict | None]],
+        clicks_per_second: float = 20,
+        slack_seconds: float = 10,
+        currency_slack: int = 1000,
+        ttl: float = 3600,
+    ) -> None:
+        self.load_baseline = load_baseline
+        self.clicks_per_second = clicks_per_second
+        self.slack_seconds = slack_seconds
+        self.currency_slack = currency_slack
+        self.ttl = ttl
+        self._players: dict[int, tuple] = {}
+        self._swept_at = time.monotonic()
+        self.rejected = 0
+
+    def seed(self, user_id: int, progress: dict, now: float | None = None) -> None:
+        levels = upgrade_levels(progress.get("upgrades"))
+        self._players[user_id] = (
+            progress.get("score") or 0,
+            progress.get("currency") or 0,
+            progress.get("level") or 0,
+            time.monotonic() if now is None else now,
+            tuple(levels.get(name, 0) for name in GROWTH_UPGRADES),
+        )
+
+    def forget(self, user_id: int) -> None:
+        """Drop a baseline that another worker may have moved on from."""
+        self._players.pop(user_id, None)
+
+    async def check(self, user_id: int, progress: dict) -> bool:
+        """Whether the (possibly partial) progress is plausible; records it if so."""
+        now = time.monotonic()
+        if now - self._swept_at >= self.ttl:
+            self._sweep(now)
+        player = self._players.get(user_id)
+        if player is None:
+            # A user without a row yet starts from nothing.
+            baseline = await self.load_baseline(user_id)
+            self.seed(user_id, baseline or {}, now)
+            player = self._players[user_id]
+        score, currency, level, at, known = player
+
+        window = now - at + self.slack_seconds
+        new_score = _number(progress.get("score"), score)
+        new_currency = _number(progress.get("currency"), currency)
+        new_level = _number(progress.get("level"), level)
+        if new_level > max(level, levels_reached(new_score)):
+            self.rejected += 1
+            return False
+        gained_levels = max(0, new_level - level)
+
+        # What the player can have earned at the known levels bounds what
+        # they can have spent on upgrades since the last save.
+        limits = growth_limits(known, self.clicks_per_second)
+        income = (
+            limits.currency_per_second * window
+            + limits.level_reward * gained_levels
+            + self.currency_slack
+        )
+        incoming = upgrade_levels(progress.get("upgrades"))
+        levels = affordable_levels(
+            known,
+            tuple(
+                max(start, incoming.get(name, 0))
+                for name, start in zip(GROWTH_UPGRADES, known)
+            ),
+            currency + income - new_currency,
+        )
+        if levels != known:
+            limits = growth_limits(levels, self.clicks_per_second)
+            income = (
+                limits.currency_per_second * window
+                + limits.level_reward * gained_levels
+                + self.currency_slack
+            )
+        if (
+            new_score - score > limits.score_per_second * window
+            or new_currency - currency > income
+        ):
+            self.rejected += 1
+            return False
+        self._players[user_id] = (new_score, new_currency, new_level, now, levels)
+        return True
+
+    def _sweep(self, now: float) -> None:
+        self._swept_at = now
+        self._players = {
+            user_id: player
+            for user_id, player in self._players.items()
+            if now - player[3] < self.ttl
+        }
+
+    def stats(self) -> dict[str, int]:
+        return {"rejected": self.rejected, "players": len(self._players)}
+
+
+def _number(value, default: int) -> int:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return default
+    return value
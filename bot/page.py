@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi.staticfiles import StaticFiles
+from starlette.responses import Response
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+STATIC_URL_PATTERN = re.compile(r'(?P<attr>src|href)="(?P<url>/static/[^"?#]+)"')
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@dataclass(slots=True, frozen=True)
+class CompiledPage:
+    etag: str
+    variants: dict[str, bytes]
+
+
+def hash_static_files(static_dir: Path, url_prefix: str = "/static") -> dict[str, str]:
+    """Map every static URL to a short hash of its content."""
+    return {
+        f"{url_prefix}/{path.relative_to(static_dir).as_posix()}": hashlib.blake2b(
+            path.read_bytes(), digest_size=6
+        ).hexdigest()
+        for path in sorted(static_dir.rglob("*"))
+        if path.is_file()
+    }
+
+
+def pick_encoding(accept_encoding: str | None, available: dict[str, bytes]) -> str:
+    """Pick the best pre-compressed variant the client accepts."""
+    accepted: dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        if coding:
+            accepted[coding.lower()] = quality
+    for coding in ("br", "gzip"):
+        if coding in available and accepted.get(coding, accepted.get("*", 0)) > 0:
+            return coding
+    return "identity"
+
+
+class ClickerPage:
+    """The clicker page, rendered once with content-hashed asset URLs.
+
+    The identity, gzip and (when the optional ``brotli`` package is present)
+    brotli variants are precomputed. With ``hot_reload`` the page is rebuilt
+    whenever the template or a static file changes on disk.
+    """
+
+    def __init__(self, template_path: Path, static_dir: Path, hot_reload: bool = False):
+        self.template_path = template_path
+        self.static_dir = static_dir
+        self.hot_reload = hot_reload
+        self._mtime = 0.0
+        self._page: CompiledPage | None = None
+
+    def _current_mtime(self) -> float:
+        paths = [self.template_path, *self.static_dir.rglob("*")]
+        return max(path.stat().st_mtime for path in paths)
+
+    def compile(self) -> CompiledPage:
+        self._mtime = self._current_mtime()
+        hashes = hash_static_files(self.static_dir)
+
+        def versioned(match: re.Match) -> str:
+            url = match["url"]
+            if url not in hashes:
+                return match[0]
+            return f'{match["attr"]}="{url}?v={hashes[url]}"'
+
+        markup = STATIC_URL_PATTERN.sub(
+            versioned, self.template_path.read_text(encoding="utf-8")
+        )
+        body = markup.encode("utf-8")
+        variants = {
+            "identity": body,
+            "gzip": gzip.compress(body, compresslevel=9, mtime=0),
+        }
+        if brotli is not None:
+            variants["br"] = brotli.compress(body, quality=11)
+        self._page = CompiledPage(
+            etag=hashlib.blake2b(body, digest_size=16).hexdigest(),
+            variants=variants,
+        )
+        return self._page
+
+    def get(self) -> CompiledPage:
+        if self._page is None or (
+            self.hot_reload and self._current_mtime() != self._mtime
+        ):
+            return self.compile()
+        return self._page
+
+
+class HashedStaticFiles(StaticFiles):
+    """Static files that are cached forever when requested by hashed URL."""
+
+    def __init__(self, *args, immutable: bool = True, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.immutable = immutable
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if not self.immutable or response.status_code != 200:
+            return response
+        if b"v=" in scope.get("query_string", b""):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
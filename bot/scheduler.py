@@ -1,14 +1,40 @@
+import abc
 import asyncio
 import datetime
 import functools
+import heapq
+import itertools
 import logging
 import random
 import re
+import time
+import uuid
 import warnings
 from collections.abc import Callable, Hashable
+from dataclasses import asdict, dataclass
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from .cron import CronSpec, parse_cron
 
 logger = logging.getLogger("schedule")
 
+OVERLAP_POLICIES = ("skip", "queue")
+CATCH_UP_POLICIES = ("skip", "once", "all")
+# Outcomes of a run and the JobMetrics counter each one is counted in.
+OUTCOMES = {
+    "success": "successes",
+    "failure": "failures",
+    "timeout": "timeouts",
+    "skipped": "skipped",
+}
+MAX_CATCH_UP_RUNS = 1000
+DEFAULT_LEASE_SECONDS = 3600
+UNITS = ("seconds", "minutes", "hours", "days", "weeks")
+
+DAILY_TIME = re.compile(r"^[0-2]\d:[0-5]\d(:[0-5]\d)?$")
+HOURLY_TIME = re.compile(r"^([0-5]\d)?:[0-5]\d$")
+MINUTELY_TIME = re.compile(r"^:[0-5]\d$")
+
 
 class ScheduleError(Exception):
     """Base schedule exception."""
@@ -26,12 +52,308 @@ class CancelJob:
     """Can be returned from a job to unschedule itself."""
 
 
-class Scheduler:
+class JobStore(abc.ABC):
+    """Shared state of named jobs, kept across restarts and replicas.
+
+    Every run of a named job is claimed first: the claim only succeeds while
+    the stored ``next_run`` is due and nobody holds an unexpired lease, and it
+    moves ``next_run`` forward, so each due run is taken by one scheduler.
+    Times are naive local datetimes, like everywhere in the scheduler.
+    """
+
+    @abc.abstractmethod
+    async def register(
+        self, job_id: str, next_run: datetime.datetime
+    ) -> tuple[None | datetime.datetime, datetime.datetime]:
+        """Add the job unless it is stored already; returns (last_run, next_run)."""
+
+    @abc.abstractmethod
+    async def claim(
+        self,
+        job_id: str,
+        owner: str,
+        now: datetime.datetime,
+        next_run: datetime.datetime,
+        lease_until: datetime.datetime,
+    ) -> tuple[bool, None | datetime.datetime]:
+        """Take the run due at ``now``; returns whether it was taken together
+        with the stored ``next_run``."""
+
+    @abc.abstractmethod
+    async def release(
+        self, job_id: str, owner: str, last_run: None | datetime.datetime
+    ) -> None:
+        """Drop the lease of ``owner`` and record when the run finished."""
+
+    @abc.abstractmethod
+    async def record_run(
+        self, job_id: str, outcome: str, metrics: "JobMetrics"
+    ) -> None:
+        """Add one run to the stored totals of a job.
+
+        ``outcome`` is one of ``OUTCOMES``; the ``last_*`` fields of
+        ``metrics`` describe the run unless it was skipped.
+        """
+
+    @abc.abstractmethod
+    async def metrics(self) -> list[dict]:
+        """Totals of every stored job, shaped like ``Scheduler.metrics``."""
+
+
+class MemoryJobStore(JobStore):
+    """Job store for schedulers sharing one process."""
+
     def __init__(self) -> None:
-        self.jobs: list[Job] = []
+        self._state: dict[str, dict] = {}
+        self._metrics: dict[str, JobMetrics] = {}
+
+    async def register(self, job_id, next_run):
+        state = self._state.setdefault(
+            job_id,
+            {"last_run": None, "next_run": next_run, "owner": None, "lease_until": None},
+        )
+        return state["last_run"], state["next_run"]
+
+    async def claim(self, job_id, owner, now, next_run, lease_until):
+        state = self._state[job_id]
+        due = state["next_run"] is None or state["next_run"] <= now
+        leased = state["lease_until"] is not None and state["lease_until"] > now
+        if not due or leased:
+            return False, state["next_run"]
+        state.update(next_run=next_run, owner=owner, lease_until=lease_until)
+        return True, next_run
+
+    async def release(self, job_id, owner, last_run):
+        state = self._state[job_id]
+        if state["owner"] != owner:
+            return
+        state.update(owner=None, lease_until=None)
+        if last_run is not None:
+            state["last_run"] = last_run
+
+    async def record_run(self, job_id, outcome, metrics):
+        self._metrics.setdefault(job_id, JobMetrics()).add(outcome, metrics)
+
+    async def metrics(self):
+        now = datetime.datetime.now()
+        result = []
+        for job_id, metrics in sorted(self._metrics.items()):
+            state = self._state.get(job_id, {})
+            lease_until = state.get("lease_until")
+            result.append(
+                {
+                    "job": job_id,
+                    "next_run": state.get("next_run"),
+                    "running": int(lease_until is not None and lease_until > now),
+                    "runs": metrics.runs,
+                    **asdict(metrics),
+                }
+            )
+        return result
+
+
+@dataclass(slots=True)
+class JobMetrics:
+    """Counters and timings of the runs of one job, in seconds."""
+
+    successes: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    skipped: int = 0
+    last_lag: None | float = None
+    max_lag: float = 0.0
+    last_duration: None | float = None
+    max_duration: float = 0.0
+    total_duration: float = 0.0
+    last_started_at: None | datetime.datetime = None
+    last_success_at: None | datetime.datetime = None
+    last_failure_at: None | datetime.datetime = None
+    last_exception: None | str = None
+    last_outcome: None | str = None
+
+    @property
+    def runs(self) -> int:
+        return self.successes + self.failures + self.timeouts
+
+    def started(self, due: None | datetime.datetime) -> None:
+        self.last_started_at = datetime.datetime.now()
+        if due is not None:
+            self.last_lag = (self.last_started_at - due).total_seconds()
+            self.max_lag = max(self.max_lag, self.last_lag)
+
+    def finished(self, duration: float, error: None | BaseException = None) -> None:
+        self.last_duration = duration
+        self.max_duration = max(self.max_duration, duration)
+        self.total_duration += duration
+        if error is None:
+            self.successes += 1
+            self.last_outcome = "success"
+            self.last_success_at = datetime.datetime.now()
+            return
+        if isinstance(error, asyncio.TimeoutError):
+            self.timeouts += 1
+            self.last_outcome = "timeout"
+        else:
+            self.failures += 1
+            self.last_outcome = "failure"
+        self.last_failure_at = datetime.datetime.now()
+        self.last_exception = f"{type(error).__name__}: {error}"
+
+    def add(self, outcome: str, run: "JobMetrics") -> None:
+        """Count one run described by the ``last_*`` fields of ``run``."""
+        if outcome == "skipped":
+            self.skipped += 1
+            return
+        setattr(self, OUTCOMES[outcome], getattr(self, OUTCOMES[outcome]) + 1)
+        self.last_outcome = outcome
+        self.last_started_at = run.last_started_at
+        self.last_lag = run.last_lag
+        self.max_lag = max(self.max_lag, run.last_lag or 0.0)
+        self.last_duration = run.last_duration
+        self.max_duration = max(self.max_duration, run.last_duration or 0.0)
+        self.total_duration += run.last_duration or 0.0
+        if outcome == "success":
+            self.last_success_at = run.last_success_at
+        else:
+            self.last_failure_at = run.last_failure_at
+            self.last_exception = run.last_exception
+
+
+@functools.lru_cache(maxsize=None)
+def get_zone(name: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ScheduleValueError(f"Unknown timezone {name!r}") from None
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _timestamp(moment: None | datetime.datetime) -> float:
+    return moment.timestamp() if moment is not None else 0.0
+
+
+def prometheus_text(snapshots: list[dict]) -> str:
+    """Job metrics snapshots in the Prometheus text exposition format."""
+    families = {
+        "scheduler_job_runs_total": ("counter", "Finished runs by outcome."),
+        "scheduler_job_skipped_total": (
+            "counter",
+            "Runs dropped because earlier runs were still going.",
+        ),
+        "scheduler_job_running": ("gauge", "Runs in progress."),
+        "scheduler_job_lag_seconds": (
+            "gauge",
+            "Start delay of the last run behind its schedule.",
+        ),
+        "scheduler_job_lag_seconds_max": ("gauge", "Largest start delay."),
+        "scheduler_job_duration_seconds": ("summary", "Run durations."),
+        "scheduler_job_last_success_timestamp_seconds": (
+            "gauge",
+            "When the last successful run finished.",
+        ),
+        "scheduler_job_last_failure_timestamp_seconds": (
+            "gauge",
+            "When the last failed run finished.",
+        ),
+    }
+    samples: dict[str, list[str]] = {name: [] for name in families}
+    for job in snapshots:
+        label = f'job="{_label(job["job"])}"'
+        for outcome, count in (
+            ("success", job["successes"]),
+            ("failure", job["failures"]),
+            ("timeout", job["timeouts"]),
+        ):
+            samples["scheduler_job_runs_total"].append(
+                f'scheduler_job_runs_total{{{label},outcome="{outcome}"}} {count}'
+            )
+        for name, value in (
+            ("scheduler_job_skipped_total", job["skipped"]),
+            ("scheduler_job_running", job["running"]),
+            ("scheduler_job_lag_seconds", job["last_lag"] or 0.0),
+            ("scheduler_job_lag_seconds_max", job["max_lag"]),
+            (
+                "scheduler_job_last_success_timestamp_seconds",
+                _timestamp(job["last_success_at"]),
+            ),
+            (
+                "scheduler_job_last_failure_timestamp_seconds",
+                _timestamp(job["last_failure_at"]),
+            ),
+        ):
+            samples[name].append(f"{name}{{{label}}} {value}")
+        samples["scheduler_job_duration_seconds"] += [
+            f"scheduler_job_duration_seconds_sum{{{label}}} "
+            f"{job['total_duration']}",
+            f"scheduler_job_duration_seconds_count{{{label}}} {job['runs']}",
+        ]
+    lines = []
+    for name, (kind, help_text) in families.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples[name])
+    return "\n".join(lines) + "\n"
+
+
+class Scheduler:
+    """Runs jobs from a min-heap keyed on ``next_run``.
+
+    Heap entries are ``[next_run, sequence, job]`` lists; rescheduling or
+    cancelling a job only invalidates its entry (``job`` set to ``None``), so
+    adding, rescheduling and cancelling are all O(log n) and ``serve`` can
+    sleep exactly until the earliest live entry is due.
+
+    Due jobs run as background tasks and their next run is scheduled when
+    they start, so a slow job never holds up the loop or the other jobs.
+    With a ``store``, named jobs share their schedule with every scheduler
+    on the same store: each due run is claimed by exactly one of them, and
+    runs missed while all of them were down follow the catch-up policy. Their
+    runs are also added to totals in the store, so other processes can serve
+    the metrics of jobs they do not run.
+    """
+
+    def __init__(self, store: None | JobStore = None, owner: None | str = None) -> None:
+        self.store = store
+        self.owner = owner or uuid.uuid4().hex
+        self._jobs: dict[Job, None] = {}
+        self._heap: list[list] = []
+        self._entries: dict[Job, list] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._unrestored: dict[Job, None] = {}
+        self._running: set[asyncio.Task] = set()
+
+    @property
+    def jobs(self) -> list["Job"]:
+        return list(self._jobs)
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    def metrics(self) -> list[dict]:
+        """Snapshot of the metrics of every scheduled job."""
+        return [
+            {
+                "job": job.name,
+                "next_run": job.next_run,
+                "running": job.running,
+                "runs": job.metrics.runs,
+                **asdict(job.metrics),
+            }
+            for job in self._jobs
+        ]
+
+    def prometheus_text(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        return prometheus_text(self.metrics())
 
     async def run_pending(self, *args, **kwargs):
-        jobs = [asyncio.create_task(job.run()) for job in self.jobs if job.should_run]
+        await self._restore()
+        jobs = self._dispatch_pending()
         if not jobs:
             return [], []
         done, pending = await asyncio.wait(jobs, *args, **kwargs)
@@ -44,53 +366,276 @@ class Scheduler:
                 DeprecationWarning,
                 stacklevel=2,
             )
-        jobs = [asyncio.create_task(self._run_job(job)) for job in self.jobs[:]]
+        jobs = [task for job in self.jobs if (task := self._dispatch(job))]
         if not jobs:
             return [], []
         done, pending = await asyncio.wait(jobs, *args, **kwargs)
         return done, pending
 
+    async def serve(self) -> None:
+        """Run jobs forever, sleeping until the next one is due.
+
+        Adding, rescheduling or cancelling a job wakes the loop up early, and
+        with no jobs at all it sleeps until one is added.
+        """
+        while True:
+            self._wakeup.clear()
+            await self._restore()
+            self._dispatch_pending()
+            idle_seconds = self.idle_seconds
+            if idle_seconds is not None and idle_seconds <= 0:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=idle_seconds)
+            except asyncio.TimeoutError:
+                pass
+
     def get_jobs(self, tag: None | Hashable = None) -> list["Job"]:
         if tag is None:
-            return self.jobs[:]
-        return [job for job in self.jobs if tag in job.tags]
+            return self.jobs
+        return [job for job in self._jobs if tag in job.tags]
 
     def clear(self, tag: None | Hashable = None) -> None:
         if tag is None:
             logger.info("Deleting *all* jobs")
-            del self.jobs[:]
+            self._jobs.clear()
+            self._entries.clear()
+            self._heap.clear()
         else:
             logger.info('Deleting all jobs tagged "%s"', tag)
-            self.jobs[:] = (job for job in self.jobs if tag not in job.tags)
+            for job in self.get_jobs(tag):
+                self._remove(job)
+        self._wakeup.set()
 
     def cancel_job(self, job: "Job") -> None:
-        try:
+        if job in self._jobs:
             logger.info('Cancelling job "%s"', str(job))
-            self.jobs.remove(job)
-        except ValueError:
+            self._remove(job)
+            self._wakeup.set()
+        else:
             logger.info('Cancelling not-scheduled job "%s"', str(job))
 
     def every(self, interval: int = 1) -> "Job":
         job = Job(interval, self)
         return job
 
-    async def _run_job(self, job: "Job"):
-        ret = await job.run()
+    def cron(self, expression: str, tz: None | str | datetime.tzinfo = None) -> "Job":
+        """A job running at the minutes matching a five-field cron expression,
+        evaluated in ``tz`` (local time by default)."""
+        job = Job(1, self)
+        try:
+            job.cron_spec = parse_cron(expression)
+        except ValueError as error:
+            raise ScheduleValueError(str(error)) from None
+        job.unit = "cron"
+        if tz is not None:
+            job.at_time_zone = _to_zone(tz)
+        return job
 
-    @property
-    def get_next_run(self, tag: None | Hashable = None) -> None | datetime.datetime:
-        if not self.jobs:
+    def once(self, when: datetime.datetime, job_func: Callable, *args, **kwargs):
+        """Run ``job_func`` a single time at ``when`` (naive local time)."""
+        job = Job(1, self).seconds
+        job.job_func = functools.partial(job_func, *args, **kwargs)
+        functools.update_wrapper(job.job_func, job_func)
+        job.next_run = when
+        # Any run after ``when`` is overdue, so the job leaves the schedule
+        # as soon as it starts.
+        job.cancel_after = when
+        self._add_job(job)
+        return job
+
+    def _add_job(self, job: "Job") -> None:
+        self._jobs[job] = None
+        self._push(job)
+        if self.store is not None and job.job_id is not None:
+            self._unrestored[job] = None
+
+    def _push(self, job: "Job") -> None:
+        self._invalidate(job)
+        entry = [job.next_run, next(self._counter), job]
+        self._entries[job] = entry
+        heapq.heappush(self._heap, entry)
+        self._wakeup.set()
+
+    def _invalidate(self, job: "Job") -> None:
+        entry = self._entries.pop(job, None)
+        if entry is not None:
+            entry[-1] = None
+
+    def _remove(self, job: "Job") -> None:
+        self._jobs.pop(job, None)
+        self._invalidate(job)
+
+    def _dispatch_pending(self) -> list[asyncio.Task]:
+        now = datetime.datetime.now()
+        tasks = []
+        while self._heap and self._heap[0][0] <= now:
+            *_, job = heapq.heappop(self._heap)
+            if job is None:
+                continue
+            del self._entries[job]
+            task = self._dispatch(job)
+            if task is not None:
+                tasks.append(task)
+        return tasks
+
+    def _dispatch(self, job: "Job") -> None | asyncio.Task:
+        """Schedule the next run of a due job, then start the current one.
+
+        Deadlines set with ``until`` are checked against the time a run was
+        due, so a run that was due in time still happens when started late.
+        """
+        if job._is_overdue(job.next_run):
+            logger.info("Cancelling job %s", job)
+            self._remove(job)
             return None
-        jobs_filtered = self.get_jobs(tag)
-        if not jobs_filtered:
+        due = job.next_run
+        job._schedule_next_run()
+        if job._is_overdue(job.next_run):
+            self._remove(job)
+        else:
+            self._push(job)
+        return self._start(job, due=due)
+
+    def _start(
+        self, job: "Job", times: int = 1, due: None | datetime.datetime = None
+    ) -> None | asyncio.Task:
+        """Start ``times`` consecutive runs of ``job`` as a background task.
+
+        Once ``max_instances`` runs are in flight, "skip" drops the new run and
+        "queue" lets it wait for a free slot, keeping at most
+        ``max_instances`` runs waiting.
+        """
+        busy = job.running + job.queued >= job.max_instances
+        if busy and (job.overlap_policy == "skip" or job.queued >= job.max_instances):
+            logger.warning(
+                'Skipping job "%s": %d instance(s) still running', job, job.running
+            )
+            job.metrics.skipped += 1
+            if self.store is not None and job.job_id is not None:
+                self._track(asyncio.create_task(self._record(job, "skipped")))
             return None
-        return min(jobs_filtered).next_run
+        job.queued += 1
+        task = asyncio.create_task(self._execute(job, times, due))
+        self._track(task)
+        return task
+
+    def _track(self, task: asyncio.Task) -> None:
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _execute(self, job: "Job", times: int, due: None | datetime.datetime):
+        if job._slots is None:
+            job._slots = asyncio.Semaphore(job.max_instances)
+        try:
+            if not await self._claim(job):
+                return None
+            if job.jitter_seconds:
+                await asyncio.sleep(random.uniform(0, job.jitter_seconds))
+            await job._slots.acquire()
+        finally:
+            job.queued -= 1
+        job.running += 1
+        ret = None
+        try:
+            for _ in range(times):
+                ret = await job.run(due)
+                due = None
+                await self._record(job, job.metrics.last_outcome)
+                if isinstance(ret, CancelJob) or ret is CancelJob:
+                    self.cancel_job(job)
+                    break
+        finally:
+            job.running -= 1
+            job._slots.release()
+            await self._release(job)
+        return ret
+
+    async def _claim(self, job: "Job") -> bool:
+        if self.store is None or job.job_id is None:
+            return True
+        now = datetime.datetime.now()
+        lease = job.jitter_seconds + (job.timeout_seconds or DEFAULT_LEASE_SECONDS)
+        try:
+            claimed, next_run = await self.store.claim(
+                job.job_id,
+                self.owner,
+                now,
+                job.next_run,
+                now + datetime.timedelta(seconds=lease),
+            )
+        except Exception:
+            logger.exception('Failed to claim job "%s"', job)
+            return False
+        if not claimed:
+            logger.info('Job "%s" is run by another scheduler', job)
+            # Follow the schedule of the scheduler that took the run.
+            if next_run is not None and next_run > now and job in self._entries:
+                job.next_run = next_run
+                self._push(job)
+        return claimed
+
+    async def _release(self, job: "Job") -> None:
+        if self.store is None or job.job_id is None:
+            return
+        try:
+            await self.store.release(job.job_id, self.owner, job.last_run)
+        except Exception:
+            logger.exception('Failed to release job "%s"', job)
+
+    async def _record(self, job: "Job", outcome: str) -> None:
+        """Add a run of a named job to the totals kept in the store."""
+        if self.store is None or job.job_id is None:
+            return
+        try:
+            await self.store.record_run(job.job_id, outcome, job.metrics)
+        except Exception:
+            logger.exception('Failed to record a run of job "%s"', job)
+
+    async def _restore(self) -> None:
+        """Align newly added named jobs with the store and catch up missed runs."""
+        while self._unrestored:
+            job = next(iter(self._unrestored))
+            del self._unrestored[job]
+            if job not in self._jobs:
+                continue
+            try:
+                last_run, next_run = await self.store.register(
+                    job.job_id, job.next_run
+                )
+            except Exception:
+                logger.exception('Failed to register job "%s"', job)
+                continue
+            job.last_run = last_run
+            missed = job._missed_runs(next_run, datetime.datetime.now())
+            if not missed:
+                job.next_run = next_run
+                self._push(job)
+            elif job.catch_up_policy == "skip":
+                logger.info('Skipping %d missed run(s) of job "%s"', missed, job)
+            else:
+                times = 1 if job.catch_up_policy == "once" else missed
+                logger.info('Catching up %d missed run(s) of job "%s"', times, job)
+                self._start(job, times, due=next_run)
+
+    def get_next_run(self, tag: None | Hashable = None) -> None | datetime.datetime:
+        if tag is not None:
+            jobs_filtered = self.get_jobs(tag)
+            if not jobs_filtered:
+                return None
+            return min(jobs_filtered).next_run
+        while self._heap and self._heap[0][-1] is None:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        return self._heap[0][0]
 
     @property
     def idle_seconds(self) -> None | float:
-        if not self.get_next_run:
+        next_run = self.get_next_run()
+        if not next_run:
             return None
-        return (self.get_next_run - datetime.datetime.now()).total_seconds()
+        return (next_run - datetime.datetime.now()).total_seconds()
 
 
 class Job:
@@ -100,17 +645,34 @@ class Job:
         self.job_func: None | functools.partial = None
         self.unit: None | str = None
         self.at_time: None | datetime.time = None
-        self.at_time_zone = None
+        self.at_time_zone: None | datetime.tzinfo = None
+        self.cron_spec: None | CronSpec = None
         self.last_run: None | datetime.datetime = None
         self.next_run: None | datetime.datetime = None
         self.start_day: None | str = None
         self.cancel_after: None | datetime.datetime = None
         self.tags: set = set()
         self.scheduler: None | Scheduler = scheduler
+        self.job_id: None | str = None
+        self.max_instances: int = 1
+        self.overlap_policy: str = "skip"
+        self.timeout_seconds: None | float = None
+        self.jitter_seconds: float = 0
+        self.catch_up_policy: str = "skip"
+        self.running: int = 0
+        self.queued: int = 0
+        self._slots: None | asyncio.Semaphore = None
+        self.metrics = JobMetrics()
 
     def __lt__(self, other):
         return self.next_run < other.next_run
 
+    @property
+    def name(self) -> str:
+        if self.job_id is not None:
+            return self.job_id
+        return getattr(self.job_func, "__name__", repr(self.job_func))
+
     def __str__(self) -> str:
         if hasattr(self.job_func, "__name__"):
             job_func_name = self.job_func.__name__
@@ -145,6 +707,12 @@ class Job:
             call_repr = job_func_name + "(" + ", ".join(args + kwargs) + ")"
         else:
             call_repr = "[None]"
+        if self.cron_spec is not None:
+            return "Cron %r do %s %s" % (
+                self.cron_spec.expression,
+                call_repr,
+                timestats,
+            )
         if self.at_time is not None:
             return "Every %s %s at %s do %s %s" % (
                 self.interval,
@@ -285,36 +853,67 @@ class Job:
         self.tags.update(tags)
         return self
 
-    def at(self, time_str: str, tz: None | str = None):
+    def named(self, job_id: str):
+        """Give the job a stable id under which the store shares its schedule."""
+        self.job_id = job_id
+        return self
+
+    def overlap(self, max_instances: int = 1, policy: str = "skip"):
+        if max_instances < 1:
+            raise ScheduleValueError("`max_instances` should be at least 1")
+        if policy not in OVERLAP_POLICIES:
+            raise ScheduleValueError(
+                f"Invalid overlap policy (valid policies are {OVERLAP_POLICIES})"
+            )
+        self.max_instances = max_instances
+        self.overlap_policy = policy
+        return self
+
+    def timeout(self, seconds: float):
+        self.timeout_seconds = seconds
+        return self
+
+    def jitter(self, seconds: float):
+        """Delay every start by a random amount of up to ``seconds``."""
+        self.jitter_seconds = seconds
+        return self
+
+    def catch_up(self, policy: str):
+        """What to do with runs missed while the scheduler was down.
+
+        "skip" drops them, "once" runs the job a single time and "all" runs it
+        once per missed run (at most ``MAX_CATCH_UP_RUNS``). Needs a named job
+        and a scheduler with a store; only missed runs that no scheduler on
+        the store has claimed count.
+        """
+        if policy not in CATCH_UP_POLICIES:
+            raise ScheduleValueError(
+                f"Invalid catch-up policy (valid policies are {CATCH_UP_POLICIES})"
+            )
+        self.catch_up_policy = policy
+        return self
+
+    def at(self, time_str: str, tz: None | str | datetime.tzinfo = None):
         if self.unit not in ("days", "hours", "minutes") and not self.start_day:
             raise ScheduleValueError(
                 "Invalid unit (valid units are `days`, `hours`, and `minutes`)"
             )
         if tz is not None:
-            import pytz
-
-            if isinstance(tz, str):
-                self.at_time_zone = pytz.timezone(tz)
-            elif isinstance(tz, pytz.BaseTzInfo):
-                self.at_time_zone = tz
-            else:
-                raise ScheduleValueError(
-                    "Timezone must be string or pytz.timezone object"
-                )
+            self.at_time_zone = _to_zone(tz)
         if not isinstance(time_str, str):
             raise TypeError("at() should be passed a string")
         if self.unit == "days" or self.start_day:
-            if not re.match(r"^[0-2]\d:[0-5]\d(:[0-5]\d)?$", time_str):
+            if not DAILY_TIME.match(time_str):
                 raise ScheduleValueError(
                     "Invalid time format for a daily job (valid format is HH:MM(:SS)?)"
                 )
         if self.unit == "hours":
-            if not re.match(r"^([0-5]\d)?:[0-5]\d$", time_str):
+            if not HOURLY_TIME.match(time_str):
                 raise ScheduleValueError(
                     "Invalid time format for an hourly job (valid format is (MM)?:SS)"
                 )
         if self.unit == "minutes":
-            if not re.match(r"^:[0-5]\d$", time_str):
+            if not MINUTELY_TIME.match(time_str):
                 raise ScheduleValueError(
                     "Invalid time format for a minutely job (valid format is :SS)"
                 )
@@ -403,7 +1002,9 @@ class Job:
             raise ScheduleError(
                 "Unable to a add job to schedule. Job is not associated with an scheduler"
             )
-        self.scheduler.jobs.append(self)
+        if self.catch_up_policy != "skip" and self.job_id is None:
+            raise ScheduleError("Catching up missed runs needs a job named with named()")
+        self.scheduler._add_job(self)
         return self
 
     @property
@@ -411,34 +1012,79 @@ class Job:
         assert self.next_run is not None, "must run _schedule_next_run before"
         return datetime.datetime.now() >= self.next_run
 
-    async def run(self):
-        if self._is_overdue(datetime.datetime.now()):
-            logger.info("Cancelling job %s", self)
-            return CancelJob
+    async def run(self, due: None | datetime.datetime = None):
+        """Run the job function once; failures and timeouts are logged.
+
+        ``due`` is when the run was scheduled, used to measure its lag.
+        """
         logger.info("Running job %s", self)
-        ret = await self.job_func()
-        if isinstance(ret, CancelJob) or ret is CancelJob:
-            self.scheduler.cancel_job(self)
-            return ret
+        self.metrics.started(due)
+        started = time.perf_counter()
+        try:
+            if self.timeout_seconds is None:
+                ret = await self.job_func()
+            else:
+                ret = await asyncio.wait_for(self.job_func(), self.timeout_seconds)
+        except asyncio.TimeoutError as error:
+            self.metrics.finished(time.perf_counter() - started, error)
+            logger.error(
+                'Job "%s" timed out after %s seconds', self, self.timeout_seconds
+            )
+            return None
+        except Exception as error:
+            self.metrics.finished(time.perf_counter() - started, error)
+            logger.exception('Job "%s" failed', self)
+            return None
+        self.metrics.finished(time.perf_counter() - started)
         self.last_run = datetime.datetime.now()
-        self._schedule_next_run()
-        if self._is_overdue(self.next_run):
-            logger.info("Cancelling job %s", self)
-            return CancelJob
         return ret
 
     def _schedule_next_run(self) -> None:
-        if self.unit not in ("seconds", "minutes", "hours", "days", "weeks"):
+        self.next_run = self._next_run_after(datetime.datetime.now(), randomize=True)
+
+    def _missed_runs(self, due: datetime.datetime, now: datetime.datetime) -> int:
+        """Number of runs from ``due`` on that should have started by ``now``."""
+        missed = 0
+        moment = due
+        while moment <= now and missed < MAX_CATCH_UP_RUNS:
+            missed += 1
+            moment = self._next_run_after(moment)
+        return missed
+
+    def _next_run_after(
+        self, moment: datetime.datetime, randomize: bool = False
+    ) -> datetime.datetime:
+        """The first run strictly after ``moment`` (naive local time).
+
+        With a timezone the schedule is computed on naive wall-clock time of
+        that zone, which keeps ``at`` times fixed across DST changes, and
+        only the result is converted back to local time.
+        """
+        if self.cron_spec is not None:
+            wall = self._in_zone(moment)
+            while True:
+                wall = self.cron_spec.next_after(wall)
+                # Wall-clock times repeated by a DST change run once, on the
+                # second occurrence only when the first one has passed.
+                for fold in (0, 1):
+                    next_run = self._from_zone(wall, fold)
+                    if next_run > moment:
+                        return next_run
+        if self.unit not in UNITS:
             raise ScheduleValueError(
                 "Invalid unit (valid units are `seconds`, `minutes`, `hours`, `days`, and `weeks`)",
             )
         if self.latest is not None:
             if not (self.latest >= self.interval):
                 raise ScheduleError("`latest` is greater than `interval`")
-            interval = random.randint(self.interval, self.latest)
+            interval = (
+                random.randint(self.interval, self.latest)
+                if randomize
+                else self.interval
+            )
         else:
             interval = self.interval
-        now = datetime.datetime.now(self.at_time_zone)
+        now = self._in_zone(moment)
         next_run = now
         if self.start_day is not None:
             if self.unit != "weeks":
@@ -451,13 +1097,23 @@ class Job:
             next_run += period
         while next_run <= now:
             next_run += period
-        next_run = self._correct_utc_offset(
-            next_run, fixate_time=(self.at_time is not None)
-        )
-        if self.at_time_zone is not None:
-            next_run = next_run.astimezone()
-            next_run = next_run.replace(tzinfo=None)
-        self.next_run = next_run
+        return self._from_zone(next_run)
+
+    def _in_zone(self, moment: datetime.datetime) -> datetime.datetime:
+        if self.at_time_zone is None:
+            return moment
+        return moment.astimezone(self.at_time_zone).replace(tzinfo=None)
+
+    def _from_zone(self, wall: datetime.datetime, fold: int = 0) -> datetime.datetime:
+        """Local time of a wall-clock time in the job's timezone.
+
+        Times skipped by a DST change move forward by the size of the gap and
+        repeated times resolve to their first occurrence unless ``fold`` is 1.
+        """
+        if self.at_time_zone is None:
+            return wall
+        wall = wall.replace(tzinfo=self.at_time_zone, fold=fold)
+        return wall.astimezone().replace(tzinfo=None)
 
     def _move_to_at_time(self, moment: datetime.datetime) -> datetime.datetime:
         if self.at_time is None:
@@ -467,28 +1123,7 @@ class Job:
             kwargs["hour"] = self.at_time.hour
         if self.unit in ["days", "hours"] or self.start_day is not None:
             kwargs["minute"] = self.at_time.minute
-        moment = moment.replace(**kwargs)
-        moment = self._correct_utc_offset(moment, fixate_time=True)
-        return moment
-
-    def _correct_utc_offset(
-        self, moment: datetime.datetime, fixate_time: bool
-    ) -> datetime.datetime:
-        if self.at_time_zone is None:
-            return moment
-        offset_before_normalize = moment.utcoffset()
-        moment = self.at_time_zone.normalize(moment)
-        offset_after_normalize = moment.utcoffset()
-        if offset_before_normalize == offset_after_normalize:
-            return moment
-        if not fixate_time:
-            return moment
-        offset_diff = offset_after_normalize - offset_before_normalize
-        moment -= offset_diff
-        re_normalized_offset = self.at_time_zone.normalize(moment).utcoffset()
-        if re_normalized_offset != offset_after_normalize:
-            moment += offset_diff
-        return moment
+        return moment.replace(**kwargs)
 
     def _is_overdue(self, when: datetime.datetime):
         return self.cancel_after is not None and when > self.cancel_after
@@ -505,7 +1140,6 @@ class Job:
 
 
 default_scheduler = Scheduler()
-jobs = default_scheduler.jobs
 
 
 def every(interval: int = 1) -> Job:
@@ -520,6 +1154,10 @@ async def run_all(delay_seconds: int = 0) -> None:
     await default_scheduler.run_all(delay_seconds=delay_seconds)
 
 
+async def serve() -> None:
+    await default_scheduler.serve()
+
+
 def get_jobs(tag: None | Hashable = None) -> list[Job]:
     return default_scheduler.get_jobs(tag)
 
@@ -548,6 +1186,18 @@ def repeat(job, *args, **kwargs):
     return _schedule_decorator
 
 
+def cron(expression: str, tz: None | str | datetime.tzinfo = None) -> Job:
+    return default_scheduler.cron(expression, tz)
+
+
+def _to_zone(tz: str | datetime.tzinfo) -> datetime.tzinfo:
+    if isinstance(tz, str):
+        return get_zone(tz)
+    if isinstance(tz, datetime.tzinfo):
+        return tz
+    raise ScheduleValueError("Timezone must be a string or a tzinfo object")
+
+
 def _move_to_next_weekday(moment: datetime.datetime, weekday: str):
     weekday_index = _weekday_index(weekday)
     days_ahead = weekday_index - moment.weekday()
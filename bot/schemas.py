@@ -0,0 +1,99 @@
+from typing import Annotated, Any, NotRequired, TypedDict
+
+from pydantic import ConfigDict, Field, TypeAdapter, ValidationError, with_config
+
+# Validators and serializers are compiled by pydantic-core once, at import.
+# The schemas are TypedDicts, so a validated payload is a plain dict that
+# holds only the keys the client sent and goes on to the buffer unchanged.
+STRICT = ConfigDict(extra="forbid", strict=True)
+
+# Integer columns are SQLite INTEGERs, signed 64-bit.
+MAX_INT64 = 2**63 - 1
+Count = Annotated[int, Field(ge=0, le=MAX_INT64)]
+# String(100) columns.
+Name = Annotated[str, Field(min_length=1, max_length=100)]
+
+
+@with_config(STRICT)
+class UpgradeLevel(TypedDict):
+    name: Name
+    level: Count
+
+
+@with_config(STRICT)
+class ProgressPayload(TypedDict, total=False):
+    """A full progress (POST) or only its changed fields (PATCH)."""
+
+    # Telegram ids arrive as numbers or as strings of digits.
+    user_id: Annotated[int, Field(le=MAX_INT64)] | Annotated[
+        str, Field(pattern=r"^\d{1,19}$")
+    ]
+    seq: Annotated[int, Field(le=MAX_INT64)]
+    score: Count
+    level: Count
+    currency: Count
+    upgrades: list[UpgradeLevel]
+    active_skin: Name | None
+    owned_skins: list[Name]
+    # Sent once when the player opens the free chest, never with a resend.
+    open_free_chest: bool
+    # Derived from chest_opened_at on the server; older clients echo them
+    # back and they are ignored.
+    has_free_chest: bool
+    chest_ready_at: int | None
+
+
+class ProgressResponse(TypedDict):
+    score: int
+    level: int
+    currency: int
+    upgrades: list[dict[str, int]]
+    owned_skins: list[str]
+    active_skin: str | None
+    has_free_chest: bool
+    chest_ready_at: int | None
+    chest_cooldown_ms: int
+    save_seq: int
+    db_version: NotRequired[int]
+
+
+class LeaderboardEntry(TypedDict):
+    user_id: int
+    username: str | None
+    score: int
+    level: int
+
+
+class BootstrapResponse(TypedDict):
+    db_version: int
+    progress: ProgressResponse
+    leaderboard: list[LeaderboardEntry]
+
+
+progress_payload = TypeAdapter(ProgressPayload)
+progress_response = TypeAdapter(ProgressResponse)
+bootstrap_response = TypeAdapter(BootstrapResponse)
+
+
+class PayloadError(ValueError):
+    """A payload that is not JSON, not an object or does not fit the schema."""
+
+    def __init__(self, status_code: int, detail: Any) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def parse_progress(body: bytes) -> dict:
+    """Decode and validate a progress payload in a single pass."""
+    try:
+        return progress_payload.validate_json(body)
+    except ValidationError as exc:
+        errors = exc.errors(include_url=False, include_context=False)
+        if errors[0]["type"] == "json_invalid":
+            raise PayloadError(400, "Unable to parse JSON") from None
+        if errors[0]["loc"] == ():
+            raise PayloadError(400, "Payload must be a JSON object") from None
+        for error in errors:
+            error.pop("input", None)
+        raise PayloadError(422, errors) from None
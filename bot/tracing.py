@@ -0,0 +1,309 @@
+import contextvars
+import logging
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+logger = logging.getLogger("fastapi")
+
+# Upper bounds of the latency buckets, in seconds.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+# SQL kept per request for the slow-request log.
+MAX_LOGGED_STATEMENTS = 50
+MAX_STATEMENT_LENGTH = 300
+
+
+@dataclass(slots=True)
+class RequestTrace:
+    """Database work done while serving one request, in seconds."""
+
+    started: float = field(default_factory=time.perf_counter)
+    statements: int = 0
+    db_time: float = 0.0
+    pool_wait: float = 0.0
+    sql: list[tuple[str, float]] = field(default_factory=list)
+
+
+_current_trace: contextvars.ContextVar[RequestTrace | None] = contextvars.ContextVar(
+    "request_trace", default=None
+)
+
+
+class TracedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that charges the wait for a connection to the current request."""
+
+    def _do_get(self):
+        trace = _current_trace.get()
+        if trace is None:
+            return super()._do_get()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            trace.pool_wait += time.perf_counter() - started
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_trace.get() is not None:
+        context._trace_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = _current_trace.get()
+    started = getattr(context, "_trace_started", None)
+    if trace is None or started is None:
+        return
+    elapsed = time.perf_counter() - started
+    trace.statements += 1
+    trace.db_time += elapsed
+    if len(trace.sql) < MAX_LOGGED_STATEMENTS:
+        trace.sql.append((statement, elapsed))
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Attribute the statements of an engine to the request being served."""
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class RouteHistogram:
+    """Latency buckets and database totals of one route.
+
+    Cumulative counts feed ``/metrics``; a ring of ``slots`` windows of
+    ``slot_seconds`` each keeps the recent counts for rolling quantiles.
+    """
+
+    def __init__(self, slots: int, slot_seconds: float) -> None:
+        self.slot_seconds = slot_seconds
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.statements = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+        self.statuses: dict[int, int] = {}
+        self._ring = [[0] * len(self.buckets) for _ in range(slots)]
+        self._ring_ids = [-1] * slots
+
+    def _slot(self, now: float) -> list[int]:
+        slot_id = int(now // self.slot_seconds)
+        index = slot_id % len(self._ring)
+        if self._ring_ids[index] != slot_id:
+            self._ring_ids[index] = slot_id
+            self._ring[index] = [0] * len(self.buckets)
+        return self._ring[index]
+
+    def observe(self, seconds: float, status: int, trace: RequestTrace) -> None:
+        bucket = bisect_left(LATENCY_BUCKETS, seconds)
+        self.buckets[bucket] += 1
+        self._slot(time.monotonic())[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        self.statements += trace.statements
+        self.db_time += trace.db_time
+        self.pool_wait += trace.pool_wait
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def recent_quantiles(self, fractions=(0.5, 0.95, 0.99)) -> dict[str, float | None]:
+        """Upper bucket bounds of the quantiles over the rolling window."""
+        now_id = int(time.monotonic() // self.slot_seconds)
+        oldest = now_id - len(self._ring)
+        counts = [0] * len(self.buckets)
+        for slot_id, slot in zip(self._ring_ids, self._ring):
+            if slot_id > oldest:
+                counts = [total + count for total, count in zip(counts, slot)]
+        seen = sum(counts)
+        result = {}
+        for fraction in fractions:
+            key = f"p{round(fraction * 100)}"
+            if not seen:
+                result[key] = None
+                continue
+            running = 0
+            for bound, count in zip((*LATENCY_BUCKETS, float("inf")), counts):
+                running += count
+                if running >= fraction * seen:
+                    result[key] = bound
+                    break
+        return result
+
+
+class RequestTracer:
+    """Per-route request metrics and the slow-request log."""
+
+    def __init__(
+        self,
+        slow_threshold: float = 0.5,
+        window_slots: int = 6,
+        slot_seconds: float = 10.0,
+    ) -> None:
+        self.slow_threshold = slow_threshold
+        self.window_slots = window_slots
+        self.slot_seconds = slot_seconds
+        self.routes: dict[tuple[str, str], RouteHistogram] = {}
+        self.slow_requests = 0
+
+    def finish(
+        self, method: str, route: str, status: int, trace: RequestTrace
+    ) -> None:
+        elapsed = time.perf_counter() - trace.started
+        histogram = self.routes.get((method, route))
+        if histogram is None:
+            histogram = self.routes[method, route] = RouteHistogram(
+                self.window_slots, self.slot_seconds
+            )
+        histogram.observe(elapsed, status, trace)
+        if elapsed >= self.slow_threshold:
+            self.slow_requests += 1
+            self._log_slow(method, route, status, elapsed, trace)
+
+    def _log_slow(
+        self, method: str, route: str, status: int, elapsed: float, trace: RequestTrace
+    ) -> None:
+        statements = "".join(
+            f"\n  {seconds * 1000:8.2f} ms  "
+            f"{' '.join(statement.split())[:MAX_STATEMENT_LENGTH]}"
+            for statement, seconds in trace.sql
+        )
+        logger.warning(
+            "Slow request %s %s -> %d: %.1f ms, %d statements, %.1f ms in the "
+            "database, %.1f ms waiting for a connection%s",
+            method,
+            route,
+            status,
+            elapsed * 1000,
+            trace.statements,
+            trace.db_time * 1000,
+            trace.pool_wait * 1000,
+            statements,
+        )
+
+    def stats(self) -> dict:
+        routes = {
+            f"{method} {route}": {
+                "requests": histogram.count,
+                "mean_ms": histogram.total / histogram.count * 1000,
+                "statements_per_request": histogram.statements / histogram.count,
+                "db_ms_per_request": histogram.db_time / histogram.count * 1000,
+                "recent_seconds": histogram.recent_quantiles(),
+            }
+            for (method, route), histogram in self.routes.items()
+        }
+        return {"routes": routes, "slow_requests": self.slow_requests}
+
+    def prometheus_text(self) -> str:
+        """The route metrics in the Prometheus text exposition format."""
+        families = {
+            "http_request_duration_seconds": ("histogram", "Request latency."),
+            "http_requests_total": ("counter", "Finished requests by status."),
+            "http_request_sql_statements_total": (
+                "counter",
+                "SQL statements run while serving requests.",
+            ),
+            "http_request_db_seconds_total": (
+                "counter",
+                "Time spent in SQL statements while serving requests.",
+            ),
+            "http_request_pool_wait_seconds_total": (
+                "counter",
+                "Time requests waited for a database connection.",
+            ),
+            "http_slow_requests_total": (
+                "counter",
+                "Requests over the slow-request threshold.",
+            ),
+        }
+        samples: dict[str, list[str]] = {name: [] for name in families}
+        for (method, route), histogram in sorted(self.routes.items()):
+            label = f'method="{method}",route="{_label(route)}"'
+            name = "http_request_duration_seconds"
+            running = 0
+            for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), histogram.buckets):
+                running += count
+                samples[name].append(f'{name}_bucket{{{label},le="{bound}"}} {running}')
+            samples[name] += [
+                f"{name}_sum{{{label}}} {histogram.total}",
+                f"{name}_count{{{label}}} {histogram.count}",
+            ]
+            for status, count in sorted(histogram.statuses.items()):
+                samples["http_requests_total"].append(
+                    f'http_requests_total{{{label},status="{status}"}} {count}'
+                )
+            for name, value in (
+                ("http_request_sql_statements_total", histogram.statements),
+                ("http_request_db_seconds_total", histogram.db_time),
+                ("http_request_pool_wait_seconds_total", histogram.pool_wait),
+            ):
+                samples[name].append(f"{name}{{{label}}} {value}")
+        samples["http_slow_requests_total"].append(
+            f"http_slow_requests_total {self.slow_requests}"
+        )
+        lines = []
+        for name, (kind, help_text) in families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples[name])
+        return "\n".join(lines) + "\n"
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _route_of(scope: dict) -> str:
+    # FastAPI puts the matched route into the scope; mounts set root_path.
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    return scope.get("root_path") or "unmatched"
+
+
+class TracingMiddleware:
+    """ASGI middleware that traces each HTTP request.
+
+    The database work of the request is summed by the engine hooks of
+    ``instrument_engine`` and the ``TracedQueuePool``, sent back in a
+    ``Server-Timing`` header and recorded per route by the tracer.
+    """
+
+    def __init__(self, app, tracer: RequestTracer) -> None:
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        status = 500
+
+        async def send_with_timing(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - trace.started
+                timing = (
+                    f'db;dur={trace.db_time * 1000:.2f};desc="{trace.statements} '
+                    f'queries", pool;dur={trace.pool_wait * 1000:.2f}, '
+                    f"app;dur={elapsed * 1000:.2f}"
+                )
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", timing.encode()),
+                ]
+            await send(message)
+
+        token = _current_trace.set(trace)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(token)
+            self.tracer.finish(scope["method"], _route_of(scope), status, trace)
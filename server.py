@@ -1,37 +1,237 @@
+import os
+from functools import partial
 from pathlib import Path
 from typing import Any, Dict
 
 from fastapi import FastAPI, HTTPException, Query, Request
-from fastapi.responses import HTMLResponse, JSONResponse, Response
-from fastapi.staticfiles import StaticFiles
-from sqlalchemy import select
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response
 
-from bot.db.base import engine, init_db, sessionmaker
-from bot.db.func import fetch_leaderboard, save_progress, upgrades_to_dict
+from bot.auth import InitDataVerifier, WebAppSession
+from bot.cache import ResponseCache, encode_json, make_etag
+from bot.db.base import (
+    close_db,
+    db_engines,
+    init_db,
+    read_sessionmaker,
+    sessionmaker,
+)
+from bot.db.buffer import ProgressBuffer
+from bot.db.changes import ChangeFeed
+from bot.db.func import (
+    fetch_growth_baseline,
+    fetch_save_seq,
+    fetch_scores,
+    fetch_scores_of,
+    load_progress,
+    progress_cache,
+)
 from bot.db.models import Base, User  # noqa
+from bot.db.shards import global_sessionmaker
+from bot.jobs import SQLJobStore
+from bot.leaderboard import Leaderboard
+from bot.limits import GrowthGuard, RateLimiter
+from bot.page import ClickerPage, HashedStaticFiles, pick_encoding
+from bot.scheduler import prometheus_text
+from bot.schemas import (
+    MAX_INT64,
+    PayloadError,
+    bootstrap_response,
+    parse_progress,
+    progress_response,
+)
+from bot.tracing import RequestTracer, TracingMiddleware, instrument_engine
 
 BASE_DIR = Path(__file__).parent
 CLICKER_TEMPLATE_PATH = BASE_DIR / "templates" / "clicker.html"
 STATIC_DIR = BASE_DIR / "static"
 DB_VERSION = 1
+WEBAPP_DEV = os.getenv("WEBAPP_DEV", "") == "1"
+SAVE_FLUSH_INTERVAL = float(os.getenv("SAVE_FLUSH_INTERVAL", "1.0"))
+SAVE_FLUSH_MAX_USERS = int(os.getenv("SAVE_FLUSH_MAX_USERS", "500"))
+LEADERBOARD_CACHE_TTL = float(os.getenv("LEADERBOARD_CACHE_TTL", "5"))
+# Outside Telegram (local development) there is no initData to verify.
+WEBAPP_AUTH = os.getenv("WEBAPP_AUTH", "0" if WEBAPP_DEV else "1") == "1"
+INIT_DATA_HEADER = "x-telegram-init-data"
+SAVE_RATE = float(os.getenv("SAVE_RATE", "5"))
+SAVE_BURST = float(os.getenv("SAVE_BURST", "20"))
+MAX_CLICKS_PER_SECOND = float(os.getenv("MAX_CLICKS_PER_SECOND", "20"))
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+# How stale the caches of one uvicorn worker may get after another worker
+# saves. Off by default for a single worker; set it (e.g. 1.0) when running
+# more than one, or their caches and growth baselines drift apart.
+CACHE_SYNC_INTERVAL = float(os.getenv("CACHE_SYNC_INTERVAL", "0"))
+
+change_feed = (
+    ChangeFeed(sessionmaker, read_sessionmaker, interval=CACHE_SYNC_INTERVAL)
+    if CACHE_SYNC_INTERVAL > 0
+    else None
+)
+leaderboard = Leaderboard()
+progress_buffer = ProgressBuffer(
+    sessionmaker,
+    flush_interval=SAVE_FLUSH_INTERVAL,
+    max_pending=SAVE_FLUSH_MAX_USERS,
+    cache=progress_cache,
+    changes=change_feed,
+    leaderboard=leaderboard,
+)
+leaderboard_cache = ResponseCache(ttl=LEADERBOARD_CACHE_TTL)
+clicker_page = ClickerPage(CLICKER_TEMPLATE_PATH, STATIC_DIR, hot_reload=WEBAPP_DEV)
+save_limiter = RateLimiter(SAVE_RATE, SAVE_BURST)
+growth_guard = GrowthGuard(
+    partial(fetch_growth_baseline, read_sessionmaker),
+    clicks_per_second=MAX_CLICKS_PER_SECOND,
+)
+request_tracer = RequestTracer(slow_threshold=SLOW_REQUEST_MS / 1000)
+# Jobs run in the bot process; the app only reads the totals they leave in
+# the job store.
+job_store = SQLJobStore(global_sessionmaker(read_sessionmaker))
+for writer, reader in db_engines:
+    instrument_engine(writer)
+    instrument_engine(reader)
+init_data_verifier = InitDataVerifier(
+    os.getenv("BOT_TOKEN", ""),
+    max_age=float(os.getenv("INIT_DATA_MAX_AGE", "86400")),
+    session_ttl=float(os.getenv("INIT_DATA_SESSION_TTL", "300")),
+)
 
 
 async def on_startup() -> None:
-    await init_db(engine)
+    clicker_page.compile()
+    for writer, _ in db_engines:
+        await init_db(writer)
+    if change_feed is not None:
+        await change_feed.start()
+    leaderboard.load(await fetch_scores(read_sessionmaker))
+    progress_buffer.start()
+
+
+async def on_shutdown() -> None:
+    await progress_buffer.stop()
+    for writer, reader in db_engines:
+        await close_db(writer)
+        await close_db(reader)
+
+
+app = FastAPI(on_startup=[on_startup], on_shutdown=[on_shutdown])
+app.add_middleware(TracingMiddleware, tracer=request_tracer)
+app.mount(
+    "/static",
+    HashedStaticFiles(directory=STATIC_DIR, immutable=not WEBAPP_DEV),
+    name="static",
+)
+
 
+def parse_user_id(value: Any) -> int | None:
+    """The client sends Telegram ids as strings; normalise them to int."""
+    try:
+        user_id = int(value)
+    except (TypeError, ValueError):
+        return None
+    return user_id if 0 < user_id <= MAX_INT64 else None
+
+
+def authenticate(request: Request) -> WebAppSession | None:
+    """The Telegram session proven by the signed initData of the request.
 
-app = FastAPI(on_startup=[on_startup])
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+    Raises 401 without valid initData; returns ``None`` with ``WEBAPP_AUTH``
+    off.
+    """
+    if not WEBAPP_AUTH:
+        return None
+    session: WebAppSession | None = init_data_verifier.verify(
+        request.headers.get(INIT_DATA_HEADER)
+    )
+    if session is None:
+        raise HTTPException(status_code=401, detail="Telegram init data required")
+    return session
 
 
-def load_clicker_markup() -> str:
-    """Read the clicker template from disk."""
-    return CLICKER_TEMPLATE_PATH.read_text(encoding="utf-8")
+def resolve_user_id(session: WebAppSession | None, claimed: Any) -> int | None:
+    """The user a request acts for; a claimed id must match the verified one."""
+    if session is None:
+        return parse_user_id(claimed)
+    if claimed is not None and parse_user_id(claimed) != session.user_id:
+        raise HTTPException(status_code=403, detail="User id does not match")
+    return session.user_id
+
+
+def resolve_username(session: WebAppSession | None, claimed: str | None) -> str | None:
+    """The verified Telegram username; the query parameter only without auth."""
+    return claimed if session is None else session.username
+
+
+async def read_progress(request: Request) -> dict:
+    """The validated progress payload; unknown keys and bad types are rejected."""
+    try:
+        return parse_progress(await request.body())
+    except PayloadError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
+
+
+async def guard_save(user_id: int, progress: dict) -> None:
+    """Reject saves that come too often or grow faster than the game allows."""
+    retry_after = save_limiter.take(user_id)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many saves",
+            headers={"Retry-After": str(max(1, round(retry_after)))},
+        )
+    if not await growth_guard.check(user_id, progress):
+        raise HTTPException(status_code=422, detail="Implausible progress")
+
+
+async def sync_workers() -> None:
+    """Drop what other workers changed from the caches of this one."""
+    if change_feed is None:
+        return
+    user_ids = await change_feed.poll()
+    if user_ids is None:
+        progress_cache.clear()
+        leaderboard.load(await fetch_scores(read_sessionmaker))
+        leaderboard_cache.invalidate()
+        return
+    if not user_ids:
+        return
+    for user_id in user_ids:
+        progress_cache.invalidate(user_id)
+        growth_guard.forget(user_id)
+    for entry in await fetch_scores_of(read_sessionmaker, user_ids):
+        leaderboard.add(**entry)
+    leaderboard_cache.invalidate()
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    # If-None-Match always uses the weak comparison.
+    etag = etag.removeprefix("W/")
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return any(tag in (etag, "*") for tag in candidates)
+
+
+def conditional_response(request: Request, body: bytes, etag: str) -> Response:
+    """Answer with 304 when the client already holds this representation."""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
 
 
 @app.get("/", response_class=HTMLResponse)
-async def index() -> HTMLResponse:
-    return HTMLResponse(load_clicker_markup())
+async def index(request: Request) -> Response:
+    page = clicker_page.get()
+    coding = pick_encoding(request.headers.get("accept-encoding"), page.variants)
+    etag = f'"{page.etag}-{coding}"'
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    if coding != "identity":
+        headers["Content-Encoding"] = coding
+    return HTMLResponse(page.variants[coding], headers=headers)
 
 
 @app.get("/api/database")
@@ -48,59 +248,173 @@ async def check_database(
 
 @app.get("/api/clicker")
 async def load_clicker_result(
-    user_id: int | None = Query(default=None, ge=0),
+    request: Request,
+    user_id: int | None = Query(default=None, ge=0, le=MAX_INT64),
     username: str | None = Query(default=None),
 ) -> Response:
+    session = authenticate(request)
+    user_id = resolve_user_id(session, user_id)
     if not user_id:
         return Response(status_code=204)
+    username = resolve_username(session, username)
+
+    await sync_workers()
+    await progress_buffer.flush_user(user_id)
+    progress, created = await load_progress(
+        sessionmaker,
+        user_id,
+        username,
+        read_sessionmaker=read_sessionmaker,
+        cache=progress_cache,
+        changes=change_feed,
+    )
+    if created:
+        leaderboard.add(user_id, username)
+    growth_guard.seed(user_id, progress)
 
-    async with sessionmaker() as session:
-        user = await session.scalar(select(User).where(User.user_id == user_id))
+    progress["db_version"] = DB_VERSION
+    return Response(progress_response.dump_json(progress), media_type="application/json")
 
-        if not user:
-            user = User(user_id=user_id, username=username)
-            session.add(user)
-            await session.commit()
 
-        upgrades = await user.awaitable_attrs.upgrades
-        owned_skins = await user.awaitable_attrs.owned_skins
-        _ = [skin.name for skin in owned_skins]
+@app.get("/api/bootstrap")
+async def load_bootstrap(
+    request: Request,
+    user_id: int | None = Query(default=None, ge=0, le=MAX_INT64),
+    username: str | None = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=50),
+) -> Response:
+    """Version, progress and a leaderboard slice in a single round trip."""
+    session = authenticate(request)
+    user_id = resolve_user_id(session, user_id)
+    if not user_id:
+        return Response(status_code=204)
+    username = resolve_username(session, username)
+
+    await sync_workers()
+    await progress_buffer.flush_user(user_id)
+    progress, created = await load_progress(
+        sessionmaker,
+        user_id,
+        username,
+        read_sessionmaker=read_sessionmaker,
+        cache=progress_cache,
+        changes=change_feed,
+    )
+    if created:
+        leaderboard.add(user_id, username)
+    growth_guard.seed(user_id, progress)
 
-    progress: Dict[str, Any] = {
-        "score": user.score,
-        "level": user.level,
-        "currency": user.currency,
-        "upgrades": upgrades_to_dict(upgrades),
-        "owned_skins": _,
-        "active_skin": user.active_skin,
-        "has_free_chest": user.has_free_chest,
-        "db_version": DB_VERSION,
-    }
-    return JSONResponse(progress)
+    # The ETag only covers what the client caches locally, so an unchanged
+    # player gets a 304 even when the leaderboard slice has moved; the tag is
+    # weak because the slice is not part of it.
+    etag = "W/" + make_etag(encode_json([DB_VERSION, progress]))
+    body = bootstrap_response.dump_json(
+        {
+            "db_version": DB_VERSION,
+            "progress": progress,
+            "leaderboard": leaderboard.top(limit),
+        }
+    )
+    return conditional_response(request, body, etag)
 
 
 @app.post("/api/clicker")
 async def save_clicker_result(request: Request) -> Response:
-    try:
-        progress = await request.json()
-    except Exception as exc:  # noqa
-        raise HTTPException(status_code=400, detail="Unable to parse JSON")
+    # Checked before the body is read so forged saves cost next to nothing.
+    session = authenticate(request)
+    progress = await read_progress(request)
+    user_id = resolve_user_id(session, progress.get("user_id", None))
+
+    if not user_id:
+        raise HTTPException(status_code=400, detail="Valid user id required")
+
+    await guard_save(user_id, progress)
+    progress["user_id"] = user_id
+    progress_buffer.put(progress)
+    return Response(status_code=204)
 
-    if not isinstance(progress, dict):
-        raise HTTPException(status_code=400, detail="Payload must be a JSON object")
 
-    user_id = progress.get("user_id", None)
+def stale_sequence(save_seq: int) -> JSONResponse:
+    return JSONResponse(
+        {"detail": "Stale sequence number", "save_seq": save_seq},
+        status_code=409,
+    )
+
+
+@app.patch("/api/clicker")
+async def patch_clicker_result(request: Request) -> Response:
+    session = authenticate(request)
+    delta = await read_progress(request)
+    user_id = resolve_user_id(session, delta.pop("user_id", None))
+    seq = delta.pop("seq", None)
 
     if not user_id:
         raise HTTPException(status_code=400, detail="Valid user id required")
+    if not isinstance(seq, int) or seq <= 0:
+        raise HTTPException(status_code=400, detail="Valid sequence number required")
+    await guard_save(user_id, delta)
 
-    await save_progress(sessionmaker, progress)
+    # Only the staleness check is answered now; the delta itself is written
+    # by the buffer, which checks seq against the database once more.
+    save_seq = await fetch_save_seq(read_sessionmaker, user_id, cache=progress_cache)
+    if save_seq is None:
+        raise HTTPException(status_code=404, detail="Unknown user")
+    save_seq = max(save_seq, progress_buffer.pending_seq(user_id))
+    if seq <= save_seq:
+        return stale_sequence(save_seq)
+    progress_buffer.put({**delta, "user_id": user_id, "seq": seq})
     return Response(status_code=204)
 
 
 @app.get("/api/leaderboard")
 async def load_leaderboard(
+    request: Request,
     limit: int = Query(default=20, ge=1, le=50),
+) -> Response:
+    await sync_workers()
+
+    async def load() -> Dict[str, Any]:
+        return {"items": leaderboard.top(limit)}
+
+    cached = await leaderboard_cache.get(limit, load)
+    return conditional_response(request, cached.body, cached.etag)
+
+
+@app.get("/api/leaderboard/rank")
+async def load_leaderboard_rank(
+    user_id: int | None = Query(default=None, ge=0, le=MAX_INT64),
 ) -> JSONResponse:
-    items = await fetch_leaderboard(sessionmaker, limit=limit)
-    return JSONResponse({"items": items})
+    await sync_workers()
+    entry = leaderboard.entry(user_id) if user_id else None
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Unknown user")
+    entry["rank"] = leaderboard.rank(user_id)
+    entry["total"] = len(leaderboard)
+    return JSONResponse(entry)
+
+
+@app.get("/api/stats")
+async def load_stats() -> JSONResponse:
+    return JSONResponse(
+        {
+            "saves": progress_buffer.stats(),
+            "leaderboard_cache": leaderboard_cache.stats(),
+            "progress_cache": progress_cache.stats(),
+            "auth": init_data_verifier.stats(),
+            "save_limiter": save_limiter.stats(),
+            "growth_guard": growth_guard.stats(),
+            "change_feed": change_feed.stats() if change_feed is not None else None,
+            "scheduler": jsonable_encoder(await job_store.metrics()),
+            "requests": request_tracer.stats(),
+        }
+    )
+
+
+@app.get("/metrics")
+async def load_metrics() -> PlainTextResponse:
+    # Request metrics of this worker and the job totals the bot process keeps
+    # in the job store, in Prometheus format.
+    return PlainTextResponse(
+        request_tracer.prometheus_text() + prometheus_text(await job_store.metrics()),
+        media_type="text/plain; version=0.0.4",
+    )
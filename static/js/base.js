@@ -11,6 +11,8 @@ const CURRENCY_NAME = "Астральные кристаллы";
 const CURRENCY_SYMBOL = "✦";
 const LOCAL_PLAYER_ID_KEY = "galactic_clicker_player_id";
 const LOCAL_PROGRESS_KEY = "galactic_clicker_progress";
+const LOCAL_SAVE_SEQ_KEY = "galactic_clicker_save_seq";
+const LOCAL_BOOTSTRAP_ETAG_KEY = "galactic_clicker_bootstrap_etag";
 const SAVE_DELAY_MS = 200;
 const BASE_LEVEL_GOAL = 120;
 
@@ -182,7 +184,7 @@ const CHEST_DEFINITIONS = [
 ];
 
 const CHEST_DEFINITION_MAP = new Map(CHEST_DEFINITIONS.map((definition) => [definition.id, definition]));
-const CHEST_REFRESH_INTERVAL_MS = 60_000;
+const CHEST_LABEL_REFRESH_MS = 60_000;
 
 const SETTINGS = {
   comboWindowMs: BASE_COMBO_WINDOW,
@@ -294,26 +296,44 @@ let level = 0;
 let currency = 0;
 let upgradeLevels = new Map();
 let hasFreeChest = false;
+let chestReadyAt = null;
+// Перезарядка бесплатного сундука, приходит с сервера вместе с прогрессом
+let chestCooldownMs = null;
+// Бесплатный сундук открыт, но сервер еще не подтвердил сохранение
+let chestOpenPending = false;
 let currentSkinId = DEFAULT_SKIN_ID;
 const ownedSkins = new Set([DEFAULT_SKIN_ID]);
 let lastClickTs = 0;
-let chestRefreshIntervalId = null;
+let chestRefreshTimeoutId = null;
 let passiveIncomeIntervalId = null;
 let saveTimeoutId = null;
 let levelUpFlashTimeoutId = 0;
 let lastSavedSignature = null;
+let lastSentProgress = null;
+// Номер последнего сохранения, принятого сервером
+let acknowledgedSeq = 0;
+let saveSeq = 0;
 let comboDelayTimeoutId = null;
 let heroDismissed = false;
 
 const API_ENDPOINT = "/api/clicker";
 const DB_ENDPOINT = "/api/database";
+const BOOTSTRAP_ENDPOINT = "/api/bootstrap";
 
 const LEADERBOARD_ENDPOINT = "/api/leaderboard";
+const LEADERBOARD_RANK_ENDPOINT = "/api/leaderboard/rank";
 const LEADERBOARD_REFRESH_MS = 60_000;
 const LEADERBOARD_LIMIT = 20;
 
 let userContext = extractUserContext();
-// const initData = typeof tg.initData === "string" ? tg.initData : "";
+const initData = typeof tg.initData === "string" ? tg.initData : "";
+const INIT_DATA_HEADER = "X-Telegram-Init-Data";
+
+/**
+ * Добавляет к заголовкам подписанные данные Telegram, по которым сервер узнает игрока
+ */
+const withInitData = (headers) =>
+  initData ? { ...headers, [INIT_DATA_HEADER]: initData } : headers;
 
 function applyPalette(palette) {
   if (!palette) {
@@ -12,6 +12,7 @@ const loadInitialProgress = async () => {
     return;
   }
 
+  saveSeq = saveSequenceFromStorage();
   progressLocalStorage = localStorage.getItem(LOCAL_PROGRESS_KEY);
   db_version_from_local_storage = localStorage.getItem("db_version");
   if (!progressLocalStorage || !db_version_from_local_storage) {
@@ -21,21 +22,26 @@ const loadInitialProgress = async () => {
     applyLoadedProgress(progress);
   }
 
-  const params_to_version_db = new URLSearchParams({ db_version: db_version_from_local_storage ? db_version_from_local_storage : 0 });
+  const params = new URLSearchParams({
+    user_id: String(userContext.id),
+    username: userContext.username ?? "",
+    limit: String(LEADERBOARD_LIMIT),
+  });
+  const headers = withInitData({ Accept: "application/json" });
+  const bootstrapEtag = localStorage.getItem(LOCAL_BOOTSTRAP_ETAG_KEY);
+  if (progressLocalStorage && db_version_from_local_storage && bootstrapEtag) {
+    headers["If-None-Match"] = bootstrapEtag;
+  }
+
   try {
-    const response_version_db = await fetch(`${DB_ENDPOINT}?${params_to_version_db.toString()}`, {
-      method: "GET"
+    const response = await fetch(`${BOOTSTRAP_ENDPOINT}?${params.toString()}`, {
+      method: "GET",
+      headers,
     });
-    if (response_version_db.ok) {
+    if (response.status === 304) {
       return;
     }
 
-    const params = new URLSearchParams({ user_id: String(userContext.id), username: userContext.username ?? "" });
-    const response = await fetch(`${API_ENDPOINT}?${params.toString()}`, {
-      method: "GET",
-      headers: { Accept: "application/json" },
-    });
-
     if (!response.ok || response.status === 204) {
       const hasProgress =
         score > 0 ||
@@ -46,10 +52,18 @@ const loadInitialProgress = async () => {
       return;
     }
 
-    const loaded_progress = await response.json();
+    const loaded = await response.json();
+    const loaded_progress = loaded.progress;
     applyLoadedProgress(loaded_progress);
     localStorage.setItem(LOCAL_PROGRESS_KEY, JSON.stringify(loaded_progress));
-    localStorage.setItem("db_version", Number.parseInt(loaded_progress.db_version));
+    localStorage.setItem("db_version", Number.parseInt(loaded.db_version));
+    localStorage.setItem(LOCAL_BOOTSTRAP_ETAG_KEY, response.headers.get("ETag") ?? "");
+
+    if (Array.isArray(loaded.leaderboard)) {
+      leaderboardState.items = loaded.leaderboard;
+      leaderboardState.lastFetchedAt = Date.now();
+      renderLeaderboard(loaded.leaderboard);
+    }
   } catch (error) {
     console.warn("Не удалось загрузить прогресс:", error);
     const hasProgress =
@@ -121,6 +135,15 @@ const applyLoadedProgress = (data) => {
       : DEFAULT_SKIN_ID;
 
   hasFreeChest = data.has_free_chest;
+  chestReadyAt = Number.isFinite(data.chest_ready_at) ? data.chest_ready_at : null;
+  if (Number.isFinite(data.chest_cooldown_ms)) {
+    chestCooldownMs = data.chest_cooldown_ms;
+  }
+
+  const storedSaveSeq = Number.parseInt(data.save_seq, 10);
+  if (Number.isFinite(storedSaveSeq)) {
+    rememberSaveSequence(storedSaveSeq);
+  }
 
   // applyUpgradeEffects();
   renderUpgrades();
@@ -156,7 +179,7 @@ const bootstrap = async () => {
   renderActiveSkin();
   renderOwnedSkins();
   renderChests();
-  setChestRefreshTimer();
+  scheduleChestRefresh();
   activateTab("clicker");
 
   updateLevelIndicator();
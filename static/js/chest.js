@@ -64,16 +64,11 @@ const getChestAvailability = (chest, referenceTs = Date.now()) => {
     if (hasFreeChest) {
       return { canOpen: true, statusText: "Готов к открытию" };
     }
-    const date = new Date(referenceTs);
-    date.setHours(8, 0, 0, 0);
-    let isEarlierThanToday = referenceTs < date.getTime();
-    if (!isEarlierThanToday) {
-      date.setDate(date.getDate() + 1);
+    if (chestReadyAt === null) {
+      return { canOpen: false, statusText: "Скоро будет доступен" };
     }
 
-    const targetTime = date.getTime();
-    const now = new Date().getTime();
-    const remaining = targetTime - now;
+    const remaining = chestReadyAt - referenceTs;
 
     return {
       canOpen: false,
@@ -475,20 +470,29 @@ const bindChestOverlayInteractions = () => {
 
 bindChestOverlayInteractions();
 
-const setChestRefreshTimer = () => {
-  if (chestRefreshIntervalId) {
-    window.clearInterval(chestRefreshIntervalId);
+/**
+ * Обновляет бесплатный сундук только пока идет его перезарядка:
+ * раз в минуту для таймера и точно в момент, когда он снова доступен
+ */
+const scheduleChestRefresh = () => {
+  if (chestRefreshTimeoutId) {
+    window.clearTimeout(chestRefreshTimeoutId);
+    chestRefreshTimeoutId = null;
   }
-  if (!dom.chestList) {
+  if (!dom.chestList || hasFreeChest || chestReadyAt === null) {
     return;
   }
-  chestRefreshIntervalId = window.setInterval(() => {
+  const remaining = chestReadyAt - Date.now();
+  chestRefreshTimeoutId = window.setTimeout(() => {
+    chestRefreshTimeoutId = null;
+    if (chestReadyAt <= Date.now()) {
+      hasFreeChest = true;
+    }
     renderChests();
-  }, CHEST_REFRESH_INTERVAL_MS);
+    scheduleChestRefresh();
+  }, Math.max(0, Math.min(remaining, CHEST_LABEL_REFRESH_MS)));
 };
 
-setChestRefreshTimer();
-
 const buildOverlayReward = (reward) => {
   if (reward.type === "skin") {
     const rarity = reward.skin.rarity;
@@ -644,6 +648,9 @@ const attemptOpenChest = (chest, sourceButton = null) => {
     }
   } else if (chest.costType === "free") {
     hasFreeChest = false;
+    chestOpenPending = true;
+    chestReadyAt = chestCooldownMs === null ? null : Date.now() + chestCooldownMs;
+    scheduleChestRefresh();
   }
 
   triggerButtonAnimation();
@@ -1,5 +1,6 @@
 const leaderboardState = {
   items: [],
+  etag: null,
   lastFetchedAt: 0,
   isLoading: false,
 };
@@ -36,26 +37,35 @@ async function loadLeaderboard(force = false) {
   }
 
   try {
+    const headers = { Accept: "application/json" };
+    if (leaderboardState.etag) {
+      headers["If-None-Match"] = leaderboardState.etag;
+    }
     const response = await fetch(`${LEADERBOARD_ENDPOINT}?limit=${LEADERBOARD_LIMIT}`, {
       method: "GET",
-      headers: { Accept: "application/json" },
+      headers,
     });
 
-    if (!response.ok) {
-      throw new Error(`HTTP ${response.status}`);
+    let items = leaderboardState.items;
+    if (response.status !== 304) {
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+      }
+
+      const loaded_leaderboard = await response.json();
+      items = Array.isArray(loaded_leaderboard?.items)
+        ? loaded_leaderboard.items
+        : Array.isArray(loaded_leaderboard)
+          ? loaded_leaderboard
+          : [];
+      leaderboardState.etag = response.headers.get("ETag");
     }
 
-    const loaded_leaderboard = await response.json();
-    const items = Array.isArray(loaded_leaderboard?.items)
-      ? loaded_leaderboard.items
-      : Array.isArray(loaded_leaderboard)
-        ? loaded_leaderboard
-        : [];
-
     leaderboardState.items = items;
     leaderboardState.lastFetchedAt = Date.now();
 
     renderLeaderboard(items);
+    void renderOwnRank(items).catch(() => { });
     if (!items.length) {
       setLeaderboardStatus("Пока нет записей. Будь первым в галактике!", "info");
     } else {
@@ -105,67 +115,91 @@ const formatLeaderboardMeta = (entry) => {
   return metaParts.join(" • ");
 };
 
-const renderLeaderboard = (items) => {
-  if (!dom.leaderboardList) {
-    return;
-  }
-  dom.leaderboardList.innerHTML = "";
-  if (!Array.isArray(items) || items.length === 0) {
-    dom.leaderboardList.hidden = true;
-    return;
-  }
+const createLeaderboardItem = (entry, rank, ownId) => {
+  const li = document.createElement("li");
+  li.className = "leaderboard-item";
 
-  const fragment = document.createDocumentFragment();
-  const ownId = userContext?.id ? String(userContext.id) : null;
+  const rankNode = document.createElement("span");
+  rankNode.className = "leaderboard-rank";
+  rankNode.textContent = String(rank);
 
-  items.forEach((entry, index) => {
-    const rank = index + 1;
-    const li = document.createElement("li");
-    li.className = "leaderboard-item";
+  const userNode = document.createElement("div");
+  userNode.className = "leaderboard-user";
 
-    const rankNode = document.createElement("span");
-    rankNode.className = "leaderboard-rank";
-    rankNode.textContent = String(rank);
+  const nameNode = document.createElement("span");
+  nameNode.className = "leaderboard-name";
+  nameNode.textContent = formatLeaderboardName(entry);
 
-    const userNode = document.createElement("div");
-    userNode.className = "leaderboard-user";
+  const metaNode = document.createElement("span");
+  metaNode.className = "leaderboard-meta";
+  metaNode.textContent = formatLeaderboardMeta(entry);
 
-    const nameNode = document.createElement("span");
-    nameNode.className = "leaderboard-name";
-    nameNode.textContent = formatLeaderboardName(entry);
+  userNode.appendChild(nameNode);
+  userNode.appendChild(metaNode);
 
-    const metaNode = document.createElement("span");
-    metaNode.className = "leaderboard-meta";
-    metaNode.textContent = formatLeaderboardMeta(entry);
+  const scoreNode = document.createElement("div");
+  scoreNode.className = "leaderboard-score";
 
-    userNode.appendChild(nameNode);
-    userNode.appendChild(metaNode);
+  const scoreValueNode = document.createElement("span");
+  scoreValueNode.className = "leaderboard-score-value";
+  scoreValueNode.textContent = formatNumber(entry.score ?? 0);
 
-    const scoreNode = document.createElement("div");
-    scoreNode.className = "leaderboard-score";
+  const scoreLabelNode = document.createElement("span");
+  scoreLabelNode.className = "leaderboard-score-label";
+  scoreLabelNode.textContent = "очки";
 
-    const scoreValueNode = document.createElement("span");
-    scoreValueNode.className = "leaderboard-score-value";
-    scoreValueNode.textContent = formatNumber(entry.score ?? 0);
+  scoreNode.appendChild(scoreValueNode);
+  scoreNode.appendChild(scoreLabelNode);
 
-    const scoreLabelNode = document.createElement("span");
-    scoreLabelNode.className = "leaderboard-score-label";
-    scoreLabelNode.textContent = "очки";
+  li.appendChild(rankNode);
+  li.appendChild(userNode);
+  li.appendChild(scoreNode);
 
-    scoreNode.appendChild(scoreValueNode);
-    scoreNode.appendChild(scoreLabelNode);
+  if (ownId && String(entry.user_id) === ownId) {
+    li.classList.add("is-self");
+  }
 
-    li.appendChild(rankNode);
-    li.appendChild(userNode);
-    li.appendChild(scoreNode);
+  return li;
+};
 
-    if (ownId && String(entry.user_id) === ownId) {
-      li.classList.add("is-self");
-    }
+const renderLeaderboard = (items) => {
+  if (!dom.leaderboardList) {
+    return;
+  }
+  dom.leaderboardList.innerHTML = "";
+  if (!Array.isArray(items) || items.length === 0) {
+    dom.leaderboardList.hidden = true;
+    return;
+  }
 
-    fragment.appendChild(li);
+  const fragment = document.createDocumentFragment();
+  const ownId = userContext?.id ? String(userContext.id) : null;
+
+  items.forEach((entry, index) => {
+    fragment.appendChild(createLeaderboardItem(entry, index + 1, ownId));
   });
 
   dom.leaderboardList.appendChild(fragment);
   dom.leaderboardList.hidden = false;
 };
+
+/**
+ * Добавляет строку с местом игрока, если он не попал в топ
+ */
+const renderOwnRank = async (items) => {
+  const ownId = userContext?.id ? String(userContext.id) : null;
+  if (!ownId || !dom.leaderboardList || items.some((entry) => String(entry.user_id) === ownId)) {
+    return;
+  }
+  const params = new URLSearchParams({ user_id: ownId });
+  const response = await fetch(`${LEADERBOARD_RANK_ENDPOINT}?${params.toString()}`, {
+    method: "GET",
+    headers: { Accept: "application/json" },
+  });
+  if (!response.ok) {
+    return;
+  }
+  const entry = await response.json();
+  dom.leaderboardList.appendChild(createLeaderboardItem(entry, entry.rank, ownId));
+  dom.leaderboardList.hidden = false;
+};
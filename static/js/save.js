@@ -13,9 +13,14 @@ const buildCurrentProgress = () => ({
   upgrades: serializeUpgrades(),
   active_skin: currentSkinId,
   owned_skins: Array.from(ownedSkins).sort(),
-  has_free_chest: hasFreeChest
+  has_free_chest: hasFreeChest,
+  chest_ready_at: chestReadyAt,
+  chest_cooldown_ms: chestCooldownMs
 });
 
+// Состояние сундука сервер выводит сам: оно хранится только локально
+const LOCAL_ONLY_KEYS = ["has_free_chest", "chest_ready_at", "chest_cooldown_ms"];
+
 const signatureFromProgress = (progress) => JSON.stringify(progress)
 
 const saveInLocalStorage = (progress) => {
@@ -26,26 +31,120 @@ const saveInLocalStorage = (progress) => {
   }
 };
 
-const sendProgress = (progress) => {
-  const prepared = {
-    ...progress,
-    user_id: userContext.id,
-  };
-  const body = JSON.stringify(prepared);
+const saveSequenceFromStorage = () => {
+  const stored = Number.parseInt(localStorage.getItem(LOCAL_SAVE_SEQ_KEY), 10);
+  return Number.isFinite(stored) ? stored : 0;
+};
 
-  if (navigator.sendBeacon) {
-    const blob = new Blob([body], { type: "application/json" });
-    if (navigator.sendBeacon(API_ENDPOINT, blob)) {
-      return;
+const rememberSaveSequence = (seq) => {
+  if (seq > saveSeq) {
+    saveSeq = seq;
+  }
+  try {
+    localStorage.setItem(LOCAL_SAVE_SEQ_KEY, String(saveSeq));
+  } catch (error) {
+    console.warn("Не удалось сохранить номер сохранения:", error);
+  }
+};
+
+/**
+ * Оставляет в прогрессе только поля, изменившиеся с последней отправки
+ */
+const diffProgress = (previous, current) => {
+  if (!previous) {
+    const full = { ...current };
+    LOCAL_ONLY_KEYS.forEach((key) => delete full[key]);
+    return full;
+  }
+  const delta = {};
+  ["score", "level", "currency", "active_skin"].forEach((key) => {
+    if (previous[key] !== current[key]) {
+      delta[key] = current[key];
     }
+  });
+
+  const previousLevels = new Map(previous.upgrades.map((upgrade) => [upgrade.name, upgrade.level]));
+  const upgrades = current.upgrades.filter(
+    (upgrade) => previousLevels.get(upgrade.name) !== upgrade.level
+  );
+  if (upgrades.length > 0) {
+    delta.upgrades = upgrades;
   }
 
+  const previousSkins = new Set(previous.owned_skins);
+  const ownedSkinsAdded = current.owned_skins.filter((skinId) => !previousSkins.has(skinId));
+  if (ownedSkinsAdded.length > 0) {
+    delta.owned_skins = ownedSkinsAdded;
+  }
+  return delta;
+};
+
+/**
+ * Изменения из неудачного сохранения могли не дойти до сервера,
+ * поэтому следующее сохранение отправит прогресс целиком
+ */
+const forgetSentProgress = () => {
+  // Ответы на уже отправленные разницы больше не сдвигают базу
+  acknowledgedSeq = Math.max(acknowledgedSeq, saveSeq);
+  lastSentProgress = null;
+  lastSavedSignature = null;
+};
+
+const sendProgress = (progress) => {
+  const delta = diffProgress(lastSentProgress, progress);
+  // Открытие сундука отправляется только после настоящего открытия
+  const opensChest = chestOpenPending;
+  if (opensChest) {
+    delta.open_free_chest = true;
+  }
+  if (Object.keys(delta).length === 0) {
+    return;
+  }
+  rememberSaveSequence(saveSeq + 1);
+  const seq = saveSeq;
+
+  const body = JSON.stringify({
+    ...delta,
+    user_id: userContext.id,
+    seq,
+  });
+
   fetch(API_ENDPOINT, {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
+    method: "PATCH",
+    headers: withInitData({ "Content-Type": "application/json" }),
     body,
     keepalive: true,
-  }).catch(() => { });
+  })
+    .then(async (response) => {
+      if (response.ok) {
+        if (opensChest) {
+          chestOpenPending = false;
+        }
+        // Базой для следующей разницы становится только подтвержденный прогресс
+        if (seq > acknowledgedSeq) {
+          acknowledgedSeq = seq;
+          lastSentProgress = progress;
+        }
+        return;
+      }
+      if (response.status === 429) {
+        // Сервер просит сохранять реже: повторяем весь прогресс после паузы
+        const retryAfter = Number.parseInt(response.headers.get("Retry-After"), 10) || 1;
+        forgetSentProgress();
+        window.setTimeout(scheduleSave, retryAfter * 1000);
+        return;
+      }
+      if (response.status !== 409) {
+        forgetSentProgress();
+        return;
+      }
+      // Сервер уже видел более новое сохранение: догоняем номер и шлем полный прогресс
+      const conflict = await response.json();
+      rememberSaveSequence(Number.parseInt(conflict.save_seq, 10) || 0);
+      forgetSentProgress();
+      scheduleSave();
+    })
+    .catch(forgetSentProgress);
 };
 
 const flushSave = () => {